@@ -0,0 +1,48 @@
+import mechwolf as mw
+
+N_COMPONENTS = 5000
+
+
+def build_apparatus(n):
+    """A chain of vessels and pumps with `n` components in total."""
+    tube = mw.Tube(length="1 foot", ID="1/16 in", OD="2/16 in", material="PVC")
+    components = [
+        (
+            mw.DummyPump(name=f"pump {i}")
+            if i % 2
+            else mw.Vessel("water", name=f"vessel {i}")
+        )
+        for i in range(n)
+    ]
+    A = mw.Apparatus()
+    for from_component, to_component in zip(components, components[1:]):
+        A.add(from_component, to_component, tube)
+    return A
+
+
+class ApparatusSuite:
+    """Building, validating, and looking up the components of an apparatus."""
+
+    def setup(self):
+        self.apparatus = build_apparatus(N_COMPONENTS)
+        self.names = [f"pump {i}" for i in range(1, N_COMPONENTS, 2)]
+
+    def time_build(self):
+        build_apparatus(N_COMPONENTS)
+
+    def time_validate(self):
+        self.apparatus._validate()
+
+    def time_lookup_by_name(self):
+        for name in self.names:
+            self.apparatus[name]
+
+    def time_lookup_by_type(self):
+        for _ in range(100):
+            self.apparatus[mw.ActiveComponent]
+
+    def time_add_cartesian_product(self):
+        tube = mw.Tube(length="1 foot", ID="1/16 in", OD="2/16 in", material="PVC")
+        vessels = [mw.Vessel("water", name=f"reagent {i}") for i in range(200)]
+        valves = [mw.Valve(name=f"valve {i}", mapping={}) for i in range(25)]
+        mw.Apparatus().add(vessels, valves, tube)
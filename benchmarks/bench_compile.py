@@ -0,0 +1,73 @@
+import mechwolf as mw
+
+from .common import build_apparatus, build_protocol
+
+
+class AddSuite:
+    """Adding procedures with `Protocol.add`, which parses their times and parameters."""
+
+    params = [10**3, 10**4]
+    param_names = ["procedures"]
+
+    def setup(self, n):
+        self.apparatus, self.pump, _ = build_apparatus()
+
+    def time_add(self, n):
+        P = mw.Protocol(self.apparatus, name="benchmark")
+        for i in range(n):
+            P.add(
+                self.pump,
+                rate=f"{i % 10} mL/min",
+                start=f"{i} secs",
+                stop=f"{i + 1} secs",
+            )
+
+
+class CompileSuite:
+    """Compiling protocols of increasing size."""
+
+    params = [10**3, 10**4, 10**5]
+    param_names = ["procedures"]
+    timeout = 120
+
+    def setup(self, n):
+        self.apparatus, self.pump, _ = build_apparatus()
+        self.protocol = build_protocol(self.apparatus, self.pump, n)
+
+    def time_compile(self, n):
+        # skip the cache of compiled schedules
+        self.protocol._compile_schedule()
+
+    def time_content_hash(self, n):
+        # hash from scratch rather than picking up where the last call left off
+        for procedure in self.protocol.procedures:
+            procedure._changed()
+        self.protocol.content_hash
+
+    def time_content_hash_edited(self, n):
+        # only the procedure that changed is hashed again
+        self.protocol.procedures[0]["params"]["rate"] = "5 mL/min"
+        self.protocol.content_hash
+
+    def time_content_hash_unchanged(self, n):
+        # checking that nothing changed since the last time, as compiling again does
+        self.protocol.content_hash
+
+    def peakmem_compile(self, n):
+        self.protocol._compile_schedule()
+
+
+class RepeatSuite:
+    """Compiling a protocol of a million procedures, made by repeating a block."""
+
+    def setup(self):
+        apparatus, pump, _ = build_apparatus()
+        block = build_protocol(apparatus, pump, 10**3, name="block")
+        self.protocol = mw.Protocol(apparatus, name="benchmark")
+        self.protocol.repeat(block, 10**3)
+
+    def time_compile(self):
+        self.protocol._compile_schedule()
+
+    def time_state_at(self):
+        self.protocol.state_at(10**6 / 2 + 0.5)
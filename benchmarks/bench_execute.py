@@ -0,0 +1,91 @@
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+import mechwolf as mw
+from mechwolf.core.execute import Datapoint, _execute_schedule
+
+from .common import build_apparatus, build_protocol
+
+N_PROCEDURES = 2000
+
+
+class DispatchSuite:
+    """Dispatching procedures during a dry run, with and without a trace level sink."""
+
+    params = [False, True]
+    param_names = ["trace"]
+
+    def setup(self, trace):
+        self.pump = mw.DummyPump(name="pump")
+        A = mw.Apparatus()
+        A.add(
+            mw.Vessel("water", name="water"),
+            self.pump,
+            mw.Tube("1 m", "1 mm", "2 mm", "PFA"),
+        )
+        self.experiment = mw.Experiment(mw.Protocol(A))
+        self.experiment.dry_run = True
+        self.procedures = [
+            dict(time=0.0, params={"rate": f"{i % 10} mL/min"})
+            for i in range(N_PROCEDURES)
+        ]
+        self.sink = logger.add(lambda message: None, level="TRACE" if trace else "INFO")
+
+    def teardown(self, trace):
+        logger.remove(self.sink)
+
+    def time_dispatch(self, trace):
+        self.experiment.start_time = time.time()
+        asyncio.run(
+            _execute_schedule(
+                self.procedures, self.pump, self.experiment, dry_run=True, strict=True
+            )
+        )
+
+
+class ExecuteSuite:
+    """Executing a protocol end to end in a dry run at 10,000x speed."""
+
+    params = [10**2, 10**3]
+    param_names = ["procedures"]
+
+    def setup(self, n):
+        apparatus, pump, _ = build_apparatus()
+        self.protocol = build_protocol(apparatus, pump, n)
+
+    def time_execute(self, n):
+        self.protocol.execute(
+            dry_run=10**4, confirm=True, log_file=None, data_file=None
+        )
+
+
+class IngestSuite:
+    """Ingesting sensor data with `Experiment._update`, with and without a data file."""
+
+    params = [False, True]
+    param_names = ["data_file"]
+
+    def setup(self, data_file):
+        apparatus, _, self.sensor = build_apparatus()
+        self.experiment = mw.Experiment(mw.Protocol(apparatus))
+        self.directory = tempfile.TemporaryDirectory()
+        if data_file:
+            self.experiment._data_file = Path(self.directory.name) / "data.jsonl"
+        self.datapoints = [
+            Datapoint(data=float(i), timestamp=time.time(), experiment_elapsed_time=i)
+            for i in range(N_PROCEDURES)
+        ]
+
+    def teardown(self, data_file):
+        self.directory.cleanup()
+
+    def time_update(self, data_file):
+        async def ingest():
+            for datapoint in self.datapoints:
+                await self.experiment._update(self.sensor.name, datapoint)
+
+        asyncio.run(ingest())
@@ -0,0 +1,3 @@
+def timeraw_import():
+    """Importing MechWolf from scratch in a new interpreter."""
+    return "import mechwolf"
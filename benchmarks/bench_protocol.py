@@ -0,0 +1,22 @@
+from mechwolf.zoo.peptide_synthesizer import create_apparatus, create_protocol
+
+# a 100 residue peptide, which makes a protocol with 1,200 procedures
+PEPTIDE = "ACDEFGHIKLMNPQRSTVWY" * 5
+
+
+class PeptideSynthesisSuite:
+    """Generating and compiling the protocol for a long peptide."""
+
+    def setup(self):
+        self.apparatus = create_apparatus()
+        self.protocol = create_protocol(PEPTIDE, self.apparatus)
+
+    def time_create_protocol(self):
+        create_protocol(PEPTIDE, self.apparatus)
+
+    def time_compile(self):
+        # skip the cache of compiled schedules
+        self.protocol._compile_schedule()
+
+    def time_visualize(self):
+        self.protocol.visualize()
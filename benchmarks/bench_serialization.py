@@ -0,0 +1,28 @@
+from importlib.util import find_spec
+
+import mechwolf as mw
+
+from .common import build_apparatus, build_protocol
+
+
+class SerializationSuite:
+    """Dumping and loading a protocol of 10,000 procedures."""
+
+    params = ["yaml", "json", "msgpack"]
+    param_names = ["format"]
+
+    def setup(self, format):
+        # msgpack is an optional extra, so skip it if it isn't installed
+        if format == "msgpack" and find_spec("msgpack") is None:
+            raise NotImplementedError("msgpack isn't installed")
+        self.apparatus, pump, _ = build_apparatus()
+        self.protocol = build_protocol(self.apparatus, pump, 10**4)
+        self.dump = getattr(self.protocol, format)
+        self.load = getattr(mw.Protocol, f"from_{format}")
+        self.data = self.dump()
+
+    def time_dump(self, format):
+        self.dump()
+
+    def time_load(self, format):
+        self.load(self.apparatus, self.data)
@@ -0,0 +1,23 @@
+import mechwolf as mw
+
+
+def build_apparatus():
+    """A dummy pump and sensor between two vessels."""
+    pump = mw.DummyPump(name="pump")
+    sensor = mw.DummySensor(name="sensor")
+    tube = mw.Tube("1 m", "1 mm", "2 mm", "PFA")
+    A = mw.Apparatus()
+    A.add(mw.Vessel("water", name="water"), pump, tube)
+    A.add(pump, sensor, tube)
+    A.add(sensor, mw.Vessel("waste", name="waste"), tube)
+    return A, pump, sensor
+
+
+def build_protocol(apparatus, pump, n, name="benchmark"):
+    """A protocol with `n` back-to-back one second procedures on a single pump."""
+    P = mw.Protocol(apparatus, name=name)
+    for i in range(n):
+        P._append(
+            pump, start=float(i), stop=float(i + 1), params={"rate": f"{i % 10} mL/min"}
+        )
+    return P
@@ -110,7 +110,16 @@ def generate_obj_md(cls, title=None, header=NO_EDIT_HEADER):
 
 
 # first, do the main objects
-for cls in [mw.Apparatus, mw.Protocol, mw.Experiment]:
+for cls in [
+    mw.Apparatus,
+    mw.Protocol,
+    mw.Experiment,
+    mw.Ramp,
+    mw.Steps,
+    mw.Profile,
+    mw.ScheduleCache,
+    mw.Metrics,
+]:
     print(f"Generating docs for {cls.__name__}")
     docs = generate_obj_md(cls)
     path = Path("api/core/")
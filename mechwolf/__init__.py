@@ -16,8 +16,11 @@ if get_ipython():
 # to avoid circular import
 from .core.apparatus import Apparatus
 from .core.protocol import Protocol
+from .core.cache import ScheduleCache
+from .core.setpoints import Profile, Ramp, SetpointProgram, Steps
 from .components import *
 from .core.experiment import Experiment
+from .core.metrics import Metrics
 
 from . import zoo
 from . import plugins
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
 
 from loguru import logger
 
@@ -23,9 +23,21 @@ class ActiveComponent(Component):
     Attributes:
     - `name`: The name of the component.
 
+    ::: tip
+    Updates that wouldn't change anything on the device are skipped.
+    Drivers for slow devices can set `_coalesce_window` to a number of seconds to wait before sending a setpoint, so that when several arrive in quick succession only the last one is sent.
+    During execution, such components are sent their setpoints in the background, so the rest of their procedures aren't held up by the device.
+    :::
+
+    ::: tip
+    Setpoint programs such as `Ramp` are sent to the device at most every `_sample_interval` seconds. Drivers can lower it for devices that keep up with faster updates.
+    :::
+
     """
 
     _id_counter = 0
+    _coalesce_window: float = 0.0
+    _sample_interval: float = 1.0
 
     def __init__(self, name: Optional[str] = None):
         super().__init__(name=name)
@@ -36,6 +48,10 @@ class ActiveComponent(Component):
         The dict must have values which can be parsed into compatible units of the object's other attributes, if applicable.
         At the end of a protocol and when not under explicit control by the user, the component will return to this state.
         """
+        self._state_keys: Set[str] = set()
+        self._acknowledged_state: Optional[Dict[str, Any]] = None
+        self._skipped_updates = 0
+        self._coalesced_updates = 0
 
     def _update_from_params(self, params: dict) -> None:
         """
@@ -44,6 +60,7 @@ class ActiveComponent(Component):
         Arguments:
         - `params`: A dict whose keys are the strings of attribute names and values are the new values of the attribute.
         """
+        self._state_keys.update(params)
         for key, value in params.items():
             if isinstance(getattr(self, key), _ureg.Quantity):
                 setattr(self, key, _ureg.parse_expression(value))
@@ -53,6 +70,54 @@ class ActiveComponent(Component):
     async def _update(self):
         raise NotImplementedError(f"Implement an _update() method for {repr(self)}.")
 
+    async def _check(self) -> None:
+        """
+        Checks that the device can actually be driven by setting it to its base state.
+
+        The component's context must already have been entered.
+        This is the part of `_validate()` that talks to the device, split out so that many components can be checked at once in the same event loop.
+
+        Raises:
+        - `ValueError`: When `_update()` isn't a coroutine or returns a value.
+        """
+        self._update_from_params(self._base_state)
+        logger.trace("Attempting to call _update() for {!r}.", self)
+        update = self._update()
+        if not asyncio.iscoroutine(update):
+            raise ValueError(f"{repr(self)}._update() must be a coroutine.")
+        res = await update
+        if res is not None:
+            raise ValueError(f"Received return value {res} from update.")
+        self._acknowledged_state = self._state()
+
+    def _state(self) -> Dict[str, Any]:
+        """The current values of the attributes that have been set from params, which are what `_update()` sends to the device."""
+        return {key: getattr(self, key) for key in self._state_keys}
+
+    async def _request_update(
+        self, push: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> bool:
+        """
+        Pushes the component's state to the device, unless the device is known to be in that state already.
+
+        Arguments:
+        - `push`: The coroutine function that actually sends the state. Defaults to `_update()`.
+
+        Returns:
+        - Whether the state was sent.
+        """
+        state = self._state()
+        if state == self._acknowledged_state:
+            self._skipped_updates += 1
+            logger.trace("{!r} is already in {}. Skipping update.", self, state)
+            return False
+
+        # until the device acknowledges, we don't know what state it's in
+        self._acknowledged_state = None
+        await (push or self._update)()
+        self._acknowledged_state = state
+        return True
+
     def _validate(self, dry_run: bool) -> None:
         """
         Checks if a component's class is valid.
@@ -104,11 +169,7 @@ class ActiveComponent(Component):
 
         # once we've checked everything, it should be good
         if not dry_run:
-            self._update_from_params(self._base_state)
-            logger.trace(f"Attempting to call _update() for {repr(self)}.")
             with self:
-                res = asyncio.run(self._update())
-                if res is not None:
-                    raise ValueError(f"Received return value {res} from update.")
+                asyncio.run(self._check())
 
         logger.debug(f"{repr(self)} is valid")
@@ -25,5 +25,5 @@ class DummyPump(Pump):
         super().__init__(name=name)
 
     async def _update(self):
-        logger.trace(f"Set {self} rate to {self.rate}")
+        logger.trace("Set {} rate to {}", self, self.rate)
         pass
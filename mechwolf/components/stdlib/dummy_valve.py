@@ -27,4 +27,4 @@ class DummyValve(Valve):
         super().__init__(name=name, mapping=mapping)
 
     async def _update(self) -> None:
-        logger.trace(f"Switching {self.name} to position {self.setting}")
+        logger.trace("Switching {} to position {}", self.name, self.setting)
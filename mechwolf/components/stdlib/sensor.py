@@ -1,6 +1,6 @@
 import asyncio
 import time
-from typing import TYPE_CHECKING, AsyncGenerator, Optional
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Optional
 from warnings import warn
 
 from loguru import logger
@@ -23,7 +23,7 @@ class Sensor(ActiveComponent):
 
     def __init__(self, name: Optional[str] = None):
         super().__init__(name=name)
-        self.rate = _ureg.parse_expression("0 Hz")
+        self.rate: Any = _ureg.parse_expression("0 Hz")
         self._visualization_shape = "ellipse"
         self._unit: str = ""
         self._base_state = {"rate": "0 Hz"}
@@ -60,21 +60,17 @@ class Sensor(ActiveComponent):
 
         logger.debug(f"Monitor loop for {self} has completed.")
 
-    def _validate(self, dry_run: bool) -> None:
-        logger.debug(f"Performing sensor specific checks for {self}...")
-        if not dry_run:
-            logger.trace(f"Executing Sensor-specific checks...")
-            logger.trace("Entering context...")
-            with self:
-                logger.trace("Context entered")
-                res = asyncio.run(self._read())
-                if not res:
-                    warn(
-                        "Sensor reads should probably return data. "
-                        f"Currently, {self}._read() does not return anything."
-                    )
-        logger.trace("Performing general component checks...")
-        super()._validate(dry_run=dry_run)
+    async def _check(self) -> None:
+        await super()._check()
+        logger.trace(f"Executing Sensor-specific checks for {self}...")
+        read = self._read()
+        if not asyncio.iscoroutine(read):
+            raise ValueError(f"{repr(self)}._read() must be a coroutine.")
+        if not await read:
+            warn(
+                "Sensor reads should probably return data. "
+                f"Currently, {self}._read() does not return anything."
+            )
 
     async def _update(self) -> None:
         # sensors don't have an update method; they implement read
@@ -1,19 +1,67 @@
 from collections import namedtuple
-from typing import Iterable, List, Mapping, Optional, Set, Union
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Type,
+    Union,
+)
 from warnings import warn
 
-import networkx as nx
 from graphviz import Digraph
 from IPython import get_ipython
 from IPython.display import Markdown
 from terminaltables import AsciiTable, GithubFlavoredMarkdownTable
 
 from .. import _ureg
-from ..components import Component, Tube, Valve, Vessel
+from ..components import ActiveComponent, Component, Tube, Valve, Vessel
+from .flow import FlowPaths
+from .session import Session
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 Connection = namedtuple("Connection", ["from_component", "to_component", "tube"])
 
 
+class _DisjointSet(object):
+    """A union-find structure over components, which tracks the apparatus's connectivity as it's built."""
+
+    def __init__(self):
+        self._parent: Dict[Component, Component] = {}
+        self._size: Dict[Component, int] = {}
+        self.count = 0  # the number of disjoint sets
+
+    def add(self, item: Component) -> None:
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+            self.count += 1
+
+    def find(self, item: Component) -> Component:
+        root = item
+        while self._parent[root] is not root:
+            root = self._parent[root]
+        # point everything on the way straight at the root
+        while self._parent[item] is not root:
+            self._parent[item], item = root, self._parent[item]
+        return root
+
+    def union(self, a: Component, b: Component) -> None:
+        a, b = self.find(a), self.find(b)
+        if a is b:
+            return
+        if self._size[a] < self._size[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._size[a] += self._size[b]
+        self.count -= 1
+
+
 class Apparatus(object):
     """
     A unique network of components.
@@ -41,6 +89,17 @@ class Apparatus(object):
         """
         self.network: List[Connection] = []
         self.components: Set[Component] = set()
+        # the same connections as the network, hashed for duplicate checks and indexed by endpoint
+        self._connections: Set[Connection] = set()
+        self._downstream: Dict[Component, List[Connection]] = {}
+        self._upstream: Dict[Component, List[Connection]] = {}
+        self._connectivity = _DisjointSet()
+        self._flow_paths: Optional[FlowPaths] = None
+        # indexes kept up to date by _add_single() so that lookups don't scan every component
+        self._components_by_name: Dict[str, Component] = {}
+        self._components_by_type: Dict[Type[Component], List[Component]] = {}
+        # the components connected directly to each valve, for checking their mappings
+        self._valve_neighbors: Dict[Valve, Set[Component]] = {}
         # if given a name, then name the apparatus, else default to a sequential name
         if name is not None:
             self.name = name
@@ -48,6 +107,7 @@ class Apparatus(object):
             self.name = "Apparatus_" + str(Apparatus._id_counter)
             Apparatus._id_counter += 1
         self.description = description
+        self._session: Optional[Session] = None
 
     def __repr__(self):
         return f"<Apparatus {self.name}>"
@@ -58,17 +118,18 @@ class Apparatus(object):
     def __getitem__(self, item):
         # when you pass a class
         if isinstance(item, type):
-            return [
-                component
-                for component in self.components
-                if isinstance(component, item)
-            ]
+            # the first lookup of a type scans the components; later ones hit the index
+            if item not in self._components_by_type:
+                self._components_by_type[item] = [
+                    component
+                    for component in self.components
+                    if isinstance(component, item)
+                ]
+            return list(self._components_by_type[item])
         elif isinstance(item, str):
             try:
-                return [
-                    component for component in self.components if component.name == item
-                ][0]
-            except IndexError:
+                return self._components_by_name[item]
+            except KeyError:
                 raise KeyError(f"No component named '{item}' in {repr(self)}.")
 
         # a shorthand way to check if a component is in the apparatus
@@ -93,34 +154,39 @@ class Apparatus(object):
             raise ValueError("Tube must be an instance of Tube")
 
         # check for duplicate names
-        try:
-            if self[from_component.name] is not from_component:
-                raise ValueError(f"Component {from_component} has duplicated name")
-        except KeyError:
-            pass
-        try:
-            if self[to_component.name] is not to_component:
-                raise ValueError(f"Component {to_component} has duplicated name")
-        except KeyError:
-            pass
-
-        if (
-            Connection(
-                from_component=from_component, to_component=to_component, tube=tube
-            )
-            in self.network
-        ):
+        for component in (from_component, to_component):
+            existing = self._components_by_name.get(component.name, component)
+            if existing is not component:
+                raise ValueError(f"Component {component} has duplicated name")
+
+        connection = Connection(
+            from_component=from_component, to_component=to_component, tube=tube
+        )
+        if connection in self._connections:
             warn(
                 f"Duplicate connection from {from_component} to {to_component} omitted."
             )
             return
 
-        self.network.append(
-            Connection(
-                from_component=from_component, to_component=to_component, tube=tube
-            )
-        )
-        self.components.update([from_component, to_component])
+        self.network.append(connection)
+        self._connections.add(connection)
+        self._flow_paths = None
+        self._downstream.setdefault(from_component, []).append(connection)
+        self._upstream.setdefault(to_component, []).append(connection)
+        for component in (from_component, to_component):
+            if component in self.components:
+                continue
+            self.components.add(component)
+            self._connectivity.add(component)
+            self._components_by_name[component.name] = component
+            for component_type, members in self._components_by_type.items():
+                if isinstance(component, component_type):
+                    members.append(component)
+        self._connectivity.union(from_component, to_component)
+        if isinstance(from_component, Valve):
+            self._valve_neighbors.setdefault(from_component, set()).add(to_component)
+        if isinstance(to_component, Valve):
+            self._valve_neighbors.setdefault(to_component, set()).add(from_component)
 
     def add(
         self,
@@ -167,6 +233,78 @@ class Apparatus(object):
         ):
             self._add_single(from_component, to_component, tube)
 
+    def session(
+        self,
+        isolate: Optional[Iterable[ActiveComponent]] = None,
+        device_timeout: float = 10.0,
+    ) -> Session:
+        """
+        Creates a session that keeps the apparatus's components connected between executions.
+
+        Use this when running many protocols back-to-back on the same apparatus so that connections (and, for example, the Arduino's reboot) don't have to be redone for each one.
+        While the session is active, `Protocol.execute` reuses its connections.
+
+        Arguments:
+        - `isolate`: Components to host in their own worker processes. See `Protocol.execute`.
+        - `device_timeout`: How long, in seconds, each component gets to come up or shut down.
+
+        Returns:
+        - A `Session`, to be used as a context manager.
+
+        Example:
+        ```python
+        with A.session():
+            for P in protocols:
+                P.execute(confirm=True)
+        ```
+        """
+        return Session(self, isolate=isolate, device_timeout=device_timeout)
+
+    def flow_paths(self) -> FlowPaths:
+        """
+        Indexes the routes that fluid can take through the apparatus.
+
+        The index is built on first use and reused until connections are added to the apparatus.
+
+        ::: tip
+        To find the residence times of a protocol's routes, use `Protocol.residence_times`.
+        :::
+
+        Returns:
+        - A `FlowPaths` index of the apparatus.
+        """
+        if self._flow_paths is None:
+            self._flow_paths = FlowPaths(self)
+        return self._flow_paths
+
+    def to_networkx(self) -> "nx.MultiDiGraph":
+        """
+        Converts the apparatus into a [NetworkX](https://networkx.github.io) graph for more advanced analysis.
+
+        ::: tip
+        NetworkX is an optional dependency. Install it with `pip install mechwolf[graph]`.
+        :::
+
+        Returns:
+        - A directed graph whose nodes are the components and whose edges are the connections, each with its `Tube` as the `tube` attribute.
+
+        Raises:
+        - `ImportError`: When NetworkX isn't installed.
+        """
+        try:
+            import networkx as nx
+        except ImportError:
+            raise ImportError(
+                "NetworkX is required for this. Install it with `pip install mechwolf[graph]`."
+            )
+
+        G = nx.MultiDiGraph()
+        G.add_nodes_from(self.components)
+        G.add_edges_from(
+            [(c.from_component, c.to_component, {"tube": c.tube}) for c in self.network]
+        )
+        return G
+
     def visualize(
         self,
         title: Union[bool, str] = True,
@@ -347,18 +485,17 @@ class Apparatus(object):
         """
 
         # make sure that all of the components are connected
-        G = nx.Graph()  # convert the network to an undirected NetworkX graph
-        G.add_edges_from([(c.from_component, c.to_component) for c in self.network])
-        if not nx.is_connected(G):
+        if self._connectivity.count != 1:
             warn("Not all components connected.")
             return False
 
         # valve checking
-        valves = [x for x in self.components if isinstance(x, Valve)]
+        valves = self[Valve]
         for valve in valves:
 
-            # ensure that valve's mapping components are part of apparatus
+            # ensure that valve's mapping components are connected to it
             if isinstance(valve.mapping, Mapping):
+                neighbors = self._valve_neighbors.get(valve, set())
                 for component in valve.mapping.keys():
                     if component not in self.components:
                         warn(
@@ -366,6 +503,12 @@ class Apparatus(object):
                             f"{component} has not been added to {self.name}"
                         )
                         return False
+                    if component not in neighbors:
+                        warn(
+                            f"Invalid mapping for Valve {valve}. "
+                            f"{component} is not connected to it."
+                        )
+                        return False
 
             # TODO: make this check work again with SISO, SIMO, MISO, and MIMO valves.
             # # no more than one output from a valve (might have to change this)
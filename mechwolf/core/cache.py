@@ -0,0 +1,183 @@
+import io
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from loguru import logger
+from xxhash import xxh64_hexdigest
+
+from .. import __version__
+from ..components import ActiveComponent
+from .schedule import CompiledSchedule
+from .setpoints import Profile, SetpointProgram
+
+if TYPE_CHECKING:
+    from .apparatus import Apparatus
+    from .protocol import Protocol
+
+
+class _Pickler(pickle.Pickler):
+    # components are stored by name and programs by their description
+    def persistent_id(self, obj: Any) -> Any:
+        if isinstance(obj, ActiveComponent):
+            return ("component", obj.name)
+        elif isinstance(obj, Profile):
+            raise ValueError(f"{obj} can't be cached since its function can't be.")
+        elif isinstance(obj, SetpointProgram):
+            return ("program", obj.to_dict())
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, apparatus: "Apparatus"):
+        super().__init__(file)
+        self.apparatus = apparatus
+
+    def persistent_load(self, pid: Any) -> Any:
+        kind, value = pid
+        if kind == "component":
+            return self.apparatus[value]
+        return SetpointProgram.from_dict(value)
+
+
+class ScheduleCache(object):
+    """
+    A persistent cache of compiled protocols, so that protocols that are executed again aren't compiled again.
+
+    Each compiled schedule is stored in its own compact binary file, keyed by the protocol's `content_hash`, its apparatus's components, and the version of MechWolf.
+    When the cache grows beyond `max_size`, the least recently used schedules are deleted.
+
+    ::: tip
+    Pass `cache=True` to `Protocol.execute` to use a cache in `~/.mechwolf/cache`.
+    :::
+
+    ::: warning
+    Schedules are stored with `pickle`, so only use a cache directory that only you can write to.
+    Protocols with a `Profile` aren't cached since their functions can't be stored.
+    :::
+
+    Arguments:
+    - `path`: The directory in which to store the schedules. Defaults to `~/.mechwolf/cache`.
+    - `max_size`: The most disk space, in bytes, for the cache to take up. Defaults to 100 MB.
+
+    Attributes:
+    - `hits`: How many schedules were loaded from the cache.
+    - `max_size`: The most disk space, in bytes, for the cache to take up.
+    - `misses`: How many schedules weren't in the cache.
+    - `path`: The directory in which the schedules are stored.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike, None] = None,
+        max_size: int = 100 * 1024**2,
+    ):
+        if path is None:
+            path = Path("~/.mechwolf/cache").expanduser()
+        self.path = Path(path)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"<ScheduleCache in {self.path}>"
+
+    def key(self, protocol: "Protocol") -> str:
+        """The key under which a protocol's compiled schedule is stored."""
+        components = sorted(
+            [
+                type(c).__name__,
+                c.name,
+                c._base_state if isinstance(c, ActiveComponent) else None,
+            ]
+            for c in protocol.apparatus.components
+        )
+        return xxh64_hexdigest(
+            json.dumps(
+                [__version__, protocol.content_hash, components],
+                sort_keys=True,
+                default=str,
+            )
+        )
+
+    def _file(self, protocol: "Protocol") -> Path:
+        return self.path / f"{self.key(protocol)}.schedule"
+
+    def get(self, protocol: "Protocol") -> Optional[CompiledSchedule]:
+        """
+        Loads a protocol's compiled schedule.
+
+        Returns:
+        - The compiled schedule, or `None` if it isn't in the cache or can't be read.
+        """
+        file = self._file(protocol)
+        try:
+            data = file.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        try:
+            compiled = _Unpickler(io.BytesIO(data), protocol.apparatus).load()
+        except Exception as e:
+            logger.warning(f"Unable to load {file} from the cache. Got error: '{e}'.")
+            self.misses += 1
+            return None
+
+        # mark it as recently used
+        os.utime(file)
+        self.hits += 1
+        logger.debug(f"Loaded the compiled {protocol} from {file}")
+        return compiled
+
+    def put(self, protocol: "Protocol", compiled: CompiledSchedule) -> None:
+        """
+        Stores a protocol's compiled schedule, then evicts the least recently used schedules if the cache is too big.
+
+        Schedules that can't be stored are skipped with a warning in the logs.
+        """
+        buffer = io.BytesIO()
+        try:
+            _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(compiled)
+        except Exception as e:
+            logger.warning(
+                f"Unable to cache the compiled {protocol}. Got error: '{e}'."
+            )
+            return
+
+        # write to a temporary file first so that a partial write is never read
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = self._file(protocol)
+        temp = file.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_bytes(buffer.getvalue())
+        os.replace(temp, file)
+        logger.debug(f"Stored the compiled {protocol} in {file}")
+
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        for file in self.path.glob("*.schedule"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:  # another process got to it first
+                continue
+            files.append((stat.st_mtime, stat.st_size, file))
+
+        size = sum(x[1] for x in files)
+        for _, file_size, file in sorted(files, key=lambda x: x[0]):
+            if size <= self.max_size:
+                break
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            logger.debug(f"Evicted {file} from the cache")
+
+    def clear(self) -> None:
+        """Deletes all of the cached schedules."""
+        for file in self.path.glob("*.schedule"):
+            file.unlink()
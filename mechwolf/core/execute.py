@@ -1,20 +1,38 @@
 import asyncio
+import heapq
 import time
 import traceback
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_for_futures
 from contextlib import ExitStack
-from copy import deepcopy
+from math import isclose
 from time import asctime, localtime
-from typing import TYPE_CHECKING, Dict, Iterable, List, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
 
 from loguru import logger
 
 from .. import __version__
 from ..components import ActiveComponent, Sensor
+from .logs import LogSampler
+from .setpoints import SetpointProgram
+from .worker import DeviceWorker, _picklable_state
 
 # handle the hard issue of circular dependencies
 if TYPE_CHECKING:
     from .experiment import Experiment
+    from .session import Session
 
 
 Datapoint = namedtuple("Datapoint", ["data", "timestamp", "experiment_elapsed_time"])
@@ -24,7 +42,19 @@ class ProtocolCancelled(Exception):
     pass
 
 
-async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool):
+# logging on every wake-up of every component's task would swamp the logs
+_wake_ups = LogSampler(1.0)
+
+
+async def main(
+    experiment: "Experiment",
+    dry_run: Union[bool, int],
+    strict: bool,
+    isolate: Collection[ActiveComponent] = (),
+    device_timeout: float = 10.0,
+    session: Optional["Session"] = None,
+    start_at: float = 0.0,
+):
     """
     The function that actually does the execution of the protocol.
 
@@ -32,6 +62,10 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
     - `experiment`: The experiment to execute.
     - `dry_run`: Whether to simulate the experiment or actually perform it. If an integer greater than zero, the dry run will execute at that many times speed.
     - `strict`: Whether to stop execution upon any errors.
+    - `isolate`: The components to host in their own worker processes. Ignored for dry runs.
+    - `device_timeout`: How long, in seconds, each component gets to come up, reset, or shut down.
+    - `session`: The session holding the components' connections, if any. Components in a session are not shut down at the end of the run, and `isolate` is ignored in favor of the session's own setting.
+    - `start_at`: How many seconds into the protocol to start. The components are set to their states at that time all at once, and only the procedures after it are executed.
     """
 
     # logger.warning("Support for pausing execution is EXPERIMENTAL!")
@@ -39,39 +73,86 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
     logger.info("Performing final launch status check...")
 
     tasks = []
+    setup_start = time.time()
+    teardown_start: Optional[float] = None
+    lag_watcher: Optional[asyncio.Future] = None
+
+    components = list(experiment._compiled_protocol.keys())
+    for component in components:
+        component._skipped_updates = 0
+        component._coalesced_updates = 0
 
     # Run protocol
     # Enter context managers for each component (initialize serial ports, etc.)
     # We can do this with contextlib.ExitStack on an arbitrary number of components
     try:
         with ExitStack() as stack:
+            entered: Dict[ActiveComponent, Any] = {}
+            with experiment._stage("bring_up"):
+                if not dry_run and session is not None:
+                    entered = await session._connect(components)
+                elif not dry_run:
+                    # the values view is live, so whatever comes up gets shut down
+                    stack.callback(_shut_down, entered.values(), device_timeout)
+                    await _bring_up(components, isolate, device_timeout, entered)
+            experiment._workers = {
+                c: m for c, m in entered.items() if isinstance(m, DeviceWorker)
+            }
+
+            # workers check their devices when they come up, so skip them here
             if not dry_run:
-                components = []
-                for component in experiment._compiled_protocol.keys():
-                    components.append(stack.enter_context(component))
-            else:
-                components = list(experiment._compiled_protocol.keys())
+                try:
+                    with experiment._stage("validate"):
+                        await _preflight(
+                            [c for c in components if c not in experiment._workers],
+                            device_timeout,
+                        )
+                except RuntimeError:
+                    experiment._failed_components.update(components)
+                    raise
+            # when resuming, pick up where the protocol would be
+            if start_at:
+                with experiment._stage("restore"):
+                    await _restore(components, experiment, dry_run, start_at)
+
+            end_time = experiment._compiled_protocol.end_time
+            logger.trace(f"Calculated end time as {end_time}s")
             for component in components:
-                # Find out when each component's monitoring should end
-                procedures: Iterable = experiment._compiled_protocol[component]
-                end_times: List[float] = [p["time"] for p in procedures]
-                end_time: float = max(end_times)  # we only want the last end time
-                logger.trace(f"Calculated end time for {component} as {end_time}s")
+                # slow devices get their setpoints from their own task, so that
+                # rapid ones can be coalesced without holding up the schedule
+                slot = None
+                if component._coalesce_window and not dry_run:
+                    slot = _SetpointSlot(component, experiment, strict)
+                    tasks.append(slot.run())
+
+                # the procedures are expanded one at a time as they come due
+                tasks.append(
+                    _execute_schedule(
+                        procedures=experiment._compiled_protocol.remaining(
+                            component, start_at
+                        ),
+                        component=component,
+                        experiment=experiment,
+                        dry_run=dry_run,
+                        strict=strict,
+                        start_at=start_at,
+                        slot=slot,
+                    )
+                )
+                logger.trace(f"Task generated for {component}.")
 
-                for procedure in experiment._compiled_protocol[component]:
+                # for sensors, add the monitor task
+                if isinstance(component, Sensor) and component in experiment._workers:
+                    logger.trace(f"Creating worker monitoring task for {component}")
                     tasks.append(
-                        wait_and_execute_procedure(
-                            procedure=procedure,
-                            component=component,
-                            experiment=experiment,
-                            dry_run=dry_run,
-                            strict=strict,
+                        _monitor_worker(
+                            component,
+                            experiment._workers[component],
+                            experiment,
+                            strict,
                         )
                     )
-                logger.trace(f"Task list generated for {component}.")
-
-                # for sensors, add the monitor task
-                if isinstance(component, Sensor):
+                elif isinstance(component, Sensor):
                     logger.trace(f"Creating sensor monitoring task for {component}")
                     tasks.append(_monitor(component, experiment, bool(dry_run), strict))
                 logger.debug(f"{component} is GO!")
@@ -91,6 +172,7 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
             logger.info("All checks passed. Experiment is GO!")
             experiment.is_executing = True
             experiment.start_time = time.time()
+            experiment.setup_duration = experiment.start_time - setup_start
 
             # convert to local time for the start message
             _local_time = asctime(localtime(experiment.start_time))
@@ -98,6 +180,10 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
 
             logger.success(start_msg)
 
+            # the lag is measured until the experiment is over, however it ends
+            if experiment.metrics is not None:
+                lag_watcher = asyncio.ensure_future(experiment.metrics._watch_loop())
+
             try:
                 done, pending = await asyncio.wait(
                     tasks, return_when=asyncio.FIRST_EXCEPTION
@@ -106,26 +192,35 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
                 # when this code block is reached, the tasks will have either all completed or
                 # an exception has occurred.
                 experiment.end_time = time.time()
+                teardown_start = experiment.end_time
+                if lag_watcher is not None:
+                    lag_watcher.cancel()
+                if experiment.metrics is not None:
+                    experiment.metrics.add(
+                        "run", experiment.end_time - experiment.start_time
+                    )
 
                 # when this code block is reached, the tasks will have completed or have been cancelled.
                 _local_time = asctime(localtime(experiment.end_time))
                 end_msg = f"{experiment} completed at {_local_time}."
 
-                # Stop all of the sensors and exit the read loops
-                logger.debug("Resetting all components")
-
-                # reset object
-                for component in list(experiment._compiled_protocol.keys()):
-                    # reset object
-                    logger.debug(f"Resetting {component} to base state")
-                    component._update_from_params(component._base_state)
-
-                await asyncio.sleep(1)
-
-                # Cancel all of the remaining tasks
+                # Cancel all of the remaining tasks and wait for them to stop, so that
+                # none of them can send a setpoint after the components are reset
                 logger.debug("Cancelling all remaining tasks")
                 for task in pending:
                     task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+                # Stop all of the sensors and exit the read loops
+                logger.debug("Resetting all components")
+
+                # reset all of the components at once
+                await asyncio.gather(
+                    *[
+                        _reset(component, experiment, dry_run, device_timeout)
+                        for component in components
+                    ]
+                )
 
                 # Raise exceptions, if any
                 logger.debug("Raising exceptions, if any")
@@ -151,6 +246,30 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
                 logger.error("Protocol execution is stopping NOW!")
                 logger.critical(end_msg)
     finally:
+        if teardown_start is not None:
+            experiment.teardown_duration = time.time() - teardown_start
+        if lag_watcher is not None:
+            lag_watcher.cancel()
+        if experiment.metrics is not None:
+            if experiment.setup_duration is not None:
+                experiment.metrics.add("setup", experiment.setup_duration)
+            if experiment.teardown_duration is not None:
+                experiment.metrics.add("teardown", experiment.teardown_duration)
+
+        experiment.skipped_updates = {c.name: c._skipped_updates for c in components}
+        experiment.coalesced_updates = {
+            c.name: c._coalesced_updates for c in components
+        }
+        skipped = sum(experiment.skipped_updates.values())
+        coalesced = sum(experiment.coalesced_updates.values())
+        if skipped or coalesced:
+            logger.info(
+                f"Skipped {skipped} redundant and coalesced {coalesced} rapid updates."
+            )
+
+        # the session will reconnect misbehaving components before their next use
+        if session is not None:
+            session._unhealthy.update(experiment._failed_components)
 
         # set some protocol metadata
         experiment.was_executed = True
@@ -162,6 +281,295 @@ async def main(experiment: "Experiment", dry_run: Union[bool, int], strict: bool
         if experiment._bound_logger is not None:
             logger.trace("Deactivating logging to Jupyter notebook widget...")
             logger.remove(experiment._bound_logger)
+            if experiment._widget_log is not None:
+                experiment._widget_log.flush()
+
+        if experiment.metrics is not None:
+            experiment._write_metrics()
+
+
+async def _bring_up(
+    components: Iterable[ActiveComponent],
+    isolate: Collection[ActiveComponent],
+    timeout: float,
+    entered: Dict[ActiveComponent, Any],
+) -> None:
+    """
+    Enters the contexts of the components concurrently, each in its own thread.
+
+    Every context that is entered is recorded in `entered`, even if bring-up fails for other components, so that the caller can shut them all down.
+
+    Arguments:
+    - `components`: The components to bring up.
+    - `isolate`: The components to host in their own worker processes.
+    - `timeout`: How long, in seconds, each component gets to come up.
+    - `entered`: Where to record each component's context manager (the component itself or its `DeviceWorker`) once it is up.
+
+    Raises:
+    - `RuntimeError`: When any of the components fail to come up.
+    """
+    managers = {
+        c: DeviceWorker(c, timeout=timeout) if c in isolate else c for c in components
+    }
+
+    # a dedicated pool, so that hung drivers can't starve the default executor
+    executor = ThreadPoolExecutor(max_workers=max(len(managers), 1))
+
+    async def enter(component, manager):
+        future = executor.submit(manager.__enter__)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            # if it does eventually come up, don't leave it dangling
+            def late_exit(f):
+                if f.exception() is None:
+                    manager.__exit__(None, None, None)
+
+            future.add_done_callback(late_exit)
+            raise RuntimeError(f"{component} did not come up within {timeout}s.")
+        except Exception as e:
+            raise RuntimeError(f"{component} failed to come up. Got error: '{e}'.")
+        entered[component] = manager
+        # whatever state the device was left in before, we don't know it now
+        component._acknowledged_state = None
+        logger.debug(f"{component} is up.")
+
+    results = await asyncio.gather(
+        *[enter(c, m) for c, m in managers.items()], return_exceptions=True
+    )
+    executor.shutdown(wait=False)
+
+    errors = [str(result) for result in results if isinstance(result, Exception)]
+    if errors:
+        for error in errors:
+            logger.error(error)
+        raise RuntimeError(" ".join(errors))
+
+
+async def _preflight(components: Iterable[ActiveComponent], timeout: float) -> None:
+    """
+    Checks all of the components' devices at once, giving each up to `timeout` seconds.
+
+    The components' contexts must already have been entered.
+
+    Raises:
+    - `RuntimeError`: When any of the components are invalid, listing all of them.
+    """
+
+    async def check(component):
+        try:
+            await asyncio.wait_for(component._check(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"{component} did not respond within {timeout}s.")
+        except Exception as e:
+            raise RuntimeError(f"{component} isn't valid. Got error: '{str(e)}'.")
+        logger.debug(f"{repr(component)} is valid")
+
+    results = await asyncio.gather(
+        *[check(c) for c in components], return_exceptions=True
+    )
+
+    errors = [str(result) for result in results if isinstance(result, Exception)]
+    if errors:
+        for error in errors:
+            logger.error(error)
+        raise RuntimeError(" ".join(errors))
+
+
+def _shut_down(managers: Iterable[Any], timeout: float) -> None:
+    """Exits the contexts of the components concurrently, giving each up to `timeout` seconds."""
+    managers = list(managers)
+    if not managers:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=len(managers))
+    futures = {executor.submit(m.__exit__, None, None, None): m for m in managers}
+    done, not_done = wait_for_futures(futures, timeout=timeout)
+    executor.shutdown(wait=False)
+
+    for future in done:
+        if future.exception() is not None:
+            logger.warning(
+                f"Failed to shut down {futures[future]}. Got error: '{future.exception()}'."
+            )
+    for future in not_done:
+        logger.warning(f"{futures[future]} did not shut down within {timeout}s.")
+
+
+async def _reset(
+    component: ActiveComponent,
+    experiment: "Experiment",
+    dry_run: Union[bool, int],
+    timeout: float,
+) -> None:
+    """Returns a component to its base state, giving up after `timeout` seconds."""
+    logger.debug("Resetting {} to base state", component)
+    component._update_from_params(component._base_state)
+    if dry_run:
+        return
+    try:
+        await asyncio.wait_for(_update(component, experiment), timeout=timeout)
+    except asyncio.TimeoutError:
+        experiment._failed_components.add(component)
+        logger.warning(f"{component} did not reset within {timeout}s.")
+    except Exception as e:
+        experiment._failed_components.add(component)
+        logger.warning(f"Failed to reset {component}. Got error: '{e}'.")
+
+
+async def _execute_schedule(
+    procedures: Iterable,
+    component: ActiveComponent,
+    experiment: "Experiment",
+    dry_run: Union[bool, int],
+    strict: bool,
+    start_at: float = 0.0,
+    slot: Optional["_SetpointSlot"] = None,
+) -> None:
+    """
+    Executes a component's procedures in order.
+
+    Procedures are only read from the schedule as they come due, so a `RepeatedSchedule` is never expanded in memory.
+    When resuming at `start_at`, anything at or before then has already been restored.
+    If given a `slot`, the setpoints are handed to it rather than sent to the device directly, and it's closed once they've all been handed over.
+    """
+    try:
+        for procedure in procedures:
+            for sample in _sample(procedure, component):
+                if start_at and sample["time"] <= start_at:
+                    continue
+                await wait_and_execute_procedure(
+                    procedure=sample,
+                    component=component,
+                    experiment=experiment,
+                    dry_run=dry_run,
+                    strict=strict,
+                    slot=slot,
+                )
+    finally:
+        if slot is not None:
+            slot.close()
+
+
+class _SetpointSlot(object):
+    """
+    Holds the latest setpoint for a component whose updates are coalesced, and sends it from its own task.
+
+    The component's attributes are the setpoint, so the slot only keeps track of whether there's one waiting to be sent.
+    Once one comes in, the slot waits for the component's `_coalesce_window` and then sends whatever the latest setpoint is by then, so the ones in between are never sent.
+    Meanwhile, the schedule carries on without waiting for the device.
+    """
+
+    def __init__(
+        self, component: ActiveComponent, experiment: "Experiment", strict: bool
+    ):
+        self.component = component
+        self.experiment = experiment
+        self.strict = strict
+        self._pending = False
+        self._closed = False
+        self._wake = asyncio.Event()
+
+    def put(self) -> None:
+        """Marks the component's current state as the setpoint to send, replacing any that hasn't been sent yet."""
+        if self._pending:
+            self.component._coalesced_updates += 1
+            logger.trace("Coalesced update for {!r}.", self.component)
+        self._pending = True
+        self._wake.set()
+
+    def close(self) -> None:
+        """Sends the last setpoint, if any, without waiting, and then stops."""
+        self._closed = True
+        self._wake.set()
+
+    async def run(self) -> None:
+        while True:
+            await self._wake.wait()
+            if self._pending and not self._closed:
+                # give way to any setpoints that come in the meantime
+                await asyncio.sleep(self.component._coalesce_window)
+            self._wake.clear()
+            if self._pending:
+                self._pending = False
+                await _send(self.component, self.experiment, self.strict)
+            if self._closed and not self._pending:
+                return
+
+
+def _sample(procedure, component: ActiveComponent) -> Iterator[Dict[str, Any]]:
+    """
+    Expands a procedure with setpoint programs into the setpoints to send, as they're needed.
+
+    Each program is sampled at its own interval, but never more often than the component's `_sample_interval`.
+    Procedures without programs are passed through as they are.
+    """
+    params = procedure["params"]
+    programs = {k: v for k, v in params.items() if isinstance(v, SetpointProgram)}
+    if not programs:
+        yield procedure
+        return
+
+    duration = procedure["duration"]
+    times = heapq.merge(
+        *[
+            program._sample_times(
+                duration, max(program.interval or 0.0, component._sample_interval)
+            )
+            for program in programs.values()
+        ]
+    )
+    previous = None
+    for t in times:
+        if previous is not None and isclose(t, previous):
+            continue
+        previous = t
+        yield dict(
+            time=procedure["time"] + t,
+            params={
+                k: programs[k](t, duration) if k in programs else v
+                for k, v in params.items()
+            },
+        )
+
+
+async def _restore(
+    components: Iterable[ActiveComponent],
+    experiment: "Experiment",
+    dry_run: Union[bool, int],
+    start_at: float,
+) -> None:
+    """
+    Sets every component to its state `start_at` seconds into the protocol, all at once.
+
+    Raises:
+    - `RuntimeError`: When any of the components can't be set, listing all of them.
+    """
+    logger.info(f"Resuming at {start_at}s into the protocol...")
+    states = experiment._compiled_protocol.state_at(start_at)
+
+    async def restore(component):
+        component._update_from_params(states[component])
+        logger.debug("Restoring {} to {}.", component, states[component])
+        if dry_run:
+            return
+        try:
+            await _update(component, experiment)
+        except Exception as e:
+            experiment._failed_components.add(component)
+            raise RuntimeError(f"Failed to restore {component}. Got error: '{e}'.")
+
+    results = await asyncio.gather(
+        *[restore(c) for c in components], return_exceptions=True
+    )
+
+    errors = [str(result) for result in results if isinstance(result, Exception)]
+    if errors:
+        for error in errors:
+            logger.error(error)
+        raise RuntimeError(" ".join(errors))
 
 
 async def wait_and_execute_procedure(
@@ -170,28 +578,25 @@ async def wait_and_execute_procedure(
     experiment: "Experiment",
     dry_run: Union[bool, int],
     strict: bool,
+    slot: Optional[_SetpointSlot] = None,
 ):
 
     # wait for the right moment
     params = procedure["params"]
-    await wait(procedure["time"], experiment, f"Set {component} to {params}")
+    await wait(procedure["time"], experiment, lambda: f"Set {component} to {params}")
 
     # NOTE: this doesn't actually call the _update() method
     component._update_from_params(params)
-    logger.trace(f"{component} object state updated to reflect new params.")
+    logger.trace("{} object state updated to reflect new params.", component)
 
     if dry_run:
-        logger.info(f"Simulating: {params} on {component} at {procedure['time']}s")
+        logger.info("Simulating: {} on {} at {}s", params, component, procedure["time"])
     else:
-        logger.info(f"Executing: {params} on {component} at {procedure['time']}s")
-        try:
-            await component._update()  # NOTE: This does!
-        except Exception as e:
-            level = "ERROR" if strict else "WARNING"
-            logger.log(level, f"Failed to update {component}!")
-            logger.trace(traceback.format_exc())
-            if strict:
-                raise RuntimeError(str(e))
+        logger.info("Executing: {} on {} at {}s", params, component, procedure["time"])
+        if slot is not None:
+            slot.put()
+        else:
+            await _send(component, experiment, strict)  # NOTE: This does!
 
     record = {
         "timestamp": time.time(),
@@ -202,6 +607,44 @@ async def wait_and_execute_procedure(
     record["experiment_elapsed_time"] = record["timestamp"] - experiment.start_time
 
     experiment.executed_procedures.append(record)
+    if experiment.metrics is not None:
+        experiment.metrics.procedures_dispatched += 1
+
+
+async def _send(
+    component: ActiveComponent, experiment: "Experiment", strict: bool
+) -> None:
+    """
+    Sends a component's setpoint to the device.
+
+    Raises:
+    - `RuntimeError`: When the update fails and `strict` is set. Otherwise, the failure is only logged.
+    """
+    try:
+        await _update(component, experiment)
+    except Exception as e:
+        experiment._failed_components.add(component)
+        level = "ERROR" if strict else "WARNING"
+        logger.log(level, "Failed to update {}!", component)
+        logger.trace(traceback.format_exc())
+        if strict:
+            raise RuntimeError(str(e))
+
+
+async def _update(component: ActiveComponent, experiment: "Experiment") -> None:
+    """
+    Pushes a component's state to the device, wherever the device is hosted.
+
+    Redundant updates are skipped by `ActiveComponent._request_update`.
+    Components running in a worker process are sent their whole state as of when the update is actually sent, so that nothing is lost to coalescing.
+    """
+    worker = experiment._workers.get(component)
+    if worker is None:
+        await component._request_update()
+    else:
+        await component._request_update(
+            lambda: worker.update(_picklable_state(component, component._state_keys))
+        )
 
 
 async def _monitor(
@@ -220,6 +663,44 @@ async def _monitor(
             )
         logger.debug(f"Stopped monitoring {sensor}")
     except Exception as e:
+        experiment._failed_components.add(sensor)
+        logger.log("ERROR" if strict else "WARNING", f"Failed to read {sensor}!")
+        logger.trace(traceback.format_exc())
+        if strict:
+            raise RuntimeError(str(e))
+
+
+async def _monitor_worker(
+    sensor: Sensor, worker: DeviceWorker, experiment: "Experiment", strict: bool
+):
+    logger.debug(f"Started monitoring {sensor.name} in its worker process")
+
+    async def ingest():
+        for timestamp, data in worker.drain():
+            await experiment._update(
+                device=sensor.name,
+                datapoint=Datapoint(
+                    data=data,
+                    timestamp=timestamp,
+                    experiment_elapsed_time=timestamp - experiment.start_time,
+                ),
+            )
+
+    try:
+        while not experiment._end_loop:
+            # keep the readings that a worker took before it died
+            alive = worker.is_alive()
+            await ingest()
+            if not alive:
+                logger.error(f"The worker process for {sensor} died.")
+                raise RuntimeError(f"The worker process for {sensor} died.")
+            await asyncio.sleep(0.05)
+
+        # pick up the readings taken since the last drain
+        await ingest()
+        logger.debug(f"Stopped monitoring {sensor}")
+    except Exception as e:
+        experiment._failed_components.add(sensor)
         logger.log("ERROR" if strict else "WARNING", f"Failed to read {sensor}!")
         logger.trace(traceback.format_exc())
         if strict:
@@ -250,21 +731,21 @@ async def pause_handler(
         if experiment.paused and not was_paused:
             was_paused = True
             for component in components:
-                logger.debug(f"Pausing {component}.")
-                states[component] = deepcopy(component.__dict__)
+                logger.debug("Pausing {}.", component)
+                states[component] = component._state()
                 component._update_from_params(component._base_state)
-                await component._update()
+                await _update(component, experiment)
             logger.debug("All components set to base states.")
-            logger.trace(f"Saved states are {states}.")
+            logger.trace("Saved states are {}.", states)
 
         # we are paused but the button was hit, so we need to resume
         elif not experiment.paused and was_paused:
-            logger.trace(f"Previous states: {states}")
+            logger.trace("Previous states: {}", states)
             for component in components:
                 for k, v in states[component].items():
                     setattr(component, k, v)
-                await component._update()
-                logger.debug(f"Reset {component} to {states[component]}.")
+                await _update(component, experiment)
+                logger.debug("Reset {} to {}.", component, states[component])
             was_paused = False
             states = {}
             logger.debug("All components reset to state before pause.")
@@ -272,12 +753,21 @@ async def pause_handler(
         await asyncio.sleep(0)
 
 
-async def wait(duration: float, experiment: "Experiment", name: str):
-    """A pause-aware version of asyncio.sleep"""
+async def wait(
+    duration: float, experiment: "Experiment", name: Union[str, Callable[[], str]]
+):
+    """
+    A pause-aware version of asyncio.sleep
+
+    Waits until `duration` seconds into the protocol, so it only sleeps for the time remaining.
+    `name` may be a function giving the name, so that it's only formatted if it's logged.
+    """
+    describe = name if callable(name) else lambda: name
+
+    # when resuming, the experiment started partway through the protocol
+    duration -= experiment.start_at
     if type(experiment.dry_run) == int:
         duration /= experiment.dry_run
-    await asyncio.sleep(duration)
-    logger.trace(f"<{name}> Just woke up from {duration}s nap")
 
     while True:
         # if, at the end of sleeping, the experiment is paused, wait for it to resume
@@ -291,13 +781,19 @@ async def wait(duration: float, experiment: "Experiment", name: str):
         assert isinstance(experiment.start_time, float)  # make the type checker happy
         eet = time.time() - experiment.start_time - eet_offset
 
-        # do the logging thing
-        logger.trace(f"EET is {eet}")
-        logger.trace(f"<{name}> was supposed to execute after {duration}s")
+        # do the logging thing, but not on every wake-up
+        skipped = _wake_ups("wait")
+        if skipped is not None:
+            logger.trace("EET is {} ({} similar messages skipped)", eet, skipped)
+            logger.opt(lazy=True).trace(
+                "<{}> was supposed to execute after {}s", describe, lambda: duration
+            )
 
         if (duration - eet) > 0:
-            logger.trace(f"Waiting {duration - eet} more seconds")
+            if skipped is not None:
+                logger.trace("Waiting {} more seconds", duration - eet)
             await asyncio.sleep(duration - eet)
         else:
-            logger.trace(f"It's go time for <{name}>!")
+            if _wake_ups("go") is not None:
+                logger.opt(lazy=True).trace("It's go time for <{}>!", describe)
             break
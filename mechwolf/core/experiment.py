@@ -2,8 +2,20 @@ import asyncio
 import json
 import os
 import time
+from collections import deque
+from contextlib import nullcontext
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Collection,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Union,
+)
 from warnings import warn
 
 import aiofiles
@@ -14,15 +26,77 @@ from bokeh.resources import INLINE
 from IPython import get_ipython
 from IPython.display import display
 from loguru import logger
-from xxhash import xxh32
 
 from ..components import ActiveComponent, Sensor
 from .execute import main
+from .metrics import Metrics
 
 # handle the hard issue of circular dependencies
 if TYPE_CHECKING:
+    from .cache import ScheduleCache
     from .protocol import Protocol
     from .execute import Datapoint
+    from .worker import DeviceWorker
+
+
+class _WidgetLog(object):
+    """
+    A log sink that shows the last lines of the log in an `Output` widget.
+
+    Lines are buffered and the widget is redrawn at most once every `interval` seconds, so that a busy log doesn't hold up execution.
+    Only the last `max_lines` lines are kept, since the full log goes to the log file.
+    """
+
+    def __init__(
+        self,
+        widget: widgets.Output,
+        experiment: "Experiment",
+        max_lines: int = 1000,
+        interval: float = 0.25,
+    ):
+        self.widget = widget
+        self.experiment = experiment
+        self.interval = interval
+        self._lines: Deque[str] = deque(maxlen=max_lines)
+        self._last_flush = float("-inf")
+        self._scheduled = False
+
+        # .xxx in floats, but we don't want (cleanup) to look weird, so pad to at least its length
+        self._pad_length = max(
+            len(str(int(experiment.protocol._inferred_duration))) + 4, len("cleanup")
+        )
+
+    def __call__(self, message: str) -> None:
+        experiment = self.experiment
+        if experiment.is_executing and not experiment.was_executed:
+            elapsed_time = time.time() - experiment.start_time
+            prefix = f"{elapsed_time:0{self._pad_length}.3f}"
+        elif experiment.was_executed:
+            prefix = "cleanup".center(self._pad_length)
+        else:
+            prefix = "setup".center(self._pad_length)
+        self._lines.append(f"({prefix}) {message.rstrip()}")
+
+        wait = self._last_flush + self.interval - time.monotonic()
+        if wait <= 0:
+            self.flush()
+        elif not self._scheduled:
+            # make sure that the last lines are shown even if nothing else is logged
+            try:
+                asyncio.get_running_loop().call_later(wait, self.flush)
+                self._scheduled = True
+            except RuntimeError:  # they'll be shown by the next flush instead
+                pass
+
+    def flush(self) -> None:
+        """Redraws the widget with the lines logged so far."""
+        self._scheduled = False
+        self._last_flush = time.monotonic()
+        with self.experiment._stage("logging"):
+            text = "\n".join(self._lines) + "\n"
+            self.widget.outputs = (
+                {"name": "stdout", "output_type": "stream", "text": text},
+            )
 
 
 class Experiment(object):
@@ -38,15 +112,21 @@ class Experiment(object):
     Attributes:
     - `apparatus`: The apparatus upon which the experiment is conducted.
     - `cancelled`: Whether the experiment is cancelled.
+    - `coalesced_updates`: A dict of component names to how many of their updates were superseded by a newer one within their coalescing window and never sent.
     - `compiled_protocol`: The results of `protocol._compile()`.
     - `data`: A list of `Datapoint` namedtuples from the experiment's sensors.
     - `dry_run`: Whether the experiment is a dry run and, if so, by what factor it is sped up by.
     - `end_time`: The Unix time of the experiment's end.
     - `executed_procedures`: A list of the procedures that were executed during the experiment.
-    - `experiment_id`: The experiment's ID. By default, of the form `YYYY_MM_DD_HH_MM_SS_HASH`, where HASH is the 32-bit hexadecimal xxhash of the protocol's YAML.
+    - `experiment_id`: The experiment's ID. By default, of the form `YYYY_MM_DD_HH_MM_SS_HASH`, where HASH is the protocol's `content_hash`.
+    - `metrics`: How long each stage of execution took and counters of what happened, as a `Metrics` object. Only collected when executed with `profile=True`, and `None` otherwise.
     - `paused`: Whether the experiment is currently paused.
     - `protocol`: The protocol for which the experiment was conducted.
+    - `setup_duration`: How long, in seconds, it took to bring up the components before the experiment started.
+    - `skipped_updates`: A dict of component names to how many of their updates weren't sent because the device was already in the requested state.
+    - `start_at`: How many seconds into the protocol the experiment started, if it resumed partway through.
     - `start_time`: The Unix time of the experiment's is.
+    - `teardown_duration`: How long, in seconds, it took to reset and shut down the components after the experiment ended.
     """
 
     def __init__(self, protocol: "Protocol"):
@@ -62,6 +142,12 @@ class Experiment(object):
         self.start_time: float  # hasn't started until main() is called
         self.created_time = time.time()  # when the object was created (might be diff)
         self.end_time: float
+        self.start_at = 0.0
+        self.setup_duration: Optional[float] = None
+        self.teardown_duration: Optional[float] = None
+        self.skipped_updates: Dict[str, int] = {}
+        self.coalesced_updates: Dict[str, int] = {}
+        self.metrics: Optional[Metrics] = None
         self.data: Dict[str, List[Datapoint]] = {}
         self.cancelled = False
         self.was_executed = False
@@ -79,6 +165,7 @@ class Experiment(object):
         self._device_name_to_unit = {c.name: c._unit for c in self._sensors}
         self._sensor_names: List[str] = [s.name for s in self._sensors]
         self._bound_logger = None
+        self._widget_log: Optional[_WidgetLog] = None
         self._plot_height = 300
         self._is_executing = False
         self._paused = False
@@ -87,6 +174,9 @@ class Experiment(object):
         self._file_logger_id: Optional[int] = None
         self._log_file: Optional[Path] = None
         self._data_file: Optional[Path] = None
+        self._metrics_file: Optional[Path] = None
+        self._workers: Dict[ActiveComponent, "DeviceWorker"] = {}
+        self._failed_components: Set[ActiveComponent] = set()
         self._transformed_data: Dict[str, Dict[str, List[Datapoint]]] = {
             s: {"datapoints": [], "timestamps": []} for s in self._sensor_names
         }
@@ -97,12 +187,27 @@ class Experiment(object):
     def __repr__(self):
         return f"<Experiment {self.experiment_id}>"
 
+    def _stage(self, name: str):
+        """Times a stage of execution, if profiling. See `Metrics.stage`."""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.stage(name)
+
+    def _write_metrics(self) -> None:
+        assert self.metrics is not None
+        self.metrics._finish()
+        if self._metrics_file is not None:
+            self.metrics.write(self._metrics_file)
+            logger.info(f"Wrote metrics to {self._metrics_file.absolute()}")
+
     async def _update(self, device: str, datapoint):
 
         # If a chart has been registered to the device, update it.
         if device not in self.data:
             self.data[device] = []
         self.data[device].append(datapoint)
+        if self.metrics is not None:
+            self.metrics.datapoints_ingested += 1
 
         if self._data_file is not None:
             line = json.dumps(
@@ -114,8 +219,11 @@ class Experiment(object):
                     "unit": self.protocol.apparatus[device]._unit,
                 }
             )
-            async with aiofiles.open(self._data_file, "a+") as f:
-                await f.write(line + "\n")
+            with self._stage("data"):
+                async with aiofiles.open(self._data_file, "a+") as f:
+                    await f.write(line + "\n")
+            if self.metrics is not None:
+                self.metrics.bytes_written["data"] += len(line.encode()) + 1
 
         if get_ipython() is None:
             return
@@ -195,8 +303,15 @@ class Experiment(object):
         log_file_verbosity: Optional[str],
         log_file_compression: Optional[str],
         data_file: Union[str, bool, os.PathLike, None],
+        isolate: Collection[ActiveComponent] = (),
+        device_timeout: float = 10.0,
+        start_at: float = 0.0,
+        cache: Optional["ScheduleCache"] = None,
+        profile: bool = False,
     ):
         self.dry_run = dry_run
+        self.start_at = start_at
+        self.metrics = Metrics() if profile else None
 
         # make the user confirm if it's the real deal
         if not self.dry_run and not confirm:
@@ -205,11 +320,17 @@ class Experiment(object):
                 logger.critical("Aborting execution...")
                 raise RuntimeError("Execution aborted by user.")
 
-        self._compiled_protocol = self.protocol._compile(dry_run=bool(dry_run))
+        # reuse the connections of an active session, if there is one
+        session = self.apparatus._session
+        if session is not None and isolate:
+            warn("Ignoring isolate since the session's own setting takes precedence.")
+
+        # the devices are checked by main() all at once, after they've been connected
+        with self._stage("compile"):
+            self._compiled_protocol = self.protocol._compile(cache=cache)
 
         # now that we're ready to start, create the time and ID attributes
-        protocol_hash: str = xxh32(str(self.protocol.yaml())).hexdigest()
-        self.experiment_id = f"{self._created_time_local}_{protocol_hash}"
+        self.experiment_id = f"{self._created_time_local}_{self.protocol.content_hash}"
 
         # handle logging to a file
         if log_file:
@@ -246,6 +367,11 @@ class Experiment(object):
             else:
                 self._log_file = Path(log_file)
 
+            if profile:
+                self._metrics_file = self._log_file.with_name(
+                    self.experiment_id + ".metrics.json"
+                )
+
         if data_file:
             # automatically log to the mw directory
             if data_file is True:
@@ -267,9 +393,29 @@ class Experiment(object):
 
         if get_ipython():
             self._display(verbosity=verbosity.upper(), strict=strict)
-            asyncio.ensure_future(main(experiment=self, dry_run=dry_run, strict=strict))
+            asyncio.ensure_future(
+                main(
+                    experiment=self,
+                    dry_run=dry_run,
+                    strict=strict,
+                    isolate=isolate,
+                    device_timeout=device_timeout,
+                    session=session,
+                    start_at=start_at,
+                )
+            )
         else:
-            asyncio.run(main(experiment=self, dry_run=dry_run, strict=strict))
+            asyncio.run(
+                main(
+                    experiment=self,
+                    dry_run=dry_run,
+                    strict=strict,
+                    isolate=isolate,
+                    device_timeout=device_timeout,
+                    session=session,
+                    start_at=start_at,
+                )
+            )
 
     def _display(self, verbosity: str, strict: bool):
 
@@ -337,24 +483,10 @@ class Experiment(object):
             ]
         )
 
-        def _log(x):
-            with self._log_widget:  # the log
-                # .xxx in floats
-                pad_length = len(str(int(self.protocol._inferred_duration))) + 4
-                # we don't (cleanup) to look weird, so pad to at least its length
-                pad_length = max((pad_length, len("cleanup")))
-
-                if self.is_executing and not self.was_executed:
-                    elapsed_time = f"{time.time() - self.start_time:0{pad_length}.3f}"
-                    print(f"({elapsed_time}) {x.rstrip()}")
-                elif self.was_executed:
-                    print(f"({'cleanup'.center(pad_length)}) {x.rstrip()}")
-                else:
-                    print(f"({'setup'.center(pad_length)}) " + x.rstrip())
-
         # don't enqueue since it breaks the graphing
+        self._widget_log = _WidgetLog(self._log_widget, self)
         self._bound_logger = logger.add(
-            lambda x: _log(x),
+            self._widget_log,
             level=verbosity,
             colorize=True,
             format="{level.icon} {message}",
@@ -371,8 +503,15 @@ class Experiment(object):
         if not is_executing and self._file_logger_id is not None:
             logger.info("Wrote logs to " + str(self._log_file.absolute()))
             logger.trace(f"Removing generated file logger {self._file_logger_id}")
-            logger.remove(self._file_logger_id)
+            # this waits for the queued messages to be written
+            with self._stage("logging"):
+                logger.remove(self._file_logger_id)
             logger.trace("File logger removed")
+            if self.metrics is not None:
+                try:
+                    self.metrics.bytes_written["log"] = self._log_file.stat().st_size
+                except FileNotFoundError:  # nothing was logged at that level
+                    pass
             # ensure that an execution without logging after one with it doesn't break
             self._log_file = None
             self._file_logger_id = None
@@ -383,9 +522,9 @@ class Experiment(object):
         # this deactivates sensor monitoring and button usability
         if not is_executing:
             self._end_loop = True
-            logger.trace(f"_end_loop for {self} is now True.")
+            logger.trace("_end_loop for {} is now True.", self)
 
-        logger.trace(f"{repr(self)}.is_executing is now {is_executing}")
+        logger.trace("{!r}.is_executing is now {}", self, is_executing)
         self._is_executing = is_executing
 
     @property
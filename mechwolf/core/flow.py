@@ -0,0 +1,303 @@
+from collections import namedtuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+
+from .. import _ureg
+from ..components import ActiveComponent, Component, Pump, Valve
+from .setpoints import SetpointProgram
+
+if TYPE_CHECKING:
+    from .apparatus import Apparatus, Connection
+
+Route = namedtuple("Route", ["source", "sink", "connections", "conditions"])
+
+CompiledProtocol = Mapping[ActiveComponent, Sequence[Mapping[str, Any]]]
+
+
+def _valve_condition(valve: Valve, other: Component) -> Optional[int]:
+    """The setting `valve` needs for fluid to pass between it and `other`, if it matters."""
+    if valve.mapping and other in valve.mapping:
+        return valve.mapping[other]
+    return None
+
+
+def _average(procedure: Mapping[str, Any], attr: str, convert: Callable[[Any], float]):
+    """The value of a parameter, averaged over the procedure if it's a setpoint program."""
+    value = procedure["params"][attr]
+    if not isinstance(value, SetpointProgram):
+        return convert(value)
+    duration = procedure["duration"]
+    # the midpoints of equal slices of the procedure
+    times = (np.arange(100) + 0.5) * duration / 100
+    return float(np.mean([convert(value(t, duration)) for t in times]))
+
+
+def _magnitude(value: Any, units: str) -> float:
+    """Converts a quantity, or a string of one, to a float in the given units."""
+    if isinstance(value, str):
+        value = _ureg.parse_expression(value)
+    return float(value.to(units).magnitude)
+
+
+class FlowPaths(object):
+    """
+    An index of the routes through an apparatus and the valve settings that open them.
+
+    Routes go from each component that nothing flows into (usually a reagent `Vessel`) to each component that nothing flows out of (usually the output).
+    They are enumerated once when the index is built, and the routes that are open for each combination of valve settings are cached as they're asked for.
+
+    ::: tip
+    Use `Apparatus.flow_paths` rather than creating this directly, so that the index is shared until the apparatus changes.
+    :::
+
+    Arguments:
+    - `apparatus`: The apparatus to index.
+
+    Attributes:
+    - `apparatus`: The indexed apparatus.
+    - `routes`: Every route through the apparatus, regardless of valve settings, as `Route` namedtuples of `(source, sink, connections, conditions)`, where `conditions` is a dict of the valves along the route to the setting each must have for the route to be open.
+    """
+
+    def __init__(self, apparatus: "Apparatus"):
+        self.apparatus = apparatus
+        self.routes: List[Route] = []
+        self._valves: List[Valve] = sorted(apparatus[Valve], key=lambda x: x.name)
+        self._pumps: List[Pump] = sorted(apparatus[Pump], key=lambda x: x.name)
+        self._connections: List["Connection"] = list(apparatus.network)
+        self._volumes = np.array(
+            [_magnitude(c.tube.volume, "mL") for c in self._connections]
+        )
+        self._open_routes: Dict[Tuple[int, ...], List[Route]] = {}
+        self._incidence: Dict[Tuple[int, ...], Tuple[np.ndarray, np.ndarray]] = {}
+
+        sources = [c for c in apparatus.components if c not in apparatus._upstream]
+        for source in sorted(sources, key=lambda x: x.name):
+            self._walk(source, [], {source})
+
+    def __repr__(self):
+        return f"<FlowPaths over {repr(self.apparatus)} with {len(self.routes)} routes>"
+
+    def _walk(self, component: Component, path: List["Connection"], seen: set) -> None:
+        """Enumerates the simple paths from the start of `path` to the sinks, depth first."""
+        downstream = self.apparatus._downstream.get(component, [])
+        if not downstream:
+            if path:
+                self._add_route(path)
+            return
+
+        for connection in downstream:
+            if connection.to_component in seen:
+                continue
+            seen.add(connection.to_component)
+            self._walk(connection.to_component, path + [connection], seen)
+            seen.remove(connection.to_component)
+
+    def _add_route(self, path: List["Connection"]) -> None:
+        conditions: Dict[Valve, int] = {}
+        for connection in path:
+            ends = [connection.from_component, connection.to_component]
+            for valve, other in [ends[::-1], ends]:
+                if not isinstance(valve, Valve):
+                    continue
+                setting = _valve_condition(valve, other)
+                if setting is None:
+                    continue
+                # a route that needs a valve in two positions at once is never open
+                if conditions.setdefault(valve, setting) != setting:
+                    return
+
+        self.routes.append(
+            Route(
+                source=path[0].from_component,
+                sink=path[-1].to_component,
+                connections=tuple(path),
+                conditions=conditions,
+            )
+        )
+
+    def open_routes(
+        self, settings: Optional[Mapping[Valve, int]] = None
+    ) -> List[Route]:
+        """
+        Finds the routes that are open for some valve settings.
+
+        Arguments:
+        - `settings`: A dict of valves to their integer settings. Valves that aren't given are taken to be at their current setting.
+
+        Returns:
+        - The open routes, as `Route` namedtuples.
+        """
+        settings = settings or {}
+        key = tuple(settings.get(valve, valve.setting) for valve in self._valves)
+        return self._open_routes_for(key)
+
+    def _open_routes_for(self, key: Tuple[int, ...]) -> List[Route]:
+        if key not in self._open_routes:
+            positions = dict(zip(self._valves, key))
+            self._open_routes[key] = [
+                route
+                for route in self.routes
+                if all(positions[v] == s for v, s in route.conditions.items())
+            ]
+        return self._open_routes[key]
+
+    def _incidence_for(self, key: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Matrices of which connections each pump drives fluid through, (pumps x connections), and which connections make up each open route, (routes x connections), for some valve settings.
+        """
+        if key not in self._incidence:
+            routes = self._open_routes_for(key)
+            index = {c: i for i, c in enumerate(self._connections)}
+            pumps = np.zeros((len(self._pumps), len(self._connections)))
+            members = np.zeros((len(routes), len(self._connections)))
+            for i, route in enumerate(routes):
+                columns = [index[c] for c in route.connections]
+                members[i, columns] = 1
+                on_route = {c.from_component for c in route.connections}
+                for j, pump in enumerate(self._pumps):
+                    if pump in on_route:
+                        pumps[j, columns] = 1
+            self._incidence[key] = (pumps, members)
+        return self._incidence[key]
+
+    def _timeline(self, compiled: CompiledProtocol):
+        """
+        Splits a compiled protocol into intervals during which no component changes state.
+
+        Setpoint programs are treated as holding their average value for the whole procedure.
+
+        Returns:
+        - The start and stop times of the intervals, the pumps' rates in mL/min as an (intervals x pumps) array, and the valves' settings as an (intervals x valves) array.
+        """
+        breakpoints = np.unique(
+            [p["time"] for procedures in compiled.values() for p in procedures]
+        )
+        starts, stops = breakpoints[:-1], breakpoints[1:]
+
+        def states(components, attr: str, convert: Callable[[Any], float]):
+            result = np.zeros((len(starts), len(components)))
+            for j, component in enumerate(components):
+                procedures = [
+                    p for p in compiled.get(component, []) if attr in p["params"]
+                ]
+                base = component._base_state.get(attr, getattr(component, attr))
+                values = [convert(base)] + [
+                    _average(p, attr, convert) for p in procedures
+                ]
+                times = [p["time"] for p in procedures]
+                # index 0 is the base state, before the component's first procedure
+                indices = np.searchsorted(times, starts, side="right")
+                result[:, j] = np.array(values)[indices]
+            return result
+
+        rates = states(self._pumps, "rate", lambda x: _magnitude(x, "mL/min"))
+        settings = states(self._valves, "setting", int).astype(int)
+        return starts, stops, rates, settings
+
+    def _flows(self, compiled: CompiledProtocol):
+        """Computes the flow rate through every connection in every interval, grouping the intervals by valve settings."""
+        starts, stops, rates, settings = self._timeline(compiled)
+        flow = np.zeros((len(starts), len(self._connections)))
+        groups = []
+        if len(starts):
+            if self._valves:
+                keys, inverse = np.unique(settings, axis=0, return_inverse=True)
+                inverse = inverse.reshape(-1)
+            else:
+                keys, inverse = settings[:1], np.zeros(len(starts), dtype=int)
+            for i, key in enumerate(keys):
+                rows = np.flatnonzero(inverse == i)
+                pumps, members = self._incidence_for(tuple(int(x) for x in key))
+                # pumps sharing a connection add up
+                flow[rows] = rates[rows] @ pumps
+                groups.append((rows, key))
+        return starts, stops, flow, groups
+
+    def segments(self, compiled: CompiledProtocol) -> pd.DataFrame:
+        """
+        Computes the flow through each connection of the apparatus over a compiled protocol.
+
+        The flow rate through a connection is the sum of the rates of the pumps along the open routes through it.
+
+        Arguments:
+        - `compiled`: The output of `Protocol._compile()`.
+
+        Returns:
+        - A DataFrame with a row for each connection with flow in each interval during which no component changes state.
+        The columns are `start` and `stop` (in seconds), `from_component` and `to_component` (by name), `volume` (in mL), `flow_rate` (in mL/min), and `residence_time` (in seconds).
+        """
+        starts, stops, flow, _ = self._flows(compiled)
+        rows, columns = np.nonzero(flow)
+        return pd.DataFrame(
+            {
+                "start": starts[rows],
+                "stop": stops[rows],
+                "from_component": [
+                    self._connections[j].from_component.name for j in columns
+                ],
+                "to_component": [
+                    self._connections[j].to_component.name for j in columns
+                ],
+                "volume": self._volumes[columns],
+                "flow_rate": flow[rows, columns],
+                "residence_time": self._volumes[columns] / flow[rows, columns] * 60,
+            }
+        )
+
+    def residence_times(self, compiled: CompiledProtocol) -> pd.DataFrame:
+        """
+        Computes how long it takes fluid to travel each open route over a compiled protocol.
+
+        Arguments:
+        - `compiled`: The output of `Protocol._compile()`.
+
+        Returns:
+        - A DataFrame with a row for each route with flow along its whole length in each interval during which no component changes state.
+        The columns are `start` and `stop` (in seconds), `source` and `sink` (by name), `dead_volume` (the total volume of the route's tubing, in mL), and `residence_time` (in seconds).
+        """
+        starts, stops, flow, groups = self._flows(compiled)
+        minutes_per_mL = np.divide(1, flow, out=np.zeros_like(flow), where=flow > 0)
+        stagnant = (flow == 0).astype(float)
+
+        frames = []
+        for rows, key in groups:
+            routes = self._open_routes_for(tuple(int(x) for x in key))
+            _, members = self._incidence_for(tuple(int(x) for x in key))
+            if not routes:
+                continue
+            residence = (self._volumes * minutes_per_mL[rows]) @ members.T * 60
+            flowing = stagnant[rows] @ members.T == 0
+            i, j = np.nonzero(flowing)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "start": starts[rows][i],
+                        "stop": stops[rows][i],
+                        "source": [routes[k].source.name for k in j],
+                        "sink": [routes[k].sink.name for k in j],
+                        "dead_volume": (members @ self._volumes)[j],
+                        "residence_time": residence[i, j],
+                    }
+                )
+            )
+
+        columns = ["start", "stop", "source", "sink", "dead_volume", "residence_time"]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return (
+            pd.concat(frames)
+            .sort_values(["start", "source", "sink"])
+            .reset_index(drop=True)
+        )
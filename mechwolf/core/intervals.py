@@ -0,0 +1,258 @@
+import heapq
+from bisect import bisect_right
+from collections import namedtuple
+from math import isclose
+from typing import Any, Dict, Generic, Iterable, List, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+Conflict = namedtuple("Conflict", ["kind", "component", "procedures", "message"])
+
+
+class IntervalIndex(Generic[T]):
+    """
+    A static index of half-open time intervals that finds those containing a given time.
+
+    The intervals are sorted by start, with a segment tree of the latest stop in each range of them on top.
+    Finding the `k` intervals that contain a time takes O(log n + k log n) time, however much they overlap.
+
+    Arguments:
+    - `intervals`: Tuples of `(start, stop, item)`.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[float, float, T]]):
+        self._intervals = sorted(intervals, key=lambda x: x[0])
+        self._starts = [x[0] for x in self._intervals]
+
+        # the tree is stored as an array, with the children of node i at 2i and 2i + 1
+        self._size = 1
+        while self._size < len(self._intervals):
+            self._size *= 2
+        self._max_stop = [float("-inf")] * (2 * self._size)
+        for i, (_, stop, _) in enumerate(self._intervals):
+            self._max_stop[self._size + i] = stop
+        for node in range(self._size - 1, 0, -1):
+            self._max_stop[node] = max(
+                self._max_stop[2 * node], self._max_stop[2 * node + 1]
+            )
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def at(self, time: float) -> List[T]:
+        """The items whose intervals contain `time`, in order of their starts."""
+        # only the intervals that start by then are candidates
+        end = bisect_right(self._starts, time)
+        found: List[int] = []
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, low, high = stack.pop()
+            if low >= end or self._max_stop[node] <= time:
+                continue
+            if node >= self._size:
+                found.append(low)
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * node + 1, middle, high))
+            stack.append((2 * node, low, middle))
+        return [self._intervals[i][2] for i in found]
+
+
+class ProcedureIndex(object):
+    """
+    An index of a protocol's procedures by component and time, which doesn't change the procedures.
+
+    Procedures without a stop time are taken to stop when the component's next procedure starts, or at `end`.
+
+    ::: tip
+    Use `Protocol.index` rather than creating this directly.
+    :::
+
+    Arguments:
+    - `procedures`: The procedures, as dicts with `component`, `start`, and `stop`.
+    - `end`: The time at which open-ended procedures that are last for their component stop, or `None` if it can't be inferred.
+    - `repeats`: Tuples of `(index, start, every, times)` for each repeated block, where `index` is the block's own `ProcedureIndex`.
+    """
+
+    def __init__(
+        self,
+        procedures: Iterable[Mapping[str, Any]],
+        end: Optional[float],
+        repeats: Iterable[Tuple["ProcedureIndex", float, float, int]] = (),
+    ):
+        self.end = end
+        self._repeats = list(repeats)
+
+        # each component's part of a repeated block stands in for its procedures in the block
+        procedures = list(procedures)
+        for block, start, every, times in self._repeats:
+            for component, (first, last) in block.spans().items():
+                procedures.append(
+                    dict(
+                        component=component,
+                        start=start + first,
+                        stop=start + (times - 1) * every + last,
+                        repeat=(block, start, every, times),
+                    )
+                )
+
+        self._by_component: Dict[Any, List[Mapping[str, Any]]] = {}
+        for procedure in sorted(procedures, key=self._start):
+            self._by_component.setdefault(procedure["component"], []).append(procedure)
+
+        # work out when each procedure stops without touching the procedures themselves
+        self._stops: Dict[int, Optional[float]] = {}
+        intervals = []
+        for component_procedures in self._by_component.values():
+            for i, procedure in enumerate(component_procedures):
+                stop = procedure["stop"]
+                if stop is None:
+                    try:
+                        stop = component_procedures[i + 1]["start"]
+                    except IndexError:
+                        stop = end
+                self._stops[id(procedure)] = stop
+                if stop is not None and "repeat" not in procedure:
+                    intervals.append((self._start(procedure), stop, procedure))
+        self._index: IntervalIndex[Mapping[str, Any]] = IntervalIndex(intervals)
+
+    @staticmethod
+    def _start(procedure: Mapping[str, Any]) -> float:
+        return procedure["start"] if procedure["start"] is not None else 0.0
+
+    def stop(self, procedure: Mapping[str, Any]) -> Optional[float]:
+        """When one of the indexed procedures stops, given or inferred, or `None` if it can't be inferred."""
+        return self._stops[id(procedure)]
+
+    def spans(self) -> Dict[Any, Tuple[float, float]]:
+        """The first start and last stop of each component's procedures, for components whose last stop is known."""
+        result = {}
+        for component, procedures in self._by_component.items():
+            last = max(
+                (self._stops[id(p)] for p in procedures),
+                key=lambda x: x if x is not None else float("inf"),
+            )
+            if last is not None:
+                result[component] = (self._start(procedures[0]), last)
+        return result
+
+    def at(self, time: float) -> List[Mapping[str, Any]]:
+        """
+        Finds the procedures in effect at a time, in O(log n) time per procedure found.
+
+        Arguments:
+        - `time`: The time, in seconds from the start of the protocol.
+
+        Returns:
+        - The procedures whose start is at or before `time` and whose stop is after it.
+        Procedures in repeated blocks are given as copies with their times shifted to the repetition in effect.
+        """
+        active = list(self._index.at(time))
+        for block, start, every, times in self._repeats:
+            i = int((time - start) // every) if every > 0 else 0
+            if not 0 <= i < times or time < start:
+                continue
+            offset = start + i * every
+            for procedure in block.at(time - offset):
+                stop = block.stop(procedure)
+                active.append(
+                    dict(
+                        procedure,
+                        start=block._start(procedure) + offset,
+                        stop=stop + offset if stop is not None else None,
+                    )
+                )
+        return active
+
+    def conflicts(self) -> List[Conflict]:
+        """
+        Finds every conflict between the procedures in one sweep through each component's procedures.
+
+        Returns:
+        - Namedtuples of `(kind, component, procedures, message)`, where `kind` is one of "continuous" (more than one procedure for the entire protocol), "ambiguous start" (procedures starting together where one doesn't have a stop time), "open-ended" (a procedure whose stop time can't be inferred), or "overlap" (two procedures at once), and `procedures` is a tuple of the conflicting procedures.
+        A repeated block is given as a dict with its `component`, `start`, `stop`, and `repeat`.
+        """
+        conflicts = []
+        for block, _, _, _ in self._repeats:
+            conflicts.extend(block.conflicts())
+
+        for component, procedures in self._by_component.items():
+            continuous = [
+                p for p in procedures if p["start"] is None and p["stop"] is None
+            ]
+            if len(continuous) > 1:
+                conflicts.append(
+                    Conflict(
+                        "continuous",
+                        component,
+                        tuple(continuous),
+                        f"{component} cannot have two procedures for the entire duration of the protocol. "
+                        "If each procedure defines a different attribute to be set for the entire duration, "
+                        "combine them into one call to add(). Otherwise, reduce ambiguity by defining start "
+                        "and stop times for each procedure.",
+                    )
+                )
+
+            # procedures that start together are next to each other once sorted
+            for first, second in zip(procedures, procedures[1:]):
+                if isclose(self._start(first), self._start(second)) and (
+                    first["stop"] is None or second["stop"] is None
+                ):
+                    conflicts.append(
+                        Conflict(
+                            "ambiguous start",
+                            component,
+                            (first, second),
+                            f"Ambiguous start time for {component}. Two procedures start "
+                            f"at {self._start(first)}s and one of them has no stop time.",
+                        )
+                    )
+
+            # sweep through the procedures, keeping those still running in a heap by stop time
+            running: List[Tuple[float, int, Mapping[str, Any]]] = []
+            for i, procedure in enumerate(procedures):
+                start, stop = self._start(procedure), self.stop(procedure)
+                if stop is None:
+                    conflicts.append(
+                        Conflict(
+                            "open-ended",
+                            component,
+                            (procedure,),
+                            f"Unable to infer when {component}'s procedure at {start}s stops. "
+                            "Must define stop or duration for at least one procedure.",
+                        )
+                    )
+                    continue
+                if stop < start and not isclose(stop, start):
+                    conflicts.append(
+                        Conflict(
+                            "open-ended",
+                            component,
+                            (procedure,),
+                            f"{component}'s procedure at {start}s has no stop time "
+                            f"but starts after the end of the protocol at {stop}s.",
+                        )
+                    )
+                    continue
+                while running and (
+                    running[0][0] <= start or isclose(running[0][0], start)
+                ):
+                    heapq.heappop(running)
+                for _, _, other in sorted(running, key=lambda x: x[1]):
+                    # these are already reported as ambiguous
+                    if isclose(self._start(other), start) and (
+                        other["stop"] is None or procedure["stop"] is None
+                    ):
+                        continue
+                    conflicts.append(
+                        Conflict(
+                            "overlap",
+                            component,
+                            (other, procedure),
+                            "Cannot have two overlapping procedures. "
+                            f"{component}'s procedures from {self._start(other)}s to {self.stop(other)}s "
+                            f"and from {start}s to {stop}s conflict.",
+                        )
+                    )
+                heapq.heappush(running, (stop, i, procedure))
+        return conflicts
@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+from typing import Dict, Hashable, Optional, Union
+
+from .units import _seconds
+
+
+class LogSampler(object):
+    """
+    Rate-limits frequent log messages, such as those logged every time an executing protocol wakes up.
+
+    Each kind of message, given by a key, is let through at most once every `interval` seconds.
+    Check with the sampler before logging, so that messages which are skipped aren't formatted at all.
+
+    Arguments:
+    - `interval`: The least time between messages with the same key, such as `"1 second"`. May also be a `datetime.timedelta` or a number of seconds.
+
+    Example:
+    ```python
+    sampler = LogSampler("1 second")
+    skipped = sampler("eet")
+    if skipped is not None:
+        logger.trace("EET is {} ({} similar messages skipped)", eet, skipped)
+    ```
+    """
+
+    def __init__(self, interval: Union[str, timedelta, float] = 1.0):
+        self.interval = _seconds(interval)
+        self._last: Dict[Hashable, float] = {}
+        self._skipped: Dict[Hashable, int] = {}
+
+    def __repr__(self):
+        return f"<LogSampler every {self.interval}s>"
+
+    def __call__(self, key: Hashable = None) -> Optional[int]:
+        """
+        Checks whether to log a message.
+
+        Arguments:
+        - `key`: The kind of message.
+
+        Returns:
+        - `None` if the message should be skipped, or else how many messages with the same key were skipped since the last one.
+        """
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._skipped[key] = self._skipped.get(key, 0) + 1
+            return None
+        self._last[key] = now
+        return self._skipped.pop(key, 0)
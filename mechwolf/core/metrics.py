@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Union
+
+
+class Metrics(object):
+    """
+    How long each stage of an experiment took, along with counters of what happened during it.
+
+    Metrics are only collected when executing with `profile=True`, in which case they're available as `Experiment.metrics` and are written next to the log file as `{experiment_id}.metrics.json`.
+
+    The stages are:
+    - `compile`: Compiling the protocol.
+    - `bring_up`: Connecting to the components.
+    - `validate`: Checking that the components are ready. Skipped for dry runs.
+    - `restore`: Setting the components to their states at `start_at`, when resuming.
+    - `setup`: Everything between starting execution and the experiment starting, including the three stages above.
+    - `run`: The experiment itself.
+    - `teardown`: Resetting and shutting down the components.
+    - `logging`: Writing to the Jupyter log widget and finishing writing the log file.
+    - `data`: Writing sensor data to the data file.
+    - `total`: From compiling the protocol to cleaning up after it.
+
+    Stages that didn't happen are left out.
+
+    Arguments:
+    - `lag_interval`: How often, in seconds, to check the event loop's lag while the experiment runs.
+
+    Attributes:
+    - `bytes_written`: A dict of how many bytes were written to the `"data"` and `"log"` files.
+    - `datapoints_ingested`: How many datapoints were received from the sensors.
+    - `lag_interval`: How often, in seconds, the event loop's lag is checked.
+    - `max_loop_lag`: The longest, in seconds, that the event loop was late to wake up.
+    - `mean_loop_lag`: The average, in seconds, of how late the event loop was to wake up.
+    - `procedures_dispatched`: How many procedures were executed, including each setpoint sent by a setpoint program.
+    - `stages`: A dict of stage names to how long they took, in seconds.
+    """
+
+    def __init__(self, lag_interval: float = 0.1):
+        self.lag_interval = lag_interval
+        self.stages: Dict[str, float] = {}
+        self.procedures_dispatched = 0
+        self.datapoints_ingested = 0
+        self.bytes_written = {"data": 0, "log": 0}
+        self.max_loop_lag = 0.0
+        self._total_loop_lag = 0.0
+        self._lag_samples = 0
+        self._created = time.perf_counter()
+
+    def __repr__(self):
+        stages = ", ".join(f"{k}={v:.3f}s" for k, v in self.stages.items())
+        return f"<Metrics {stages}>"
+
+    @property
+    def mean_loop_lag(self) -> float:
+        if not self._lag_samples:
+            return 0.0
+        return self._total_loop_lag / self._lag_samples
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the code within the block, adding it to the stage's duration."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, duration: float) -> None:
+        """Adds `duration` seconds to a stage."""
+        self.stages[name] = self.stages.get(name, 0.0) + duration
+
+    def _finish(self) -> None:
+        self.stages["total"] = time.perf_counter() - self._created
+
+    async def _watch_loop(self) -> None:
+        """Measures how late the event loop is to wake up, until cancelled."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(time.perf_counter() - start - self.lag_interval, 0.0)
+            self.max_loop_lag = max(self.max_loop_lag, lag)
+            self._total_loop_lag += lag
+            self._lag_samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+        - The metrics as a dict that can be serialized to JSON.
+        """
+        return dict(
+            stages=dict(self.stages),
+            procedures_dispatched=self.procedures_dispatched,
+            datapoints_ingested=self.datapoints_ingested,
+            bytes_written=dict(self.bytes_written),
+            loop_lag=dict(
+                max=self.max_loop_lag,
+                mean=self.mean_loop_lag,
+                samples=self._lag_samples,
+            ),
+        )
+
+    def write(self, path: Union[str, os.PathLike]) -> None:
+        """Writes the metrics to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
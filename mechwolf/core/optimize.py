@@ -0,0 +1,136 @@
+from collections import namedtuple
+from datetime import timedelta
+from math import isclose
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .units import _seconds
+
+Compaction = namedtuple("Compaction", ["protocol", "duration", "time_saved"])
+
+Procedure = Mapping[str, Any]
+Procedures = Union[Procedure, Sequence[Procedure]]
+
+
+def _as_list(procedures: Procedures) -> List[Procedure]:
+    if isinstance(procedures, Mapping):
+        return [procedures]
+    return list(procedures)
+
+
+def compact_schedule(
+    procedures: Sequence[Procedure],
+    dependencies: Iterable[Tuple] = (),
+    gap: Union[str, float, timedelta, None] = None,
+    open_ended: Iterable[int] = (),
+) -> List[float]:
+    """
+    Computes the earliest start time of each procedure subject to the constraints.
+
+    Procedures that overlap in time are meant to happen together, so each group of them keeps its internal timing.
+    Each component's procedures keep their order: those that touched still touch, and those that didn't are kept `gap` apart (or as far apart as they were, if `gap` is `None`) so that the component still returns to its base state between them.
+    Otherwise, procedures only wait for those they're declared to depend on.
+
+    Every constraint has the form `start[j] >= start[i] + offset`, so the earliest schedule, which is also the shortest, is given by the longest paths in the graph of constraints.
+
+    Arguments:
+    - `procedures`: The procedures, with definite `start` and `stop` times.
+    - `dependencies`: Tuples of `(before, after)` or `(before, after, gap)`, where `before` and `after` are procedures or lists of them, meaning that `after` can't start until `gap` (default zero) after `before` stops.
+    - `gap`: The minimum time between procedures on the same component that don't touch.
+    - `open_ended`: The indices of procedures whose stop time is inferred, which are treated as instantaneous.
+
+    Returns:
+    - The new start times of the procedures, in the same order.
+
+    Raises:
+    - `ValueError`: When a dependency refers to a procedure that isn't in the protocol or the constraints contradict each other.
+    """
+    index = {id(p): i for i, p in enumerate(procedures)}
+    open_ended = set(open_ended)
+    durations = [
+        0.0 if i in open_ended else p["stop"] - p["start"]
+        for i, p in enumerate(procedures)
+    ]
+    min_gap = None if gap is None else _seconds(gap)
+    if min_gap is not None and min_gap <= 0:
+        raise ValueError(
+            "gap must be positive so that components return to their base states."
+        )
+
+    # edges are (i, j, offset) meaning start[j] >= start[i] + offset
+    edges: List[Tuple[int, int, float]] = []
+    order = sorted(range(len(procedures)), key=lambda i: procedures[i]["start"])
+
+    # sweep through the procedures, grouping those that overlap
+    group_start: Optional[int] = None
+    group_stop = float("-inf")
+    for i in order:
+        start = procedures[i]["start"]
+        if (
+            group_start is not None
+            and start < group_stop
+            and not isclose(start, group_stop)
+        ):
+            offset = start - procedures[group_start]["start"]
+            edges.append((group_start, i, offset))
+            edges.append((i, group_start, -offset))
+        else:
+            group_start = i
+        group_stop = max(group_stop, start + durations[i])
+
+    by_component: Dict[Any, List[int]] = {}
+    for i in order:
+        by_component.setdefault(procedures[i]["component"], []).append(i)
+    for indices in by_component.values():
+        for before, after in zip(indices, indices[1:]):
+            spacing = procedures[after]["start"] - procedures[before]["stop"]
+            if before in open_ended or isclose(spacing, 0, abs_tol=1e-9):
+                spacing = 0.0
+            elif min_gap is not None:
+                spacing = min_gap
+            edges.append((before, after, durations[before] + spacing))
+
+    for dependency in dependencies:
+        if len(dependency) == 2:
+            before_procedures, after_procedures = dependency
+            spacing = 0.0
+        else:
+            before_procedures, after_procedures, spacing = dependency
+            spacing = _seconds(spacing)
+        for first in _as_list(before_procedures):
+            for second in _as_list(after_procedures):
+                for procedure in (first, second):
+                    if id(procedure) not in index:
+                        raise ValueError(f"{procedure} is not part of the protocol.")
+                i, j = index[id(first)], index[id(second)]
+                edges.append((i, j, durations[i] + spacing))
+
+    # Bellman-Ford, looking for the longest paths instead of the shortest
+    starts = [0.0] * len(procedures)
+    for _ in range(len(procedures) + 1):
+        changed = False
+        for i, j, offset in edges:
+            if starts[i] + offset > starts[j] + 1e-9:
+                starts[j] = starts[i] + offset
+                changed = True
+        if not changed:
+            return starts
+
+    raise ValueError(
+        "The procedures can't be scheduled. Check for circular dependencies "
+        "or dependencies between procedures that overlap."
+    )
+
+
+def makespan(
+    procedures: Sequence[Procedure],
+    starts: Sequence[float],
+    open_ended: Iterable[int] = (),
+) -> float:
+    """The time at which the last procedure with a definite stop time ends."""
+    open_ended = set(open_ended)
+    ends = [
+        start + (p["stop"] - p["start"])
+        for i, (p, start) in enumerate(zip(procedures, starts))
+        if i not in open_ended
+    ]
+    return max(ends, default=max(starts, default=0.0))
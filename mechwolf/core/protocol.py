@@ -3,7 +3,19 @@ import os
 from copy import deepcopy
 from datetime import timedelta
 from math import isclose
-from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional, Union
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from warnings import warn
 
 import altair as alt
@@ -12,11 +24,72 @@ import yaml
 from IPython import get_ipython
 from IPython.display import Code
 from loguru import logger
+from xxhash import xxh64_intdigest
 
 from .. import _ureg
 from ..components import ActiveComponent, TempControl, Valve
 from .apparatus import Apparatus
+from .cache import ScheduleCache
 from .experiment import Experiment
+from .intervals import Conflict, ProcedureIndex
+from .optimize import Compaction, compact_schedule, makespan
+from .schedule import CompiledSchedule, Event, RepeatedSchedule
+from .setpoints import Profile, SetpointProgram
+from .tracking import _ProcedureList
+from .units import _seconds
+
+# use LibYAML's C implementation when it's available
+_YAMLDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _hash(data: Mapping[str, Any]) -> int:
+    return xxh64_intdigest(json.dumps(data, sort_keys=True, default=str))
+
+
+def _aggregate_bars(source: pd.DataFrame, max_bars: int) -> pd.DataFrame:
+    """
+    Merges the short bars of a Gantt chart so that there are about `max_bars` of them.
+
+    The protocol is split into equal bins, and each component's bars that are shorter than a bin are merged with the others in their bin.
+    Since the longer bars of a component can't overlap, no component is left with more than about two bars per bin.
+    """
+    if len(source) <= max_bars:
+        return source
+    bins = max(max_bars // (2 * source["component"].nunique()), 1)
+    width = (source["stop"].max() - source["start"].min()) / bins
+    if not width > 0:
+        return source
+
+    # a short bar alone in its bin is left as it is
+    short = source["stop"] - source["start"] < width
+    bin = (source["start"] // width).where(short)
+    size = source.groupby([source["component"], bin])["start"].transform("size")
+    short &= size > 1
+    merged = (
+        source[short]
+        .assign(bin=bin[short])
+        .groupby(["component", "bin"], sort=False)
+        .agg(
+            start=("start", "min"),
+            stop=("stop", "max"),
+            procedures=("procedures", "sum"),
+        )
+        .reset_index()
+        .drop(columns="bin")
+    )
+    merged["params"] = merged["procedures"].astype(str) + " procedures"
+    return pd.concat([source[~short], merged], ignore_index=True, sort=False)
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError(
+            "msgpack is required for this. Install it with `pip install mechwolf[msgpack]`."
+        )
+    return msgpack
 
 
 class Protocol(object):
@@ -36,10 +109,12 @@ class Protocol(object):
 
     Attributes:
     - `apparatus`: The apparatus for which the protocol is being defined.
+    - `content_hash`: A hash of the protocol's procedures and repeated blocks, which doesn't depend on the order they were added in.
     - `description`: A longer description of the protocol.
     - `is_executing`: Whether the protocol is executing.
     - `name`: The name of the protocol. Defaults to "Protocol_X" where *X* is protocol count.
     - `procedures`: A list of the procedures for the protocol in which each procedure is a dict.
+    - `repeats`: A list of the repeated blocks in the protocol, added with `Protocol.repeat`, in which each block is a dict.
     - `was_executed`: Whether the protocol was executed.
     """
 
@@ -75,13 +150,24 @@ class Protocol(object):
             Protocol._id_counter += 1
 
         # default values
-        self.procedures: List[
-            Dict[str, Union[float, None, ActiveComponent, Dict[str, Any]]]
-        ] = []
+        # the procedures keep track of their own hashes, see content_hash
+        self._procedures = _ProcedureList()
+        self.repeats: List[Dict[str, Any]] = []
+        self._compiled: Dict[bool, Tuple[str, CompiledSchedule]] = {}
 
     def __repr__(self):
         return f"<{self.__str__()}>"
 
+    @property
+    def procedures(
+        self,
+    ) -> List[Dict[str, Union[float, None, ActiveComponent, Dict[str, Any]]]]:
+        return self._procedures
+
+    @procedures.setter
+    def procedures(self, procedures: Iterable[Mapping[str, Any]]) -> None:
+        self._procedures[:] = procedures
+
     def __str__(self):
         return f"Protocol {self.name} defined over {repr(self.apparatus)}"
 
@@ -115,6 +201,12 @@ class Protocol(object):
     def _check_component_kwargs(self, component: ActiveComponent, **kwargs) -> None:
         """Checks that the given keyword arguments are valid for a component."""
         for kwarg, value in kwargs.items():
+            # check a program's setpoints as if they were given directly
+            if isinstance(value, SetpointProgram):
+                for point in value._points():
+                    self._check_component_kwargs(component, **{kwarg: point})
+                continue
+
             # check that the component even has the attribute
             if not hasattr(component, kwarg):
                 # id nor determine valid attrs for the error message
@@ -130,6 +222,8 @@ class Protocol(object):
 
             # for kwargs that will be converted later, just check that the units match
             if isinstance(component.__dict__[kwarg], _ureg.Quantity):
+                # the dimensionality, or the type of values that aren't quantities
+                value_dim: object
                 try:
                     value_dim = _ureg.parse_expression(value).dimensionality
                 except AttributeError:
@@ -152,7 +246,7 @@ class Protocol(object):
 
     def _add_single(
         self, component: ActiveComponent, start=None, stop=None, duration=None, **kwargs
-    ) -> None:
+    ) -> Dict[str, Any]:
         """Adds a single procedure to the protocol.
 
         See add() for full documentation.
@@ -213,18 +307,31 @@ class Protocol(object):
                 )
 
         # add the procedure to the procedure list
+        return self._append(
+            component,
+            start=float(start.to_base_units().magnitude)
+            if start is not None
+            else start,
+            stop=float(stop.to_base_units().magnitude) if stop is not None else stop,
+            params=kwargs,
+        )
+
+    def _append(
+        self,
+        component: ActiveComponent,
+        start: Optional[float],
+        stop: Optional[float],
+        params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """
+        Appends a procedure that has already been checked, with its times in seconds.
+
+        This skips the parsing and validation in add(), so it's for generating large protocols in bulk.
+        """
         self.procedures.append(
-            dict(
-                start=float(start.to_base_units().magnitude)
-                if start is not None
-                else start,
-                stop=float(stop.to_base_units().magnitude)
-                if stop is not None
-                else stop,
-                component=component,
-                params=kwargs,
-            )
+            dict(start=start, stop=stop, component=component, params=params)
         )
+        return self.procedures[-1]
 
     def add(
         self,
@@ -246,7 +353,10 @@ class Protocol(object):
         - `start`: The start time of the procedure relative to the start of the protocol, such as `"5 seconds"`. May also be a `datetime.timedelta`. Defaults to `"0 seconds"`, *i.e.* the beginning of the protocol.
         - `stop`: The stop time of the procedure relative to the start of the protocol, such as `"30 seconds"`. May also be a `datetime.timedelta`. May not be given if `duration` is used.
         duration: The duration of the procedure, such as "1 hour". May not be used if `stop` is used.
-        - `**kwargs`: The state of the component for the procedure.
+        - `**kwargs`: The state of the component for the procedure. Values may also be a `SetpointProgram`, such as `Ramp("1 mL/min", "5 mL/min")`, to change over the course of the procedure.
+
+        Returns:
+        - The procedure that was added, as a dict, or a list of them if multiple components were given. These can be used to declare dependencies for `Protocol.compact`.
 
         Raises:
         - `TypeError`: A component is not of the correct type (*i.e.* a Component object)
@@ -255,20 +365,117 @@ class Protocol(object):
         """
 
         if isinstance(component, Iterable):
-            for _component in component:
+            return [
                 self._add_single(
                     _component, start=start, stop=stop, duration=duration, **kwargs
                 )
+                for _component in component
+            ]
         else:
-            self._add_single(
+            return self._add_single(
                 component, start=start, stop=stop, duration=duration, **kwargs
             )
 
+    def repeat(
+        self, block: "Protocol", times: int, start=None, every=None
+    ) -> Dict[str, Any]:
+        """
+        Repeats the procedures of another protocol as a block.
+
+        The block is stored once, no matter how many times it repeats.
+        It's only expanded into individual procedures as the protocol executes, so memory use and compile time don't depend on `times`.
+
+        ::: tip
+        Build the block as its own `Protocol` over the same apparatus, with times relative to the start of one repetition.
+        Changes to the block after it's added are reflected in the repeats.
+        :::
+
+        Arguments:
+        - `block`: The protocol whose procedures make up one repetition.
+        - `times`: How many times to run the block.
+        - `start`: When the first repetition starts relative to the start of the protocol, such as `"5 seconds"`. May also be a `datetime.timedelta`. Defaults to `"0 seconds"`, *i.e.* the beginning of the protocol.
+        - `every`: The time between the starts of consecutive repetitions, such as `"2 minutes"`. May also be a `datetime.timedelta`. Defaults to the duration of the block, so that each repetition starts as soon as the last one ends.
+
+        Returns:
+        - The repeated block, as a dict.
+
+        Raises:
+        - `TypeError`: The block is not a `Protocol` or `times` is not an integer.
+        - `ValueError`: The block is for a different apparatus, contains repeats of its own, or repeats more often than its duration allows.
+        """
+        if not isinstance(block, Protocol):
+            raise TypeError(
+                f"Must pass a Protocol object. Got {type(block)}, "
+                "which is not an instance of mechwolf.Protocol."
+            )
+        if block is self or block.apparatus is not self.apparatus:
+            raise ValueError(
+                f"{block} must be a different protocol for the same apparatus."
+            )
+        if block.repeats:
+            raise ValueError("Repeated blocks cannot contain repeats of their own.")
+        if not isinstance(times, int):
+            raise TypeError(f"times must be an int, not {type(times)}.")
+        if times < 1:
+            raise ValueError("Blocks must be repeated at least once.")
+
+        repeat = dict(
+            block=block,
+            start=_seconds(start),
+            every=_seconds(every) if every is not None else None,
+            times=times,
+        )
+        self._every(repeat)  # fail early if the timing doesn't work
+        self.repeats.append(repeat)
+        return repeat
+
+    @property
+    def content_hash(self) -> str:
+        """
+        A 64-bit hexadecimal xxhash of the protocol's procedures and repeated blocks.
+
+        Each procedure is hashed with its parameters in sorted order and, for a `Profile`, the identity of its function, and the hashes are summed, so the hash is independent of the order they were added in.
+        The procedures keep a running sum of their hashes as they're added, removed, or changed, including by editing their params in place, so only the ones that changed since the hash was last computed are hashed again.
+        Procedures put in `Protocol.procedures` directly are copied to keep track of them.
+        """
+        result = self._procedures._digest_sum(
+            lambda procedure: _hash(self._fingerprint(procedure))
+        )
+
+        # the blocks may have changed since they were added, so they're hashed each time
+        for repeat in self.repeats:
+            result += _hash(
+                dict(
+                    start=repeat["start"],
+                    every=repeat["every"],
+                    times=repeat["times"],
+                    block=repeat["block"].content_hash,
+                )
+            )
+        return f"{result % (1 << 64):016x}"
+
+    def _every(self, repeat: Mapping[str, Any]) -> float:
+        """The time in seconds between the starts of the repetitions of a repeated block."""
+        duration = repeat["block"]._inferred_duration
+        every = repeat["every"] if repeat["every"] is not None else duration
+        if every < duration and not isclose(every, duration):
+            raise ValueError(
+                f"Repeated block {repeat['block'].name} lasts {duration}s, "
+                f"so it can't be repeated every {every}s."
+            )
+        return every
+
     @property
     def _inferred_duration(self):
         # infer the duration of the protocol
         computed_durations = sorted(
-            [x["stop"] for x in self.procedures],
+            [x["stop"] for x in self.procedures]
+            + [
+                x["start"]
+                + (x["times"] - 1) * self._every(x)
+                + x["block"]._inferred_duration
+                for x in self.repeats
+            ],
             key=lambda z: z if z is not None else 0,
         )
         if all([x is None for x in computed_durations]):
@@ -279,155 +486,448 @@ class Protocol(object):
         return computed_durations[-1]
 
     def _compile(
-        self, dry_run: bool = True, _visualization: bool = False
-    ) -> Dict[ActiveComponent, List[Dict[str, Union[float, str, Dict[str, Any]]]]]:
+        self,
+        _visualization: bool = False,
+        cache: Optional[ScheduleCache] = None,
+    ) -> CompiledSchedule:
         """
         Compile the protocol into a dict of devices and their procedures.
 
+        This doesn't check the components' devices, which `Protocol.execute` does all at once after connecting to them, within the device timeout.
+        The compiled schedule is cached under the protocol's `content_hash`, so it's only compiled again once the protocol changes.
+        If given a `ScheduleCache`, schedules compiled in earlier sessions are loaded from it and new ones are stored in it.
+
         Returns:
-        - A dict with components as the values and lists of their procedures as the value.
-        The elements of the list of procedures are dicts with two keys: "time" in seconds, and "params", whose value is a dict of parameters for the procedure.
+        - A `CompiledSchedule`, which is a dict-like object with components as the keys and sequences of their procedures as the value.
+        The elements of the sequence of procedures are dicts with two keys: "time" in seconds, and "params", whose value is a dict of parameters for the procedure.
+        Procedures with a `SetpointProgram` among their parameters also have a "duration" in seconds, over which the executor samples the program.
+        For components in repeated blocks, the sequence is a `RepeatedSchedule`, which computes its elements as they're accessed.
 
         Raises:
-        - `RuntimeError`: When compilation fails.
+        - `RuntimeError`: When compilation fails, listing every conflict between the procedures.
         """
-        output = {}
+        # the schedule is only compiled again when the protocol has changed
+        content_hash = self.content_hash
+        cached = self._compiled.get(_visualization)
+        if cached is not None and cached[0] == content_hash:
+            compiled = cached[1]
+        else:
+            loaded = cache.get(self) if cache is not None else None
+            if loaded is not None:
+                compiled = loaded
+            else:
+                compiled = self._compile_schedule(_visualization)
+                if cache is not None:
+                    cache.put(self, compiled)
+            self._compiled[_visualization] = (content_hash, compiled)
+
+        return compiled
+
+    def _compile_schedule(self, _visualization: bool = False) -> CompiledSchedule:
+        """Compiles the schedule without using either cache. See `Protocol._compile`."""
+        # find all of the conflicts at once, rather than stopping at the first
+        conflicts = self.conflicts()
+        if len(conflicts) == 1:
+            raise RuntimeError(conflicts[0].message)
+        elif conflicts:
+            messages = "\n".join(conflict.message for conflict in conflicts)
+            raise RuntimeError(
+                f"Found {len(conflicts)} conflicts in {self}:\n{messages}"
+            )
+
+        output: Dict[ActiveComponent, Sequence] = {}
+
+        # each repeated block is compiled once, no matter how many times it repeats
+        blocks = []
+        for repeat in self.repeats:
+            block = repeat["block"]
+            compiled_block = {}
+            for component in self.apparatus[ActiveComponent]:
+                procedures = block._compile_component(component, _visualization)
+                if procedures:
+                    compiled_block[component] = procedures
+            blocks.append((repeat, self._every(repeat), compiled_block))
 
         # deal only with compiling active components
         for component in self.apparatus[ActiveComponent]:
-            # determine the procedures for each component
-            component_procedures: List[MutableMapping] = sorted(
-                [x for x in self.procedures if x["component"] == component],
-                key=lambda x: x["start"],
-            )
+            component_repeats = [
+                (compiled_block[component], repeat["start"], every, repeat["times"])
+                for repeat, every, compiled_block in blocks
+                if component in compiled_block
+            ]
 
             # skip compiling components without procedures
-            if not len(component_procedures):
+            if not component_repeats and not any(
+                x["component"] == component for x in self.procedures
+            ):
                 warn(
                     f"{component} is an active component but was not used in this procedure."
                     " If this is intentional, ignore this warning."
                 )
                 continue
 
-            # validate each component
+            # validate each component without touching the device
             try:
-                component._validate(dry_run=dry_run)
+                component._validate(dry_run=True)
             except Exception as e:
                 raise RuntimeError(f"{component} isn't valid. Got error: '{str(e)}'.")
 
-            # check for conflicting continuous procedures
-            if (
-                len(
-                    [
-                        x
-                        for x in component_procedures
-                        if x["start"] is None and x["stop"] is None
-                    ]
+            compiled = self._compile_component(component, _visualization)
+            if component_repeats:
+                output[component] = RepeatedSchedule(compiled, component_repeats)
+            else:
+                output[component] = compiled
+
+            # raise warning if duration is explicitly given but not used?
+
+        return CompiledSchedule(output)
+
+    def _compile_component(
+        self, component: ActiveComponent, _visualization: bool = False
+    ) -> List[Dict[str, Union[float, str, Dict[str, Any]]]]:
+        """Compiles the procedures of a single component, outside of any repeated blocks."""
+        # determine the procedures for each component
+        component_procedures: List[MutableMapping] = sorted(
+            [x for x in self.procedures if x["component"] == component],
+            key=lambda x: x["start"],
+        )
+
+        # conflicts have already been checked for, so only stop times are left to infer
+        stops = []
+        for i, procedure in enumerate(component_procedures):
+            stop = procedure["stop"]
+            try:
+                # the start time of the next procedure
+                next_start = component_procedures[i + 1]["start"]
+                if next_start is not None and stop is None:
+                    warn(
+                        f"Automatically inferring stop time for {procedure['component']} "
+                        f"as beginning of {procedure['component']}'s next procedure."
+                    )
+                    stop = next_start
+
+            except IndexError:
+                if stop is None:
+                    warn(
+                        f"Automatically inferring stop for {procedure['component']} as the end of the protocol. "
+                        f"To override, provide stop in your call to add()."
+                    )
+                    stop = self._inferred_duration
+            stops.append(stop)
+
+        # give the component instructions at all times
+        compiled = []
+        for i, (procedure, stop) in enumerate(zip(component_procedures, stops)):
+            if _visualization:
+                compiled.append(
+                    dict(
+                        start=procedure["start"], stop=stop, params=procedure["params"]
+                    )
                 )
-                > 1
-            ):
-                raise RuntimeError(
-                    f"{component} cannot have two procedures for the entire duration of the protocol. "
-                    "If each procedure defines a different attribute to be set for the entire duration, "
-                    "combine them into one call to add(). Otherwise, reduce ambiguity by defining start "
-                    "and stop times for each procedure. "
-                    ""
+            else:
+                compiled.append(
+                    dict(time=procedure["start"], params=procedure["params"])
                 )
 
-            for i, procedure in enumerate(component_procedures):
-                # automatically infer start and stop times
+                # programs are sampled over the procedure as it executes
+                if any(
+                    isinstance(x, SetpointProgram) for x in procedure["params"].values()
+                ):
+                    compiled[-1]["duration"] = stop - procedure["start"]
+
+                # if the procedure is over at the same time as the next
+                # procedure begins, don't go back to the base state
                 try:
-                    # the start time of the next procedure
-                    next_start = component_procedures[i + 1]["start"]
-                    if next_start == 0:
-                        raise RuntimeError(
-                            f"Ambiguous start time for {procedure['component']}. "
-                        )
-                    elif next_start is not None and procedure["stop"] is None:
-                        warn(
-                            f"Automatically inferring stop time for {procedure['component']} "
-                            f"as beginning of {procedure['component']}'s next procedure."
-                        )
-                        procedure["stop"] = next_start
+                    if isclose(component_procedures[i + 1]["start"], stop):
+                        continue
+                except IndexError:
+                    pass
 
-                    # check for overlapping procedures
-                    elif next_start < procedure["stop"] and not isclose(
-                        next_start, procedure["stop"]
-                    ):
-                        msg = "Cannot have two overlapping procedures. "
-                        msg += f"{procedure} and {component_procedures[i + 1]} conflict"
-                        raise RuntimeError(msg)
+                # otherwise, go back to base state
+                new_state = {
+                    "time": stop,
+                    "params": component._base_state,
+                }
+                compiled.append(new_state)
 
-                except IndexError:
-                    if procedure["stop"] is None:
-                        warn(
-                            f"Automatically inferring stop for {procedure['component']} as the end of the protocol. "
-                            f"To override, provide stop in your call to add()."
-                        )
-                        procedure["stop"] = self._inferred_duration
+        return compiled
 
-            # give the component instructions at all times
-            compiled = []
-            for i, procedure in enumerate(component_procedures):
-                if _visualization:
-                    compiled.append(
-                        dict(
-                            start=procedure["start"],
-                            stop=procedure["stop"],
-                            params=procedure["params"],
-                        )
-                    )
-                else:
-                    compiled.append(
-                        dict(time=procedure["start"], params=procedure["params"])
-                    )
+    def index(self) -> ProcedureIndex:
+        """
+        Indexes the procedures by component and time, without changing them.
 
-                    # if the procedure is over at the same time as the next
-                    # procedure begins, don't go back to the base state
-                    try:
-                        if isclose(
-                            component_procedures[i + 1]["start"], procedure["stop"]
-                        ):
-                            continue
-                    except IndexError:
-                        pass
-
-                    # otherwise, go back to base state
-                    new_state = {
-                        "time": procedure["stop"],
-                        "params": component._base_state,
-                    }
-                    compiled.append(new_state)
-
-            output[component] = compiled
+        Building the index takes O(P log P) time for P procedures.
+        Repeated blocks are indexed once, however many times they repeat.
 
-            # raise warning if duration is explicitly given but not used?
-        return output
+        Returns:
+        - A `ProcedureIndex`. Use `ProcedureIndex.at(t)` to find the procedures in effect `t` seconds into the protocol, in O(log P) time, and `ProcedureIndex.conflicts()` to find every conflict.
+        """
+        try:
+            end = self._inferred_duration
+        except RuntimeError:
+            end = None
+        return ProcedureIndex(
+            self.procedures,
+            end,
+            [
+                (r["block"].index(), r["start"], self._every(r), r["times"])
+                for r in self.repeats
+            ],
+        )
+
+    def conflicts(self) -> List[Conflict]:
+        """
+        Finds every conflict between the procedures, across all components, in one pass.
+
+        Unlike compiling, which stops at the first error, this reports all of them so that they can be fixed at once.
+
+        Returns:
+        - A list of `Conflict` namedtuples of `(kind, component, procedures, message)`, where `kind` is one of:
+            - "overlap": Two of a component's procedures happen at the same time.
+            - "ambiguous start": Two of a component's procedures start at the same time and one of them doesn't have a stop time.
+            - "open-ended": The stop time of a procedure can't be inferred.
+            - "continuous": A component has more than one procedure for the entire protocol.
+
+        Example:
+        ```python
+        for conflict in P.conflicts():
+            print(conflict.message)
+        ```
+        """
+        return self.index().conflicts()
+
+    def compact(
+        self,
+        dependencies: Iterable[Tuple] = (),
+        gap: Union[str, timedelta, None] = None,
+    ) -> Compaction:
+        """
+        Shortens the protocol by starting every procedure as early as it can.
+
+        Procedures that overlap are meant to happen together, so each group of them is moved as a block.
+        Each component's procedures keep their order, and those that don't touch are kept apart so that the component still returns to its base state between them.
+        Otherwise, procedures are only held back by the procedures they're declared to depend on.
+        The result is the shortest schedule that satisfies these constraints.
+
+        ::: warning
+        Procedures on different components that don't overlap are assumed to be independent unless a dependency says otherwise.
+        For example, if a wash must not start until the previous step is over, declare it.
+        :::
+
+        Arguments:
+        - `dependencies`: Tuples of `(before, after)` or `(before, after, gap)`, where `before` and `after` are procedures (or lists of them) returned by `Protocol.add`. Each means that `after` can't start until `gap`, such as `"2 seconds"`, after `before` stops. Defaults to no gap.
+        - `gap`: The minimum time between procedures on the same component that don't touch. Defaults to keeping their original spacing.
+
+        Returns:
+        - A namedtuple of `(protocol, duration, time_saved)`: the new, compacted `Protocol`, its duration in seconds, and how many seconds shorter it is than this one.
+
+        Raises:
+        - `ValueError`: When the dependencies are invalid or circular, or the protocol has repeated blocks.
+
+        Example:
+        ```python
+        deprotection = P.add(pump, rate="5 mL/min", start="0 secs", stop="60 secs")
+        wash = P.add(pump2, rate="5 mL/min", start="90 secs", stop="120 secs")
+        result = P.compact(dependencies=[(deprotection, wash, "2 secs")])
+        result.protocol.execute()
+        ```
+        """
+        if self.repeats:
+            raise ValueError(
+                "Protocols with repeated blocks can't be compacted. "
+                "Compact the block itself instead."
+            )
+
+        # compiling checks the protocol and infers any missing stop times
+        open_ended = [i for i, p in enumerate(self.procedures) if p["stop"] is None]
+        self._compile()
+        duration = self._inferred_duration
+
+        starts = compact_schedule(self.procedures, dependencies, gap, open_ended)
+        compacted = Protocol(
+            self.apparatus, name=f"{self.name}_compacted", description=self.description
+        )
+        for i, (procedure, start) in enumerate(zip(self.procedures, starts)):
+            stop = None
+            if i not in open_ended:
+                old_start, old_stop = procedure["start"], procedure["stop"]
+                assert isinstance(old_start, float)  # make the type checker happy
+                assert isinstance(old_stop, float)
+                stop = start + old_stop - old_start
+            compacted.procedures.append(
+                dict(
+                    procedure,
+                    start=start,
+                    stop=stop,
+                    params=dict(procedure["params"]),
+                )
+            )
+
+        # make sure that the new schedule is still valid
+        compacted._compile()
+
+        new_duration = makespan(self.procedures, starts, open_ended)
+        logger.info(
+            f"Compacted {self} from {duration}s to {new_duration}s, "
+            f"saving {duration - new_duration}s."
+        )
+        return Compaction(
+            protocol=compacted,
+            duration=new_duration,
+            time_saved=duration - new_duration,
+        )
+
+    def residence_times(self, segments: bool = False) -> pd.DataFrame:
+        """
+        Computes how long it takes fluid to travel through the apparatus over the course of the protocol.
+
+        The protocol is split into intervals during which no component changes state.
+        In each, the routes from the sources (such as reagent vessels) to the sinks (such as the output) that the valves leave open are found, and the flow rate through each connection is the sum of the rates of the pumps along the open routes through it.
+        Use this to size switching and wash durations from the apparatus's actual volumes.
+
+        Arguments:
+        - `segments`: Whether to give the flow through each connection instead of each route.
+
+        Returns:
+        - A DataFrame with a row for each route with flow along its whole length in each interval, with the columns `start` and `stop` (in seconds), `source` and `sink` (by name), `dead_volume` (the volume of the route's tubing in mL), and `residence_time` (in seconds).
+        If `segments` is true, the rows are instead for each connection with flow in each interval, with the columns `start`, `stop`, `from_component`, `to_component`, `volume` (in mL), `flow_rate` (in mL/min), and `residence_time`.
+        """
+        compiled = self._compile()
+        paths = self.apparatus.flow_paths()
+        if segments:
+            return paths.segments(compiled)
+        return paths.residence_times(compiled)
+
+    def state_at(self, time) -> Dict[ActiveComponent, Dict[str, Any]]:
+        """
+        Finds the state that every component should be in at a time, without replaying the protocol.
+
+        Once compiled, each component's state is found by binary search through its procedures, so this is fast anywhere in long or repeated protocols.
+
+        Arguments:
+        - `time`: The time relative to the start of the protocol, such as `"90 minutes"`. May also be a `datetime.timedelta` or a number of seconds.
+
+        Returns:
+        - A dict of the components to the parameters they should have at `time`, including the effect of any procedure that starts exactly then.
+        """
+        return self._compile().state_at(_seconds(time))
+
+    def events(self) -> Iterator[Event]:
+        """
+        Iterates over the compiled procedures of all of the components in the order they happen.
+
+        The components' procedures are merged as they're read, so this doesn't build the whole timeline in memory, even for very long protocols.
+
+        Returns:
+        - Namedtuples of `(time, component, params)`, where `time` is in seconds from the start of the protocol.
+
+        Example:
+        ```python
+        for time, component, params in P.events():
+            print(f"{time}s: {component} {params}")
+        ```
+        """
+        return self._compile().events()
 
     def to_dict(self):
-        compiled = deepcopy(self._compile(dry_run=True))
+        compiled = deepcopy(self._compile())
         compiled = {k.name: v for (k, v) in compiled.items()}
         return compiled
 
-    def to_list(self):
-        output = []
-        for procedure in deepcopy(self.procedures):
-            procedure["component"] = procedure["component"].name
-            output.append(procedure)
+    def to_list(self, expand: bool = False) -> List[Dict[str, Any]]:
+        """
+        Outputs the uncompiled procedures as a list of dicts, with components given by name.
+
+        The result can be turned back into a protocol with `Protocol.from_list`.
+
+        ::: warning
+        When `expand` is `True`, the repetitions of a procedure share one `params` dict, so copy it before changing it.
+        :::
+
+        Arguments:
+        - `expand`: Whether to list each repetition of a repeated block. By default, each repeated block is listed once as a dict with its `block` name, `start`, `every`, `times`, and `procedures`.
+
+        Returns:
+        - The procedures, in the order they were added, followed by the repeated blocks.
+        """
+        output = [self._serialize(procedure) for procedure in self.procedures]
+
+        for repeat in self.repeats:
+            block = repeat["block"].to_list()
+            every = self._every(repeat)
+
+            # by default, each repeated block is listed once
+            if not expand:
+                output.append(
+                    dict(
+                        block=repeat["block"].name,
+                        start=repeat["start"],
+                        every=every,
+                        times=repeat["times"],
+                        procedures=block,
+                    )
+                )
+                continue
+
+            for i in range(repeat["times"]):
+                offset = repeat["start"] + i * every
+                for procedure in block:
+                    output.append(
+                        dict(
+                            procedure,
+                            start=procedure["start"] + offset
+                            if procedure["start"] is not None
+                            else None,
+                            stop=procedure["stop"] + offset
+                            if procedure["stop"] is not None
+                            else None,
+                        )
+                    )
         return output
 
+    @staticmethod
+    def _serialize(procedure: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        A procedure with its component replaced by its name and its programs by their descriptions.
+
+        The params are copied, so that the result is a snapshot of the procedure that isn't affected by later changes to it.
+        """
+        return dict(
+            start=procedure["start"],
+            stop=procedure["stop"],
+            component=procedure["component"].name,
+            params={
+                k: v.to_dict() if isinstance(v, SetpointProgram) else v
+                for k, v in procedure["params"].items()
+            },
+        )
+
+    @classmethod
+    def _fingerprint(cls, procedure: Mapping[str, Any]) -> Dict[str, Any]:
+        """What a procedure is hashed by: its serialized form, plus the identities of its profiles' functions, which are only serialized by name."""
+        data = cls._serialize(procedure)
+        for key, value in procedure["params"].items():
+            if isinstance(value, Profile):
+                # the compiled schedule keeps the function alive, so its id isn't
+                # reused by another function while the schedule is cached
+                data["params"][key]["profile"]["id"] = id(value.function)
+        return data
+
     def yaml(self) -> Union[str, Code]:
         """
         Outputs the uncompiled procedures to YAML.
 
         Internally, this is a conversion of the output of `Protocol.json` for the purpose of enhanced human readability.
+        LibYAML's C emitter is used when PyYAML was built with it.
 
         Returns:
         - YAML of the procedure list.
         When in Jupyter, this string is wrapped in an `IPython.display.Code` object for nice syntax highlighting.
 
         """
-        compiled_yaml = yaml.safe_dump(self.to_list(), default_flow_style=False)
+        compiled_yaml = yaml.dump(
+            self.to_list(), Dumper=_YAMLDumper, default_flow_style=False
+        )
 
         if get_ipython():
             return Code(compiled_yaml, language="yaml")
@@ -447,14 +947,133 @@ class Protocol(object):
             return Code(compiled_json, language="json")
         return compiled_json
 
-    def visualize(self, legend: bool = False, width=500, renderer: str = "notebook"):
+    def msgpack(self) -> bytes:
+        """
+        Outputs the uncompiled procedures to [MessagePack](https://msgpack.org), a compact binary format.
+
+        This is much smaller and faster to write and read than YAML or JSON, so it's meant for storing large generated protocols.
+
+        ::: tip
+        msgpack is an optional dependency. Install it with `pip install mechwolf[msgpack]`.
+        :::
+
+        Returns:
+        - The MessagePack bytes of the procedure list.
+
+        Raises:
+        - `ImportError`: When msgpack isn't installed.
+        """
+        return _msgpack().packb(self.to_list(), use_bin_type=True)
+
+    @classmethod
+    def from_list(
+        cls,
+        apparatus: Apparatus,
+        procedures: Iterable[Mapping[str, Any]],
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> "Protocol":
+        """
+        Creates a protocol from the output of `Protocol.to_list`.
+
+        Components are looked up by name in the apparatus.
+        Each procedure's parameters are checked against its component, but its times are used as they are.
+
+        Arguments:
+        - `apparatus`: The apparatus that the procedures are for.
+        - `procedures`: The procedures, with the components given by name.
+        - `name`: The name of the protocol.
+        - `description`: A description of the protocol.
+
+        Returns:
+        - The protocol.
+
+        Raises:
+        - `KeyError`: A component isn't in the apparatus.
+        - `ValueError`: A procedure's parameters aren't valid for its component.
+        """
+        protocol = cls(apparatus, name=name, description=description)
+        for procedure in procedures:
+            if "procedures" in procedure:
+                block = cls.from_list(
+                    apparatus, procedure["procedures"], name=procedure.get("block")
+                )
+                protocol.repeat(
+                    block,
+                    procedure["times"],
+                    start=procedure["start"],
+                    every=procedure["every"],
+                )
+                continue
+
+            component = apparatus[procedure["component"]]
+            if not isinstance(component, ActiveComponent):
+                raise ValueError(f"{repr(component)} is not an ActiveComponent.")
+            params = procedure["params"]
+            if any(isinstance(v, Mapping) for v in params.values()):
+                params = {
+                    k: SetpointProgram.from_dict(v) if isinstance(v, Mapping) else v
+                    for k, v in params.items()
+                }
+            protocol._check_component_kwargs(component, **params)
+            protocol._append(
+                component,
+                start=procedure["start"],
+                stop=procedure["stop"],
+                params=dict(params),
+            )
+        return protocol
+
+    @classmethod
+    def from_yaml(cls, apparatus: Apparatus, data: str, **kwargs) -> "Protocol":
+        """
+        Creates a protocol from the output of `Protocol.yaml`, using LibYAML's C parser when PyYAML was built with it.
+
+        See `Protocol.from_list` for the arguments.
+        """
+        return cls.from_list(apparatus, yaml.load(data, Loader=_YAMLLoader), **kwargs)
+
+    @classmethod
+    def from_json(cls, apparatus: Apparatus, data: str, **kwargs) -> "Protocol":
+        """
+        Creates a protocol from the output of `Protocol.json`.
+
+        See `Protocol.from_list` for the arguments.
+        """
+        return cls.from_list(apparatus, json.loads(data), **kwargs)
+
+    @classmethod
+    def from_msgpack(cls, apparatus: Apparatus, data: bytes, **kwargs) -> "Protocol":
+        """
+        Creates a protocol from the output of `Protocol.msgpack`.
+
+        See `Protocol.from_list` for the arguments.
+
+        Raises:
+        - `ImportError`: When msgpack isn't installed.
+        """
+        return cls.from_list(apparatus, _msgpack().unpackb(data, raw=False), **kwargs)
+
+    def visualize(
+        self,
+        legend: bool = False,
+        width=500,
+        renderer: str = "notebook",
+        expand: bool = False,
+        max_bars: Optional[int] = 1000,
+    ):
         """
         Generates a Gantt plot visualization of the protocol.
 
+        All of the components are drawn in a single chart from a single table of procedures.
+        For very large protocols, short procedures next to each other are merged into one bar so that the chart stays responsive.
+
         Arguments:
         - `legend`: Whether to show a legend.
         - `renderer`: Which renderer to use. Defaults to "notebook" but can also be "jupyterlab", or "nteract", depending on the development environment. If not in a Jupyter Notebook, this argument is ignored.
         - `width`: The width of the Gantt chart.
+        - `expand`: Whether to show every repetition of repeated blocks. By default, each repeated block is shown as a single bar.
+        - `max_bars`: Roughly how many bars to draw at most. Above this, each component's procedures that are too short to see are merged with those around them, and the merged bars say how many procedures they stand for. If `None`, every procedure gets its own bar.
 
         Returns:
         - An interactive visualization of the protocol.
@@ -464,72 +1083,80 @@ class Protocol(object):
         if get_ipython():
             alt.renderers.enable(renderer)
 
-        for component, procedures in self._compile(_visualization=True).items():
-            # generate a dict that will be a row in the dataframe
+        # build the table column by column, with each parameter in its own sparse column
+        columns: Dict[str, List[Any]] = dict(component=[], start=[], stop=[], params=[])
+        hoisted: Dict[str, Dict[int, Any]] = {}
+        labels: Dict[int, Tuple[Mapping[str, Any], str]] = {}
+        for component, schedule in self._compile(_visualization=True).items():
+            if isinstance(schedule, RepeatedSchedule) and not expand:
+                procedures: Sequence[Mapping[str, Any]] = schedule.collapsed()
+            else:
+                procedures = schedule
+
+            # show what the valve is actually connecting to, looking each setting up once
+            mapped: Dict[Any, str] = {}
+            if isinstance(component, Valve) and component.mapping is not None:
+                mapped = {v: repr(k) for k, v in component.mapping.items()}
+
+            name = str(component)
             for procedure in procedures:
-                procedure["component"] = str(component)
-                procedure["start"] = pd.Timestamp(procedure["start"], unit="s")
-                procedure["stop"] = pd.Timestamp(procedure["stop"], unit="s")
-
-                # hoist the params to the main dict
-                assert isinstance(procedure["params"], dict)  # needed for typing
-                for k, v in procedure["params"].items():
-                    procedure[k] = v
-
-                # show what the valve is actually connecting to
-                if isinstance(component, Valve) and type(procedure["setting"]) == int:
-                    assert isinstance(component.mapping, Mapping)
-                    # guess the component, c, which the valve is set to
-                    mapped_component = [
-                        repr(k)
-                        for k, v in component.mapping.items()
-                        if v == procedure["setting"]
-                    ][0]
-                    procedure["mapped component"] = mapped_component
-                # TODO: make this deterministic for color coordination
-                procedure["params"] = json.dumps(procedure["params"])
+                row = len(columns["component"])
+                params = procedure["params"]
 
-            # prettyify the tooltips
-            tooltips = [
-                alt.Tooltip("utchoursminutesseconds(start):T", title="start (h:m:s)"),
-                alt.Tooltip("utchoursminutesseconds(stop):T", title="stop (h:m:s)"),
-                "component",
-            ]
-
-            # just add the params to the tooltip
-            tooltips.extend(
-                [
-                    x
-                    for x in procedures[0].keys()
-                    if x not in ["component", "start", "stop", "params"]
-                ]
-            )
+                # many procedures share their params, such as returns to the base state
+                # TODO: make this deterministic for color coordination
+                if id(params) not in labels:
+                    labels[id(params)] = (params, json.dumps(params, default=str))
+
+                columns["component"].append(name)
+                columns["start"].append(procedure["start"])
+                columns["stop"].append(procedure["stop"])
+                columns["params"].append(labels[id(params)][1])
+
+                # hoist the params to their own columns
+                for k, v in params.items():
+                    if k not in columns:
+                        hoisted.setdefault(k, {})[row] = (
+                            str(v) if isinstance(v, SetpointProgram) else v
+                        )
+                setting = params.get("setting")
+                if type(setting) == int and setting in mapped:
+                    hoisted.setdefault("mapped component", {})[row] = mapped[setting]
+
+        source = pd.DataFrame(columns)
+        for k, values in hoisted.items():
+            source[k] = pd.Series(values, dtype=object)
+        source["procedures"] = 1
+        if max_bars is not None:
+            source = _aggregate_bars(source, max_bars)
+        source["start"] = pd.to_datetime(source["start"], unit="s")
+        source["stop"] = pd.to_datetime(source["stop"], unit="s")
+
+        # prettyify the tooltips, with just the params after the times
+        tooltips = [
+            alt.Tooltip("utchoursminutesseconds(start):T", title="start (h:m:s)"),
+            alt.Tooltip("utchoursminutesseconds(stop):T", title="stop (h:m:s)"),
+            "component",
+        ]
+        tooltips.extend(
+            x for x in source.columns if x not in ["component", "start", "stop", "params"]
+        )
 
-            # generate the component's graph
-            source = pd.DataFrame(procedures)
-            component_chart = (
-                alt.Chart(source, width=width)
-                .mark_bar()
-                .encode(
-                    x="utchoursminutesseconds(start):T",
-                    x2="utchoursminutesseconds(stop):T",
-                    y="component",
-                    color=alt.Color("params:N", legend=None)
-                    if not legend
-                    else "params",
-                    tooltip=tooltips,
-                )
+        chart = (
+            alt.Chart(source, width=width)
+            .mark_bar()
+            .encode(
+                x="utchoursminutesseconds(start):T",
+                x2="utchoursminutesseconds(stop):T",
+                y="component",
+                color=(alt.Color("params:N", legend=None) if not legend else "params"),
+                tooltip=tooltips,
             )
+        )
 
-            # label the axes
-            component_chart.encoding.x.title = "Experiment Elapsed Time (h:m:s)"
-            component_chart.encoding.y.title = "Component"
-
-            # combine with the other charts
-            try:
-                chart += component_chart  # type: ignore
-            except NameError:
-                chart = component_chart
+        # label the axes
+        chart.encoding.x.title = "Experiment Elapsed Time (h:m:s)"
+        chart.encoding.y.title = "Component"
 
         return chart.interactive()
 
@@ -543,6 +1170,11 @@ class Protocol(object):
         log_file_verbosity: Optional[str] = "trace",
         log_file_compression: Optional[str] = None,
         data_file: Union[str, bool, os.PathLike, None] = True,
+        isolate: Optional[Iterable[ActiveComponent]] = None,
+        device_timeout: float = 10.0,
+        start_at: Union[str, timedelta, float, None] = None,
+        cache: Union[bool, ScheduleCache] = False,
+        profile: bool = False,
     ) -> Experiment:
         """
         Executes the procedure.
@@ -553,9 +1185,18 @@ class Protocol(object):
         - `strict`: Whether to stop execution upon encountering any errors. If False, errors will be noted but ignored.
         - `verbosity`: The level of logging verbosity. One of "critical", "error", "warning", "success", "info", "debug", or "trace" in descending order of severity. "debug" and (especially) "trace" are not meant to be used regularly, as they generate significant amounts of usually useless information. However, these verbosity levels are useful for tracing where exactly a bug was generated, especially if no error message was thrown.
         - `log_file`: The file to write the logs to during execution. If `True`, the data will be written to a file in `~/.mechwolf` with the filename `{experiment_id}.log.jsonl`. If falsey, no logs will be written to the file.
-        - `log_file_verbosity`: How verbose the logs in file should be. By default, it is "trace", which is the most verbose logging available. If `None`, it will use the same level as `verbosity`.
+        - `log_file_verbosity`: How verbose the logs in file should be. By default, it is "trace", which is the most verbose logging available. For long or fast protocols, "debug" leaves out the messages logged at every step of execution. If `None`, it will use the same level as `verbosity`.
         - `log_file_compression`: Whether to compress the log file after the experiment.
         - `data_file`: The file to write the experimental data to during execution. If `True`, the data will be written to a file in `~/.mechwolf` with the filename `{experiment_id}.data.jsonl`. If falsey, no data will be written to the file.
+        - `isolate`: Components to run in their own worker processes. Use this for components whose drivers can hang or hold the GIL, so that they cannot freeze the rest of the apparatus. The components must be picklable when not in context. Ignored for dry runs.
+        - `device_timeout`: How long, in seconds, each component gets to come up, reset to its base state, or shut down. Components are brought up and shut down concurrently.
+        - `start_at`: How far into the protocol to start, such as `"90 minutes"`, in order to resume a run that failed partway through. The components are all set to their states at that time (see `Protocol.state_at`) at once, and only the procedures after it are executed. May also be a `datetime.timedelta` or a number of seconds. Defaults to the beginning of the protocol.
+        - `cache`: Whether to load the compiled protocol from a persistent cache in `~/.mechwolf/cache`, or store it there if it isn't yet, so that protocols executed again in later sessions aren't compiled again. May also be a `ScheduleCache` to use a different directory or size limit.
+        - `profile`: Whether to record how long each stage of execution took, along with counters such as how many procedures were executed and how far the event loop lagged. The results are available as `Experiment.metrics` and are written next to the log file as `{experiment_id}.metrics.json`. See `Metrics`.
+
+        ::: tip
+        To keep the components connected between executions, use `Apparatus.session`.
+        :::
 
         Returns:
         - An `Experiment` object. In a Jupyter notebook, the object yields an interactive visualization. If protocol execution fails for any reason that does not raise an error, the return type is None.
@@ -564,6 +1205,22 @@ class Protocol(object):
         - `RuntimeError`: When attempting to execute a protocol on invalid components.
         """
 
+        # make sure that the protocol isn't over by then
+        offset = _seconds(start_at)
+        if start_at is not None and not 0 <= offset < self._inferred_duration:
+            raise ValueError(
+                f"start_at must be within the protocol, which lasts {self._inferred_duration}s."
+            )
+
+        # make sure that the isolated components are part of the apparatus
+        isolated = set()
+        for component in isolate if isolate is not None else []:
+            if not isinstance(component, ActiveComponent):
+                raise TypeError(
+                    f"Only active components can be isolated, not {component}."
+                )
+            isolated.add(self.apparatus[component])
+
         # the Experiment object is going to hold all the info
         E = Experiment(self)
         E._execute(
@@ -575,6 +1232,11 @@ class Protocol(object):
             log_file_verbosity=log_file_verbosity,
             log_file_compression=log_file_compression,
             data_file=data_file,
+            isolate=isolated,
+            device_timeout=device_timeout,
+            start_at=offset,
+            cache=ScheduleCache() if cache is True else cache or None,
+            profile=profile,
         )
 
         return E
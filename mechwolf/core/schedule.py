@@ -0,0 +1,303 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from math import isclose
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from .setpoints import SetpointProgram
+
+if TYPE_CHECKING:
+    from ..components import ActiveComponent
+
+Entry = Mapping[str, Any]
+
+Event = namedtuple("Event", ["time", "component", "params"])
+
+# (entries, offset, every, times): the entries are repeated `times` times, `every` seconds apart, starting `offset` seconds in
+Segment = Tuple[Sequence[Entry], float, float, int]
+
+
+def _span(entries: Sequence[Entry]) -> Tuple[float, float]:
+    """The first and last times in a list of compiled entries, which may be either events or intervals."""
+    first, last = entries[0], entries[-1]
+    return first.get("start", first.get("time")), last.get("stop", last.get("time"))
+
+
+def _shift(entry: Entry, offset: float) -> Dict[str, Any]:
+    shifted = dict(entry)
+    for key in ("time", "start", "stop"):
+        if shifted.get(key) is not None:
+            shifted[key] += offset
+    return shifted
+
+
+class RepeatedSchedule(Sequence):
+    """
+    A component's compiled procedures, with repeated blocks kept as a single copy.
+
+    This behaves like the list that `Protocol._compile()` gives for components without repeated blocks, but each entry is only computed when it's accessed.
+    Memory use is therefore independent of the number of repetitions.
+
+    Arguments:
+    - `entries`: The component's own compiled procedures, outside of any repeated block.
+    - `repeats`: Tuples of `(entries, start, every, times)` for each repeated block involving the component, where `entries` are the component's compiled procedures for one repetition, relative to the start of the block.
+
+    Raises:
+    - `RuntimeError`: When procedures overlap.
+    """
+
+    def __init__(
+        self,
+        entries: Sequence[Entry],
+        repeats: Sequence[Tuple[Sequence[Entry], float, float, int]],
+    ):
+        # each repeated block becomes one or more segments, and whether each ends with a return to the base state
+        groups: List[List[Tuple[Segment, bool]]] = []
+        for block, start, every, times in sorted(repeats, key=lambda x: x[1]):
+            if not block or times < 1:
+                continue
+            first, last = _span(block)
+            returns = "time" in block[-1]
+            # when repetitions touch, don't return to the base state between them
+            if returns and len(block) > 1 and isclose(first + every, last):
+                groups.append(
+                    [
+                        ((block[:-1], start, every, times), False),
+                        (([block[-1]], start + (times - 1) * every, 0.0, 1), True),
+                    ]
+                )
+            else:
+                groups.append([((block, start, every, times), returns)])
+
+        # the component's own procedures fill in around the repeated blocks
+        boundaries = [_span(group[0][0][0])[0] + group[0][0][1] for group in groups]
+        runs: Dict[int, List[Entry]] = {}
+        for entry in entries:
+            i = bisect_left(boundaries, _span([entry])[0])
+            runs.setdefault(i, []).append(entry)
+        segments: List[Tuple[Segment, bool]] = []
+        for i in range(len(groups) + 1):
+            if i in runs:
+                segments.append(((runs[i], 0.0, 0.0, 1), "time" in runs[i][-1]))
+            if i < len(groups):
+                segments.extend(groups[i])
+
+        # check that nothing overlaps, one span per segment rather than per repetition
+        previous = None
+        for segment, _ in segments:
+            first, last = self._segment_span(segment)
+            if (
+                previous is not None
+                and first < previous
+                and not isclose(first, previous)
+            ):
+                raise RuntimeError(
+                    "Cannot have two overlapping procedures. "
+                    f"A repeated block overlaps other procedures at {first}s."
+                )
+            previous = last
+
+        # if a segment ends as the next one begins, don't go back to the base state
+        self._segments: List[Segment] = []
+        for i, (segment, returns) in enumerate(segments):
+            if (
+                not returns
+                or i + 1 == len(segments)
+                or not isclose(
+                    self._segment_span(segment)[1],
+                    self._segment_span(segments[i + 1][0])[0],
+                )
+            ):
+                self._segments.append(segment)
+                continue
+            block, offset, every, times = segment
+            if times > 1:
+                self._segments.append((block, offset, every, times - 1))
+            if len(block) > 1:
+                self._segments.append(
+                    (block[:-1], offset + (times - 1) * every, 0.0, 1)
+                )
+
+        self._ends: List[int] = []
+        total = 0
+        for block, _, _, times in self._segments:
+            total += len(block) * times
+            self._ends.append(total)
+
+    def _segment_span(self, segment: Segment) -> Tuple[float, float]:
+        block, offset, every, times = segment
+        first, last = _span(block)
+        return first + offset, last + offset + (times - 1) * every
+
+    def __len__(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("schedule index out of range")
+
+        i = bisect_right(self._ends, index)
+        block, offset, every, _ = self._segments[i]
+        local = index - (self._ends[i - 1] if i else 0)
+        repetition, j = divmod(local, len(block))
+        return _shift(block[j], offset + repetition * every)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for block, offset, every, times in self._segments:
+            for repetition in range(times):
+                for entry in block:
+                    yield _shift(entry, offset + repetition * every)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self):
+        return f"<RepeatedSchedule of {len(self)} procedures in {len(self._segments)} segments>"
+
+    def collapsed(self) -> List[Dict[str, Any]]:
+        """
+        Summarizes the schedule with each repeated block as a single interval.
+
+        Only meaningful for schedules of intervals, as used for visualization.
+        """
+        result: List[Dict[str, Any]] = []
+        for segment in self._segments:
+            block, offset, every, times = segment
+            if times == 1:
+                result.extend(_shift(entry, offset) for entry in block)
+                continue
+            start, stop = self._segment_span(segment)
+            result.append(
+                dict(
+                    start=start,
+                    stop=stop,
+                    params={"repeat": f"{times} times, every {every} seconds"},
+                )
+            )
+        return result
+
+
+def _count_until(
+    procedures: Sequence[Entry], time: float, inclusive: bool = True
+) -> int:
+    """The number of procedures at (if `inclusive`) or before `time`, found by binary search."""
+    low, high = 0, len(procedures)
+    while low < high:
+        middle = (low + high) // 2
+        before = procedures[middle]["time"]
+        if before < time or (inclusive and before == time):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _events(
+    component: "ActiveComponent", procedures: Sequence[Entry]
+) -> Iterator[Event]:
+    for procedure in procedures:
+        yield Event(procedure["time"], component, procedure["params"])
+
+
+class CompiledSchedule(Mapping):
+    """
+    A compiled protocol, which behaves like a dict of components to the sequence of their procedures, sorted by time.
+
+    Use `CompiledSchedule.events` to go through the procedures of all of the components in the order they happen.
+    The components' sequences are merged as they're read, so the full timeline is never built in memory.
+    Since each component's procedures are sorted, `CompiledSchedule.state_at` finds the state of the apparatus at any time by binary search.
+
+    Arguments:
+    - `schedules`: A dict of components to their compiled procedures, each sorted by time.
+    """
+
+    def __init__(self, schedules: Mapping["ActiveComponent", Sequence[Entry]]):
+        self._schedules = dict(schedules)
+
+    def __getitem__(self, component: "ActiveComponent") -> Sequence[Entry]:
+        return self._schedules[component]
+
+    def __iter__(self):
+        return iter(self._schedules)
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def __repr__(self):
+        return f"<CompiledSchedule of {len(self)} components>"
+
+    def events(self) -> Iterator[Event]:
+        """
+        Iterates over the procedures of all of the components in the order they happen.
+
+        Procedures at the same time are given in the order of their components.
+
+        Returns:
+        - Namedtuples of `(time, component, params)`, where `time` is in seconds.
+        """
+        yield from heapq.merge(
+            *[_events(c, procedures) for c, procedures in self._schedules.items()],
+            key=lambda event: event.time,
+        )
+
+    @property
+    def end_time(self) -> float:
+        """The time of the last procedure, in seconds."""
+        return max(
+            _span(procedures)[1]
+            for procedures in self._schedules.values()
+            if procedures
+        )
+
+    def state_at(self, time: float) -> Dict["ActiveComponent", Dict[str, Any]]:
+        """
+        Finds the state that each component should be in at a time.
+
+        Each component's procedures are searched for the last one at or before `time`, which takes O(log n) time.
+        Parameters that it doesn't set are taken from the procedures before it, back to the component's last return to its base state.
+
+        Arguments:
+        - `time`: The time, in seconds from the start of the protocol.
+
+        Returns:
+        - A dict of components to their parameters, including the effect of any procedure at exactly `time`.
+        Setpoint programs are given as their value at `time`.
+        """
+        result = {}
+        for component, procedures in self._schedules.items():
+            base_state = component._base_state
+            params: Dict[str, Any] = {}
+            for i in range(_count_until(procedures, time) - 1, -1, -1):
+                procedure = procedures[i]
+                for key, value in procedure["params"].items():
+                    if key in params:
+                        continue
+                    if isinstance(value, SetpointProgram):
+                        duration = procedure["duration"]
+                        value = value(min(time - procedure["time"], duration), duration)
+                    params[key] = value
+                if all(key in params for key in base_state):
+                    break
+            result[component] = dict(base_state, **params)
+        return result
+
+    def remaining(self, component: "ActiveComponent", time: float) -> Iterator[Entry]:
+        """
+        Iterates over a component's procedures from a time on, without going through the ones before it.
+
+        A procedure with a setpoint program that is still running at `time` is included, so that the program carries on.
+        """
+        procedures = self._schedules[component]
+        first = _count_until(procedures, time, inclusive=False)
+        if first:
+            previous = procedures[first - 1]
+            if previous.get("duration", 0) > time - previous["time"]:
+                first -= 1
+        for i in range(first, len(procedures)):
+            yield procedures[i]
@@ -0,0 +1,106 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set
+
+from loguru import logger
+
+from ..components import ActiveComponent
+from .execute import _bring_up, _shut_down
+from .worker import DeviceWorker
+
+if TYPE_CHECKING:
+    from .apparatus import Apparatus
+
+
+class Session(object):
+    """
+    Keeps the components of an apparatus connected across protocol executions.
+
+    Normally, each call to `Protocol.execute` opens every component's connection and closes it again afterwards.
+    While a session is active, components are connected the first time a protocol uses them and stay connected until the session ends.
+    Components that fail during a run are reconnected before the next one.
+
+    ::: tip
+    Sessions are created with `Apparatus.session` and used as a context manager.
+    :::
+
+    Arguments:
+    - `apparatus`: The apparatus whose components to keep connected.
+    - `isolate`: Components to host in their own worker processes. See `Protocol.execute`.
+    - `device_timeout`: How long, in seconds, each component gets to come up or shut down.
+
+    Attributes:
+    - `apparatus`: The apparatus whose components are kept connected.
+    - `device_timeout`: How long, in seconds, each component gets to come up or shut down.
+    - `isolate`: The components hosted in their own worker processes.
+    """
+
+    def __init__(
+        self,
+        apparatus: "Apparatus",
+        isolate: Optional[Iterable[ActiveComponent]] = None,
+        device_timeout: float = 10.0,
+    ):
+        self.apparatus = apparatus
+        self.isolate: Set[ActiveComponent] = set(isolate) if isolate else set()
+        self.device_timeout = device_timeout
+        self._managers: Dict[ActiveComponent, Any] = {}
+        self._unhealthy: Set[ActiveComponent] = set()
+
+    def __repr__(self):
+        return f"<Session for {repr(self.apparatus)}>"
+
+    def __enter__(self):
+        if self.apparatus._session is not None:
+            raise RuntimeError(f"{self.apparatus} already has an active session.")
+        self.apparatus._session = self
+        logger.debug(f"Started session for {self.apparatus}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """Disconnects all of the components and ends the session."""
+        _shut_down(self._managers.values(), self.device_timeout)
+        self._managers = {}
+        self._unhealthy = set()
+        if self.apparatus._session is self:
+            self.apparatus._session = None
+        logger.debug(f"Ended session for {self.apparatus}")
+
+    async def _connect(
+        self, components: Iterable[ActiveComponent]
+    ) -> Dict[ActiveComponent, Any]:
+        """
+        Makes sure that the components are connected and healthy.
+
+        Returns:
+        - A dict mapping each component to its context manager, which is either the component itself or its `DeviceWorker`.
+        """
+        components = list(components)
+
+        # drop the connections that misbehaved or whose workers have died
+        stale = [
+            c
+            for c, m in self._managers.items()
+            if c in self._unhealthy
+            or (isinstance(m, DeviceWorker) and not m.is_alive())
+        ]
+        if stale:
+            logger.info(f"Reconnecting {', '.join(str(c) for c in stale)}")
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None,
+                _shut_down,
+                [self._managers.pop(c) for c in stale],
+                self.device_timeout,
+            )
+            self._unhealthy.difference_update(stale)
+
+        missing = [c for c in components if c not in self._managers]
+        if missing:
+            await _bring_up(missing, self.isolate, self.device_timeout, self._managers)
+        else:
+            logger.debug("All components are already connected.")
+
+        return {c: self._managers[c] for c in components}
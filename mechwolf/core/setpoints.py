@@ -0,0 +1,174 @@
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Union
+
+from pint import DimensionalityError
+
+from .. import _ureg
+from .units import _seconds
+
+
+class SetpointProgram(object):
+    """
+    A setpoint that changes over the course of a procedure.
+
+    Pass one in place of a value in `Protocol.add` to ramp a parameter instead of adding many short procedures.
+    Only the program is stored in the compiled protocol; the executor samples it as the procedure runs.
+
+    ::: tip
+    Users should not directly instantiate a `SetpointProgram`. Use `Ramp`, `Steps`, or `Profile`.
+    :::
+
+    Arguments:
+    - `interval`: How often to send a new setpoint to the device, such as `"5 seconds"`. Defaults to the component's `_sample_interval`, and is never shorter than it.
+    """
+
+    def __init__(self, interval: Union[str, timedelta, None] = None):
+        self.interval = _seconds(interval) if interval is not None else None
+
+    def __call__(self, t: float, duration: float) -> Any:
+        """The setpoint `t` seconds into a procedure lasting `duration` seconds."""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{self.__str__()}>"
+
+    def _points(self) -> List[Any]:
+        """Representative setpoints, used to check the program against the component."""
+        raise NotImplementedError
+
+    def _sample_times(self, duration: float, interval: float) -> Iterator[float]:
+        """The times, in seconds from the start of the procedure, at which to send a new setpoint."""
+        i = 0
+        while i * interval < duration:
+            yield i * interval
+            i += 1
+        yield duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A description of the program that can be serialized to YAML or JSON."""
+        raise NotImplementedError
+
+    @staticmethod
+    def from_dict(description: Mapping[str, Any]) -> "SetpointProgram":
+        """
+        Recreates a program from the output of `SetpointProgram.to_dict`.
+
+        Raises:
+        - `ValueError`: The description is of a `Profile`, whose function can't be serialized, or isn't of a program at all.
+        """
+        if "ramp" in description:
+            return Ramp(**description["ramp"])
+        elif "steps" in description:
+            return Steps(*description["steps"])
+        elif "profile" in description:
+            raise ValueError(
+                f"Can't load the profile of {description['profile']['function']}. "
+                "Profiles are defined by Python functions, which can't be serialized."
+            )
+        raise ValueError(f"{description} is not a setpoint program.")
+
+
+class Ramp(SetpointProgram):
+    """
+    A linear ramp from one setpoint to another over the course of a procedure.
+
+    Arguments:
+    - `start`: The setpoint at the beginning of the procedure, such as `"1 mL/min"`.
+    - `stop`: The setpoint at the end of the procedure, such as `"5 mL/min"`.
+    - `interval`: How often to send a new setpoint to the device. Defaults to the component's `_sample_interval`.
+
+    Example:
+    ```python
+    P.add(pump, rate=mw.Ramp("1 mL/min", "5 mL/min"), start="0 secs", stop="2 mins")
+    ```
+    """
+
+    def __init__(self, start: str, stop: str, interval=None):
+        super().__init__(interval=interval)
+        self.start = start
+        self.stop = stop
+        self._start = _ureg.parse_expression(start)
+        # interpolate in the units of the start so that offset units like degC work
+        try:
+            self._stop = _ureg.parse_expression(stop).to(self._start.units)
+        except DimensionalityError:
+            raise ValueError(f"Can't ramp from {start} to {stop}. Units must match.")
+
+    def __call__(self, t: float, duration: float) -> str:
+        fraction = min(max(t / duration, 0.0), 1.0) if duration else 1.0
+        magnitude = self._start.magnitude + fraction * (
+            self._stop.magnitude - self._start.magnitude
+        )
+        return f"{magnitude} {self._start.units}"
+
+    def __str__(self):
+        return f"Ramp from {self.start} to {self.stop}"
+
+    def _points(self) -> List[Any]:
+        return [self.start, self.stop]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(ramp=dict(start=self.start, stop=self.stop, interval=self.interval))
+
+
+class Steps(SetpointProgram):
+    """
+    A series of setpoints, each held for an equal part of the procedure.
+
+    Unlike other programs, the setpoint is only sent when it changes.
+
+    Arguments:
+    - `*values`: The setpoints, in order, such as `"1 mL/min", "2 mL/min"`.
+    """
+
+    def __init__(self, *values: Any):
+        if not values:
+            raise ValueError("Steps must have at least one setpoint.")
+        super().__init__()
+        self.values = list(values)
+
+    def __call__(self, t: float, duration: float) -> Any:
+        if not duration:
+            return self.values[-1]
+        i = int(t / duration * len(self.values))
+        return self.values[min(max(i, 0), len(self.values) - 1)]
+
+    def __str__(self):
+        return f"Steps through {', '.join(str(x) for x in self.values)}"
+
+    def _points(self) -> List[Any]:
+        return self.values
+
+    def _sample_times(self, duration: float, interval: float) -> Iterator[float]:
+        for i in range(len(self.values)):
+            yield i * duration / len(self.values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(steps=self.values)
+
+
+class Profile(SetpointProgram):
+    """
+    A setpoint given by a function of time.
+
+    Arguments:
+    - `function`: A function of the number of seconds since the start of the procedure that gives the setpoint, such as `lambda t: f"{20 + t / 60} degC"`.
+    - `interval`: How often to send a new setpoint to the device. Defaults to the component's `_sample_interval`.
+    """
+
+    def __init__(self, function: Callable[[float], Any], interval=None):
+        super().__init__(interval=interval)
+        self.function = function
+
+    def __call__(self, t: float, duration: float) -> Any:
+        return self.function(t)
+
+    def __str__(self):
+        return f"Profile of {getattr(self.function, '__name__', self.function)}"
+
+    def _points(self) -> List[Any]:
+        return [self.function(0.0)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        name: Optional[str] = getattr(self.function, "__qualname__", None)
+        return dict(profile=dict(function=name, interval=self.interval))
@@ -0,0 +1,183 @@
+import sys
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+
+def _changes(method):
+    """Wraps a mutating method of a procedure or its params so that the procedure is marked as changed."""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._changed()
+        return result
+
+    return wrapper
+
+
+class _Params(dict):
+    """A procedure's params, which mark the procedure as changed when they change."""
+
+    def __init__(self, procedure: "_Procedure", params: Mapping[str, Any]):
+        super().__init__(params)
+        self._procedure = procedure
+
+    def _changed(self) -> None:
+        self._procedure._changed()
+
+    # copies and pickles, such as of compiled schedules, are plain dicts
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    __setitem__ = _changes(dict.__setitem__)
+    __delitem__ = _changes(dict.__delitem__)
+    clear = _changes(dict.clear)
+    pop = _changes(dict.pop)
+    popitem = _changes(dict.popitem)
+    setdefault = _changes(dict.setdefault)
+    update = _changes(dict.update)
+    if sys.version_info >= (3, 9):
+        __ior__ = _changes(dict.__ior__)
+
+
+class _Procedure(dict):
+    """
+    A procedure in a protocol, which remembers its hash until it's changed.
+
+    Its params are copied into a `_Params`, which is replaced whenever the params are.
+    """
+
+    def __init__(self, owner: "_ProcedureList", procedure: Mapping[str, Any]):
+        super().__init__(procedure)
+        self._owner = owner
+        self._digest: Optional[int] = None
+        self._listed = False
+        self._wrap_params()
+
+    def _wrap_params(self) -> None:
+        params = self.get("params")
+        if isinstance(params, Mapping) and not (
+            isinstance(params, _Params) and params._procedure is self
+        ):
+            dict.__setitem__(self, "params", _Params(self, params))
+
+    def _changed(self) -> None:
+        self._wrap_params()
+        self._owner._changed(self)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    __setitem__ = _changes(dict.__setitem__)
+    __delitem__ = _changes(dict.__delitem__)
+    clear = _changes(dict.clear)
+    pop = _changes(dict.pop)
+    popitem = _changes(dict.popitem)
+    setdefault = _changes(dict.setdefault)
+    update = _changes(dict.update)
+    if sys.version_info >= (3, 9):
+        __ior__ = _changes(dict.__ior__)
+
+
+class _ProcedureList(List[Dict[str, Any]]):
+    """
+    A protocol's procedures, which keep a running sum of their hashes.
+
+    Every procedure put in the list is made into a `_Procedure`, which is a copy unless it's a procedure that was taken out of this list.
+    Procedures that were added or changed are hashed the next time the sum is needed, and the hashes of those that were removed are subtracted from it, so the sum is never recomputed from scratch.
+    Sorting and reversing don't change the sum.
+    """
+
+    def __init__(self, procedures: Iterable[Mapping[str, Any]] = ()):
+        super().__init__()
+        self._sum = 0
+        self._pending: List[_Procedure] = []
+        self.extend(procedures)
+
+    def _adopt(self, procedure: Mapping[str, Any]) -> _Procedure:
+        # each procedure can only be in the list once, so that it's only summed once
+        if not (
+            isinstance(procedure, _Procedure)
+            and procedure._owner is self
+            and not procedure._listed
+        ):
+            procedure = _Procedure(self, procedure)
+        procedure._listed = True
+        if procedure._digest is None:
+            self._pending.append(procedure)
+        else:
+            self._sum += procedure._digest
+        return procedure
+
+    def _release(self, procedure: _Procedure) -> None:
+        procedure._listed = False
+        if procedure._digest is not None:
+            self._sum -= procedure._digest
+
+    def _changed(self, procedure: _Procedure) -> None:
+        if procedure._listed and procedure._digest is not None:
+            self._sum -= procedure._digest
+            self._pending.append(procedure)
+        procedure._digest = None
+
+    def _digest_sum(self, digest: Callable[[Mapping[str, Any]], int]) -> int:
+        """The sum of the procedures' hashes, hashing those that were added or changed since the last call with `digest`."""
+        for procedure in self._pending:
+            # procedures that were removed since, or added twice, are skipped
+            if procedure._listed and procedure._digest is None:
+                procedure._digest = digest(procedure)
+                self._sum += procedure._digest
+        self._pending = []
+        return self._sum
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+    def append(self, procedure):
+        super().append(self._adopt(procedure))
+
+    def extend(self, procedures):
+        super().extend([self._adopt(x) for x in procedures])
+
+    def insert(self, index, procedure):
+        super().insert(index, self._adopt(procedure))
+
+    def __iadd__(self, procedures):  # type: ignore
+        self.extend(procedures)
+        return self
+
+    def __imul__(self, times):  # type: ignore
+        if times <= 0:
+            self.clear()
+        else:
+            self.extend(list(self) * (times - 1))
+        return self
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for procedure in self[index]:
+                self._release(procedure)
+            value = [self._adopt(x) for x in value]
+        else:
+            self._release(self[index])
+            value = self._adopt(value)
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        for procedure in removed:
+            self._release(procedure)
+        super().__delitem__(index)
+
+    def pop(self, index=-1):
+        procedure = super().pop(index)
+        self._release(procedure)
+        return procedure
+
+    def remove(self, procedure):
+        del self[self.index(procedure)]
+
+    def clear(self):
+        for procedure in self:
+            self._release(procedure)
+        super().clear()
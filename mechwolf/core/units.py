@@ -0,0 +1,15 @@
+from datetime import timedelta
+from typing import Union
+
+from .. import _ureg
+
+
+def _seconds(duration: Union[str, float, timedelta, None]) -> float:
+    """Parses a duration such as `"2 seconds"` or a `datetime.timedelta` into seconds."""
+    if duration is None:
+        return 0.0
+    if isinstance(duration, timedelta):
+        return duration.total_seconds()
+    if isinstance(duration, str):
+        return float(_ureg.parse_expression(duration).to("seconds").magnitude)
+    return float(duration)
@@ -0,0 +1,253 @@
+import asyncio
+import multiprocessing
+import time
+import traceback
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from loguru import logger
+
+from .. import _ureg
+from ..components import ActiveComponent, Sensor
+
+# each sample in the shared ring buffer is stored as (timestamp, value, is_int)
+_SLOT = 3
+
+
+def _picklable_state(component: ActiveComponent, keys: Iterable[str]) -> Dict[str, Any]:
+    """Snapshot the given attributes of a component so that they can be sent to a worker."""
+    state = {}
+    for key in keys:
+        value = getattr(component, key)
+        # quantities are round-tripped as strings since they're parsed on the other side
+        quantity = isinstance(value, _ureg.Quantity)  # type: ignore
+        state[key] = str(value) if quantity else value
+    return state
+
+
+def _serve(component: ActiveComponent, commands, samples, buffer, head) -> None:
+    """
+    The body of a worker process.
+
+    Enters the component's context, checks that it can be driven, and then serves update commands from the pipe.
+    When the component is a sensor with a nonzero rate, it is read on schedule between commands.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    sensor = component if isinstance(component, Sensor) else None
+    capacity = len(buffer) // _SLOT
+
+    try:
+        with component:
+            # the same checks that _validate() would do in the parent process
+            loop.run_until_complete(component._check())
+            commands.send(("ready", None))
+
+            next_read: Optional[float] = None
+            while True:
+                # when sampling, only wait for commands until the next read is due
+                timeout = None
+                if sensor is not None and sensor.rate:
+                    if next_read is None:
+                        next_read = time.monotonic()
+                    timeout = max(0.0, next_read - time.monotonic())
+                else:
+                    next_read = None
+
+                if commands.poll(timeout):
+                    command, payload = commands.recv()
+                    if command == "close":
+                        break
+                    try:
+                        component._update_from_params(payload)
+                        loop.run_until_complete(component._update())
+                    except Exception:
+                        commands.send(("error", traceback.format_exc()))
+                    else:
+                        commands.send(("ok", None))
+                    continue
+
+                # if we get here, a read is due, which only happens for sensors
+                assert sensor is not None
+                try:
+                    data = loop.run_until_complete(sensor._read())
+                except Exception:
+                    samples.send(("error", traceback.format_exc()))
+                    # stop sampling until told otherwise so we don't flood the parent
+                    sensor.rate = 0 * sensor.rate
+                    continue
+
+                timestamp = time.time()
+                if isinstance(data, (int, float)) and not isinstance(data, bool):
+                    slot = (head.value % capacity) * _SLOT
+                    buffer[slot] = timestamp
+                    buffer[slot + 1] = data
+                    buffer[slot + 2] = isinstance(data, int)
+                    head.value += 1  # publish only once the slot is written
+                else:
+                    # anything that doesn't fit in the buffer goes through the pipe
+                    samples.send(("data", (timestamp, data)))
+
+                assert next_read is not None  # make the type checker happy
+                next_read = max(
+                    next_read + 1 / sensor.rate.to_base_units().magnitude,
+                    time.monotonic(),
+                )
+    except Exception:
+        commands.send(("error", traceback.format_exc()))
+    finally:
+        loop.close()
+
+
+class DeviceWorker(object):
+    """
+    Hosts an `ActiveComponent` in a separate process.
+
+    Drivers that block inside C calls or hold the GIL can only stall their own worker, not the event loop running the rest of the protocol.
+    Commands are sent over a pipe and acknowledged by the worker.
+    Numeric sensor readings are written by the worker into a shared memory ring buffer, which the parent drains without a round trip.
+
+    Arguments:
+    - `component`: The component to host. It must be picklable when not in context.
+    - `timeout`: How long, in seconds, to wait for the device to come up or acknowledge a command before giving up on it.
+    - `capacity`: The number of sensor readings that the ring buffer can hold between drains.
+
+    Attributes:
+    - `component`: The hosted component.
+    - `timeout`: How long, in seconds, to wait for the device to come up or acknowledge a command before giving up on it.
+    """
+
+    def __init__(
+        self, component: ActiveComponent, timeout: float = 10.0, capacity: int = 4096
+    ):
+        self.component = component
+        self.timeout = timeout
+
+        ctx = multiprocessing.get_context()
+        self._commands, child_commands = ctx.Pipe()
+        self._samples, child_samples = ctx.Pipe(duplex=False)
+        self._buffer = ctx.Array("d", capacity * _SLOT, lock=False)
+        self._head = ctx.Value("Q", 0, lock=False)
+        self._tail = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._process = ctx.Process(
+            target=_serve,
+            args=(component, child_commands, child_samples, self._buffer, self._head),
+            name=f"mechwolf-{component.name}",
+            daemon=True,
+        )
+
+    def __repr__(self):
+        return f"<DeviceWorker for {repr(self.component)}>"
+
+    def __enter__(self):
+        logger.trace(f"Starting worker process for {self.component}")
+        self._process.start()
+
+        if not self._commands.poll(self.timeout):
+            self._kill()
+            raise RuntimeError(
+                f"{self.component} did not come up within {self.timeout}s."
+            )
+        status, payload = self._commands.recv()
+        if status == "error":
+            self._process.join(self.timeout)
+            raise RuntimeError(f"Failed to bring up {self.component}:\n{payload}")
+
+        logger.debug(f"{self.component} is running in process {self._process.pid}")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._process.is_alive():
+            try:
+                self._commands.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            self._process.join(self.timeout)
+        if self._process.is_alive():
+            logger.warning(f"{self.component} did not shut down cleanly.")
+            self._kill()
+        self._commands.close()
+        self._samples.close()
+
+    def is_alive(self) -> bool:
+        """Whether the worker process is still running."""
+        return self._process.is_alive()
+
+    def _kill(self) -> None:
+        self._process.terminate()
+        self._process.join()
+
+    async def update(self, params: Mapping[str, Any]) -> None:
+        """
+        Sets the hosted component's attributes and calls its `_update()` in the worker.
+
+        Arguments:
+        - `params`: A dict of attribute names to values, as accepted by `ActiveComponent._update_from_params`.
+
+        Raises:
+        - `RuntimeError`: When the worker is dead, reports an error, or doesn't answer within the timeout. A worker that times out is terminated.
+        """
+        if not self._process.is_alive():
+            raise RuntimeError(
+                f"The worker process for {self.component} is not running."
+            )
+
+        # commands and acknowledgements must not interleave
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._commands.send(("update", dict(params)))
+            loop = asyncio.get_event_loop()
+            acknowledged = await loop.run_in_executor(
+                None, self._commands.poll, self.timeout
+            )
+            if not acknowledged:
+                self._kill()
+                raise RuntimeError(
+                    f"{self.component} did not respond within {self.timeout}s. "
+                    "Its worker process was terminated."
+                )
+            status, payload = self._commands.recv()
+
+        if status == "error":
+            raise RuntimeError(f"Failed to update {self.component}:\n{payload}")
+
+    def drain(self) -> List[Tuple[float, Any]]:
+        """
+        Collects the sensor readings taken since the last call.
+
+        Returns:
+        - A list of `(timestamp, data)` tuples in chronological order.
+
+        Raises:
+        - `RuntimeError`: When the worker failed to read the sensor.
+        """
+        head = self._head.value
+        capacity = len(self._buffer) // _SLOT
+
+        # leave a slot of headroom since the worker may be writing into it right now
+        if head - self._tail >= capacity:
+            dropped = head - self._tail - capacity + 1
+            logger.warning(f"Dropped {dropped} readings from {self.component}.")
+            self._tail += dropped
+
+        readings = []
+        for i in range(self._tail, head):
+            start = (i % capacity) * _SLOT
+            end = start + _SLOT
+            timestamp, value, is_int = self._buffer[start:end]
+            readings.append((timestamp, int(value) if is_int else value))
+        self._tail = head
+
+        while self._samples.poll():
+            try:
+                kind, payload = self._samples.recv()
+            except EOFError:
+                # the worker died, which is for the caller to check with is_alive()
+                break
+            if kind == "error":
+                raise RuntimeError(f"Failed to read {self.component}:\n{payload}")
+            readings.append(payload)
+
+        return sorted(readings, key=lambda x: x[0])
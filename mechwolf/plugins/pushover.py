@@ -1,32 +1,197 @@
-from typing import Callable
+import atexit
+import queue
+import threading
+import time
+from typing import List, Optional
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
 
 from loguru import logger
 
+PUSHOVER_URL = "https://api.pushover.net/1/messages.json"
 
-def generate_sink(token: str, user: str) -> Callable:
-    import requests
+# the longest message that Pushover accepts
+_MAX_LENGTH = 1024
 
-    def sink(message):
-        requests.post(
-            "https://api.pushover.net/1/messages.json",
-            data=dict(
-                token=token,
-                user=user,
-                message=message.record["level"].icon + ": " + message.record["message"],
-                title="MechWolf ⚙️🐺",
-            ),
-        )
 
-    return sink
+class PushoverSink(object):
+    """
+    A logger sink that sends log messages as [Pushover](https://pushover.net) notifications without blocking.
+
+    Messages are queued and sent from a background thread.
+    Messages that arrive within `window` seconds of each other are combined into one notification, so that a burst of warnings doesn't become a burst of notifications.
+    Failed requests are retried with exponential backoff, and when Pushover says that the app is out of messages, nothing more is sent until its limit resets.
+
+    ::: tip
+    Users should use `mechwolf.plugins.pushover` rather than creating this directly.
+    :::
+
+    Arguments:
+    - `token`: Your Pushover token.
+    - `user`: The user key for your account.
+    - `window`: How long, in seconds, to wait for more messages to combine with the first one.
+    - `max_queue`: The most messages to hold while waiting to send them. Once the queue is full, new messages are dropped and the next notification says how many.
+    - `retries`: How many times to retry a notification that fails to send.
+    - `backoff`: How long, in seconds, to wait before the first retry. Each retry waits twice as long as the last.
+    - `timeout`: How long, in seconds, to wait for Pushover to respond.
+    - `url`: Where to send the notifications.
+
+    Attributes:
+    - `dropped`: How many messages were dropped because the queue was full.
+    - `failed`: How many notifications couldn't be sent.
+    - `sent`: How many notifications were sent.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        user: str,
+        window: float = 10.0,
+        max_queue: int = 1000,
+        retries: int = 3,
+        backoff: float = 1.0,
+        timeout: float = 10.0,
+        url: str = PUSHOVER_URL,
+    ):
+        self.token = token
+        self.user = user
+        self.window = window
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.url = url
+        self.dropped = 0
+        self.failed = 0
+        self.sent = 0
+
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue)
+        self._unreported = 0  # dropped messages that haven't been mentioned yet
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._paused_until = 0.0
+        self._thread = threading.Thread(target=self._run, name="pushover", daemon=True)
+        self._thread.start()
+        atexit.register(self.close, timeout=timeout)
+
+    def __repr__(self):
+        return f"<PushoverSink for {self.user}>"
+
+    def __call__(self, message) -> None:
+        record = message.record
+        try:
+            self._queue.put_nowait(f"{record['level'].icon}: {record['message']}")
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Sends the messages that are still queued, then stops the background thread.
 
+        Arguments:
+        - `timeout`: How long, in seconds, to wait for the messages to be sent. If `None`, waits until they are.
+        """
+        self._closed.set()
+        self._thread.join(timeout)
 
-def pushover(token: str, user: str, level: str):
+    def _run(self) -> None:
+        while True:
+            try:
+                lines = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+
+            # wait for more messages to go with the first, unless we're closing
+            deadline = time.monotonic() + self.window
+            while not self._closed.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    lines.append(self._queue.get(timeout=min(remaining, 0.1)))
+                except queue.Empty:
+                    pass
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._deliver(self._format(lines))
+
+    def _format(self, lines: List[str]) -> str:
+        with self._lock:
+            dropped, self._unreported = self._unreported, 0
+        if dropped:
+            lines.append(f"({dropped} more messages were dropped)")
+
+        # fit as many lines as we can, saying how many didn't fit
+        text = "\n".join(lines)
+        if len(text) <= _MAX_LENGTH:
+            return text
+        for i in range(len(lines) - 1, 0, -1):
+            text = "\n".join(lines[:i] + [f"... and {len(lines) - i} more"])
+            if len(text) <= _MAX_LENGTH:
+                return text
+        return text[: _MAX_LENGTH - 3] + "..."
+
+    def _deliver(self, text: str) -> None:
+        data = urlencode(
+            dict(token=self.token, user=self.user, message=text, title="MechWolf ⚙️🐺")
+        ).encode()
+        for attempt in range(self.retries + 1):
+            # honor the rate limit, giving up if we're closing in the meantime
+            delay = self._paused_until - time.time()
+            if delay > 0 and self._closed.wait(delay):
+                break
+
+            try:
+                with urlopen(Request(self.url, data=data), timeout=self.timeout) as r:
+                    self._check_limits(r.headers)
+                self.sent += 1
+                return
+            except HTTPError as e:
+                self._check_limits(e.headers)
+                # other client errors, such as a bad token, won't go away by retrying
+                if e.code != 429 and 400 <= e.code < 500:
+                    break
+                if e.code == 429 and self._paused_until > time.time():
+                    continue
+            except (URLError, OSError):
+                pass
+
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2**attempt)
+        self.failed += 1
+
+    def _check_limits(self, headers) -> None:
+        """Pauses sending until the app's limit resets once it has no messages left."""
+        if headers is None:
+            return
+        remaining = headers.get("X-Limit-App-Remaining")
+        reset = headers.get("X-Limit-App-Reset")
+        if remaining is not None and reset is not None and int(remaining) <= 0:
+            self._paused_until = float(reset)
+
+
+def generate_sink(token: str, user: str, **kwargs) -> PushoverSink:
+    """Creates a `PushoverSink`. See `PushoverSink` for the keyword arguments."""
+    return PushoverSink(token=token, user=user, **kwargs)
+
+
+def pushover(token: str, user: str, level: str, **kwargs) -> PushoverSink:
     """Bind [Pushover](https://pushover.net) notifications to the MechWolf logger.
 
     Pushover is an online service that takes care of most of the complexity of sending push notifications to mobile devices.
     This function handles the API calls and logger configuration: all you need to do is set up your Pushover account and download the app.
     At the time of this writing, the app is a one-time $5 purchase.
 
+    Notifications are sent in the background, so logging never waits on Pushover.
+    Messages that arrive close together are combined into one notification, which keeps a burst of warnings from running into Pushover's limits.
 
     To set up an account, you will require a token and a user key.
     Please see [this guide](https://pushover.net/api) for more information.
@@ -35,6 +200,10 @@ def pushover(token: str, user: str, level: str):
     - `token`: Your Pushover token.
     - `user`: The user key for your account.
     - `level`: The logging level. See `Protocol.execute` for the valid level strings.
+    - `**kwargs`: Options for how the notifications are sent, such as `window`, the number of seconds over which to combine messages. See `PushoverSink`.
+
+    Returns:
+    - The sink, which can be closed to send any remaining messages right away.
 
     Example:
     ```python
@@ -42,8 +211,9 @@ def pushover(token: str, user: str, level: str):
     mw.plugins.pushover(YOUR_TOKEN, YOUR_USER_KEY, "info")
     ```
     """
-
-    logger.add(generate_sink(token=token, user=user), level=level.upper(), enqueue=True)
+    sink = generate_sink(token=token, user=user, **kwargs)
+    logger.add(sink, level=level.upper())
+    return sink
 
 
 pushover.metadata = {  # type: ignore
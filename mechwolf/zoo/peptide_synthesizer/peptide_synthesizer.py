@@ -1,8 +1,10 @@
-# from datetime import timedelta
-from typing import List, Sequence, cast
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union, cast
 
 import mechwolf as mw
 
+from ...core.units import _seconds
+
 
 def validate_peptide(peptide: Sequence) -> List[str]:
     one_to_three_letter_aa_code = {
@@ -149,150 +151,136 @@ def create_apparatus(
     return A
 
 
-def create_protocol(peptide: Sequence, apparatus: mw.Apparatus) -> mw.Protocol:
-    pass
-
-
-#     valve1, valve2, valve3 = apparatus.compon
-
-#     peptide = validate_peptide(peptide)
-
-#     P = mw.Protocol(apparatus)
-
-#     start = timedelta(seconds=0)
-
-#     deprotection_duration = timedelta(seconds=60)
-#     wash_duration = timedelta(seconds=30)
-#     coupling_duration = timedelta(seconds=60)
-
-#     # how much time to leave the pumps off before and after switching the valve
-#     # should be 2 seconds minimum
-#     switching_duration = timedelta(seconds=2)
-
-#     for FmocAa in peptide:
-
-#         # Deprotection
-#         P.add(
-#             valve3,
-#             start=start + (switching_duration / 2),
-#             duration=deprotection_duration + switching_duration,
-#             setting="deprotection",
-#         )
-#         P.add(
-#             pump3,
-#             start=start + switching_duration,
-#             duration=deprotection_duration,
-#             rate="5ml/min",
-#         )
-
-#         start = start + deprotection_duration + switching_duration
-
-#         # Wash
-#         P.add(
-#             valve3,
-#             start=start + (switching_duration / 2),
-#             duration=wash_duration + switching_duration,
-#             setting="solvent",
-#         )
-#         P.add(
-#             pump3,
-#             start=start + switching_duration,
-#             duration=wash_duration,
-#             rate="5ml/min",
-#         )
-
-#         start += wash_duration + switching_duration
-
-#         # Coupling
-#         if FmocAa in valve1_mapping:
-#             print("{} found on valve1.".format(FmocAa))
-#             P.add(
-#                 valve1,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting=FmocAa,
-#             )
-#             P.add(
-#                 valve2,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting="coupling_agent",
-#             )
-#             P.add(
-#                 valve3,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting="coupling_base",
-#             )
-
-#         elif FmocAa in valve2_mapping:
-#             print("{} found on valve2.".format(FmocAa))
-#             P.add(
-#                 valve1,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting="coupling_agent",
-#             )
-#             P.add(
-#                 valve2,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting=FmocAa,
-#             )
-#             P.add(
-#                 valve3,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting="coupling_base",
-#             )
-
-#         elif FmocAa in valve3_mapping:
-#             print("{} found on valve3.".format(FmocAa))
-#             P.add(
-#                 valve1,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting="coupling_agent",
-#             )
-#             P.add(
-#                 valve2,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting="coupling_base",
-#             )
-#             P.add(
-#                 valve3,
-#                 start=start + (switching_duration / 2),
-#                 duration=coupling_duration + switching_duration,
-#                 setting=FmocAa,
-#             )
-
-#         else:
-#             raise ValueError("Amino acid {} not found in any valve".format(FmocAa))
-
-#         P.add(
-#             [pump1, pump2, pump3],
-#             start=start + switching_duration,
-#             duration=coupling_duration,
-#             rate="5ml/min",
-#         )
-
-#         start += coupling_duration + switching_duration
-
-#         # Wash
-#         P.add(
-#             valve3,
-#             start=start + (switching_duration / 2),
-#             duration=wash_duration + switching_duration,
-#             setting="solvent",
-#         )
-#         P.add(
-#             pump3,
-#             start=start + switching_duration,
-#             duration=wash_duration,
-#             rate="5ml/min",
-#         )
-
-#         start += wash_duration + switching_duration
-
-#     return P
+def _index_reagents(
+    apparatus: mw.Apparatus,
+) -> Tuple[Dict[str, Tuple[mw.Valve, int]], Dict[str, Dict[mw.Valve, int]]]:
+    """
+    Finds which valve and port each reagent is on.
+
+    Returns:
+    - A dict of three letter amino acid codes to their `(valve, port)` and a dict of the other reagents' names to the ports they're on for each valve.
+    """
+    residues: Dict[str, Tuple[mw.Valve, int]] = {}
+    reagents: Dict[str, Dict[mw.Valve, int]] = {}
+    for valve in apparatus[mw.Valve]:
+        for vessel, port in (valve.mapping or {}).items():
+            # amino acid vessels are named like FmocArg_Pbf
+            if vessel.name.startswith("Fmoc"):
+                residues[vessel.name[4:7].lower()] = (valve, port)
+            else:
+                reagents.setdefault(vessel.name, {})[valve] = port
+    return residues, reagents
+
+
+def create_protocol(
+    peptide: Sequence,
+    apparatus: mw.Apparatus,
+    name: Optional[str] = None,
+    deprotection_duration: Union[str, timedelta] = "60 seconds",
+    wash_duration: Union[str, timedelta] = "30 seconds",
+    coupling_duration: Union[str, timedelta] = "60 seconds",
+    switching_duration: Union[str, timedelta] = "2 seconds",
+    rate: str = "5 mL/min",
+) -> mw.Protocol:
+    """
+    Creates a protocol to synthesize a peptide on an apparatus from `create_apparatus`.
+
+    Each residue gets a deprotection, a wash, a coupling, and another wash.
+    Around each step, the pumps are left off while the valves switch.
+
+    Arguments:
+    - `peptide`: The peptide, as a string of one letter amino acid codes or a list of one or three letter codes.
+    - `apparatus`: The apparatus on which to synthesize the peptide.
+    - `name`: The name of the protocol.
+    - `deprotection_duration`: How long to pump the deprotection solution for.
+    - `wash_duration`: How long to pump solvent for.
+    - `coupling_duration`: How long to pump the amino acid and coupling reagents for.
+    - `switching_duration`: How long to leave the pumps off around each step so that the valves can switch.
+    - `rate`: The rate at which to run the pumps.
+
+    Returns:
+    - The protocol.
+
+    Raises:
+    - `ValueError`: When an amino acid or reagent isn't on any of the apparatus's valves, or a valve isn't connected to a pump.
+    """
+    peptide = validate_peptide(peptide)
+    residues, reagents = _index_reagents(apparatus)
+    valves = sorted(apparatus[mw.Valve], key=lambda x: x.name)
+    pumps = {}
+    for valve in valves:
+        downstream = [
+            c.to_component
+            for c in apparatus._downstream.get(valve, [])
+            if isinstance(c.to_component, mw.Pump)
+        ]
+        if not downstream:
+            raise ValueError(f"No pump found downstream of {valve}.")
+        pumps[valve] = downstream[0]
+
+    for reagent in ["deprotection", "solvent", "coupling_agent", "coupling_base"]:
+        if reagent not in reagents:
+            raise ValueError(f"{reagent} not found in any valve.")
+    for aa in set(peptide):
+        if aa not in residues:
+            raise ValueError(f"Amino acid {aa} not found in any valve.")
+
+    P = mw.Protocol(apparatus, name=name, description="-".join(peptide))
+
+    # check each distinct setting once instead of on every cycle
+    pump_params = {"rate": rate}
+    for pump in pumps.values():
+        P._check_component_kwargs(pump, **pump_params)
+
+    deprotection = _seconds(deprotection_duration)
+    wash = _seconds(wash_duration)
+    coupling = _seconds(coupling_duration)
+    switching = _seconds(switching_duration)
+
+    # deprotection and washes happen on the valve with the deprotection solution
+    deprotection_valve, deprotection_port = next(iter(reagents["deprotection"].items()))
+    if deprotection_valve not in reagents["solvent"]:
+        raise ValueError(f"solvent not found on {deprotection_valve}.")
+
+    def step(start: float, duration: float, settings) -> float:
+        """Adds a step in which the valves are set and then their pumps run."""
+        for valve, port in settings:
+            P._append(
+                valve,
+                start=start + switching / 2,
+                stop=start + duration + switching * 3 / 2,
+                params={"setting": port},
+            )
+            P._append(
+                pumps[valve],
+                start=start + switching,
+                stop=start + switching + duration,
+                params=dict(pump_params),
+            )
+        return start + duration + switching
+
+    start = 0.0
+    for aa in peptide:
+        start = step(start, deprotection, [(deprotection_valve, deprotection_port)])
+        start = step(
+            start, wash, [(deprotection_valve, reagents["solvent"][deprotection_valve])]
+        )
+
+        # the amino acid's valve, with the coupling reagents on the other two
+        aa_valve, aa_port = residues[aa]
+        others = [valve for valve in valves if valve is not aa_valve]
+        start = step(
+            start,
+            coupling,
+            [
+                (aa_valve, aa_port),
+                (others[0], reagents["coupling_agent"][others[0]]),
+                (others[1], reagents["coupling_base"][others[1]]),
+            ],
+        )
+
+        start = step(
+            start, wash, [(deprotection_valve, reagents["solvent"][deprotection_valve])]
+        )
+
+    return P
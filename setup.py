@@ -41,11 +41,12 @@ setup(
         "jupyter",
         "loguru",
         "nest_asyncio",
-        "networkx",
+        "numpy",
         "Pint",
         "PyYAML",
         "terminaltables",
         "vega",
         "xxhash",
     ],
+    extras_require={"graph": ["networkx"], "msgpack": ["msgpack"]},
 )
@@ -42,6 +42,20 @@ def test__validate():
     A.add(b, d, t)  # fully connected
     assert A._validate()
 
+    # a valve's mapping may only name components connected to it
+    B = mw.Apparatus()
+    vessel, other, pump = mw.Vessel("a"), mw.Vessel("b"), mw.DummyPump()
+    valve = mw.Valve(mapping={vessel: 1, other: 2})
+    B.add(vessel, valve, t)
+    B.add(valve, pump, t)
+    with pytest.warns(UserWarning, match="has not been added"):
+        assert not B._validate()
+    B.add(pump, other, t)
+    with pytest.warns(UserWarning, match="not connected"):
+        assert not B._validate()
+    B.add(other, valve, t)
+    assert B._validate()
+
 
 def test_describe():
     C = mw.Apparatus()
@@ -50,3 +64,49 @@ def test_describe():
         C.describe()
         == "A vessel containing water was connected to Component Component_1 using PVC tubing (length 1 foot, ID 1 inch, OD 2 inch). "
     )
+
+
+def test_getitem():
+    D = mw.Apparatus()
+    pump = mw.DummyPump(name="indexed pump")
+    vessel = mw.Vessel("water", name="indexed vessel")
+    D.add(vessel, pump, t)
+    assert D["indexed pump"] is pump
+    assert D[pump] is pump
+    assert D[mw.ActiveComponent] == [pump]
+
+    # the indexes are kept up to date as components are added
+    sensor = mw.DummySensor(name="indexed sensor")
+    D.add(pump, sensor, t)
+    assert D["indexed sensor"] is sensor
+    assert D[mw.ActiveComponent] == [pump, sensor]
+    assert D[mw.Sensor] == [sensor]
+
+    with pytest.raises(KeyError):
+        D["missing"]
+
+    with pytest.raises(ValueError, match="duplicated name"):
+        D.add(mw.Vessel("water", name="indexed vessel"), pump, t)
+
+
+def test_add_cartesian_product():
+    E = mw.Apparatus()
+    vessels = [mw.Vessel("water", name=f"product vessel {i}") for i in range(20)]
+    valves = [mw.Valve(name=f"product valve {i}", mapping={}) for i in range(3)]
+    E.add(vessels, valves, t)
+    assert len(E.network) == 60
+    assert E.network[:3] == [(vessels[0], valve, t) for valve in valves]
+    assert [c.to_component for c in E._downstream[vessels[0]]] == valves
+    assert [c.from_component for c in E._upstream[valves[0]]] == vessels
+
+    with pytest.warns(UserWarning, match="Duplicate connection"):
+        E.add(vessels[0], valves[0], t)
+    assert len(E.network) == 60
+
+
+def test_to_networkx():
+    nx = pytest.importorskip("networkx")
+    G = A.to_networkx()
+    assert set(G.nodes) == A.components
+    assert G.number_of_edges() == len(A.network)
+    assert nx.is_weakly_connected(G)
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+import mechwolf as mw
+
+
+class SlowDummy(mw.Dummy):
+    """A dummy that takes a while to connect, like a board waiting for its banner."""
+
+    def __init__(self, name=None, delay=0.5):
+        super().__init__(name=name)
+        self.delay = delay
+        self.entered = False
+
+    def __enter__(self):
+        time.sleep(self.delay)
+        self.entered = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        time.sleep(self.delay)
+        self.entered = False
+
+    async def _update(self):
+        pass
+
+
+def create_protocol(dummies, name):
+    A = mw.Apparatus()
+    A.add(
+        mw.Vessel(name=f"{name} vessel"),
+        dummies,
+        mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC"),
+    )
+    P = mw.Protocol(A, name=name)
+    P.add(dummies, active=True, start="0 secs", stop="0.1 secs")
+    return P
+
+
+def test_concurrent_bring_up():
+    dummies = [SlowDummy(name=f"slow {i}") for i in range(4)]
+    P = create_protocol(dummies, "testing bring up")
+
+    E = P.execute(confirm=True, log_file=None, data_file=None)
+    # sequentially, that would have been two seconds each way
+    assert E.setup_duration < 1.5
+    assert E.teardown_duration < 1.5
+    assert not any(dummy.entered for dummy in dummies)
+
+
+def test_bring_up_timeout():
+    dummies = [SlowDummy(name="fine"), SlowDummy(name="hung", delay=2)]
+    P = create_protocol(dummies, "testing bring up timeout")
+
+    with pytest.raises(RuntimeError, match="hung did not come up"):
+        P.execute(confirm=True, log_file=None, data_file=None, device_timeout=0.75)
+
+
+class CheckedDummy(mw.Dummy):
+    """A dummy that takes a while to respond to updates."""
+
+    async def _update(self):
+        await asyncio.sleep(0.25)
+
+
+def test_concurrent_preflight():
+    dummies = [CheckedDummy(name=f"checked {i}") for i in range(4)]
+    P = create_protocol(dummies, "testing preflight")
+
+    # compiling doesn't touch the devices
+    start = time.time()
+    P._compile()
+    assert time.time() - start < 0.25
+
+    # checking four devices one by one would take a second
+    E = P.execute(confirm=True, log_file=None, data_file=None)
+    assert E.setup_duration < 0.75
+
+
+class BrokenDummy(mw.Dummy):
+    """A dummy that can't be turned on and takes a while to turn off."""
+
+    async def _update(self):
+        if self.active:
+            raise RuntimeError("Can't turn on")
+        await asyncio.sleep(0.2)
+
+
+class RecordingDummy(mw.Dummy):
+    def __init__(self, name=None):
+        super().__init__(name=name)
+        self.pushed = []
+
+    async def _update(self):
+        self.pushed.append(self.active)
+
+
+def test_reset_after_failure():
+    broken = BrokenDummy(name="broken")
+    dummy = RecordingDummy(name="recording")
+    A = mw.Apparatus()
+    A.add(
+        mw.Vessel(name="reset vessel"),
+        [broken, dummy],
+        mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC"),
+    )
+    P = mw.Protocol(A, name="testing reset")
+    P.add(broken, active=True, start="0.1 secs", stop="0.5 secs")
+    P.add(dummy, active=True, start="0.15 secs", stop="0.5 secs")
+
+    P.execute(confirm=True, log_file=None, data_file=None)
+
+    # the run stopped before the dummy was turned on, even though resetting took longer
+    assert dummy.pushed == [False]
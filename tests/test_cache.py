@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import mechwolf as mw
+
+source = mw.Vessel("solvent", name="cache source")
+output = mw.Vessel("waste", name="cache output")
+pump = mw.DummyPump(name="cache pump")
+pump2 = mw.DummyPump(name="cache pump 2")
+tube = mw.Tube("1 m", "1 mm", "2 mm", "PFA")
+
+A = mw.Apparatus()
+A.add(source, [pump, pump2], tube)
+A.add([pump, pump2], output, tube)
+
+
+def create_protocol():
+    P = mw.Protocol(A, name="testing cache")
+    P.add(pump, rate=mw.Ramp("1 mL/min", "2 mL/min"), start="0 secs", stop="0.2 secs")
+    block = mw.Protocol(A, name="cached block")
+    block.add(pump2, rate="5 mL/min", start="0 secs", stop="0.1 secs")
+    P.repeat(block, 3)
+    return P
+
+
+def test_cache(tmp_path):
+    cache = mw.ScheduleCache(tmp_path)
+    compiled = create_protocol()._compile(cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(list(tmp_path.glob("*.schedule"))) == 1
+
+    # a new but identical protocol is loaded with its components and programs
+    P = create_protocol()
+    loaded = P._compile(cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert loaded is not compiled
+    assert [str(e) for e in loaded.events()] == [str(e) for e in compiled.events()]
+    assert loaded[pump][0]["params"]["rate"](0.1, 0.2) == "1.5 milliliter / minute"
+    assert set(loaded) == {pump, pump2}
+
+    E = P.execute(confirm=True, dry_run=5, log_file=None, data_file=None, cache=cache)
+    assert E._compiled_protocol is loaded
+    assert E.executed_procedures[-1]["params"] == {"rate": "0 mL/min"}
+
+    # changing the protocol changes the key
+    P.add(pump, rate="1 mL/min", start="1 secs", stop="2 secs")
+    P._compile(cache=cache)
+    assert cache.misses == 2
+
+    cache.clear()
+    assert not list(tmp_path.glob("*.schedule"))
+
+
+def test_eviction(tmp_path):
+    cache = mw.ScheduleCache(tmp_path)
+    P = create_protocol()
+    P._compile(cache=cache)
+    first = cache._file(P)
+    size = first.stat().st_size
+    os.utime(first, (0, 0))
+
+    # the least recently used schedule makes way for new ones
+    cache.max_size = 2 * size + size // 2
+    P.add(pump, rate="1 mL/min", start="1 secs", stop="2 secs")
+    P._compile(cache=cache)
+    assert first.exists()
+    P.add(pump, rate="2 mL/min", start="2 secs", stop="3 secs")
+    P._compile(cache=cache)
+    assert not first.exists()
+    assert len(list(tmp_path.glob("*.schedule"))) == 2
+
+
+def test_uncacheable(tmp_path):
+    cache = mw.ScheduleCache(tmp_path)
+    P = mw.Protocol(A, name="testing uncacheable")
+    P.add(pump, rate=mw.Profile(lambda t: f"{t} mL/min"), start="0 secs", stop="1 sec")
+    P.add(pump2, rate="1 mL/min", start="0 secs", stop="1 sec")
+    P._compile(cache=cache)
+    assert not list(tmp_path.glob("*.schedule"))
+
+    with pytest.raises(ValueError):
+        P.execute(confirm=True, dry_run=True, start_at="1 min", cache=cache)
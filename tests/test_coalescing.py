@@ -0,0 +1,77 @@
+import asyncio
+
+import mechwolf as mw
+
+
+class CountingDummy(mw.Dummy):
+    """A dummy that counts how many updates actually reach the device."""
+
+    def __init__(self, name=None):
+        super().__init__(name=name)
+        self.pushed = []
+
+    async def _update(self):
+        self.pushed.append(self.active)
+
+
+def test_skip_redundant_updates():
+    dummy = CountingDummy(name="redundant dummy")
+
+    async def run():
+        await dummy._check()
+        assert not await dummy._request_update()
+        dummy.active = True
+        assert await dummy._request_update()
+        assert not await dummy._request_update()
+
+    asyncio.run(run())
+    assert dummy.pushed == [False, True]
+    assert dummy._skipped_updates == 2
+
+    # once the device is reconnected, its state is unknown
+    dummy._acknowledged_state = None
+    asyncio.run(dummy._request_update())
+    assert dummy.pushed == [False, True, True]
+
+
+def test_coalesce_rapid_updates():
+    dummy = CountingDummy(name="coalescing dummy")
+    dummy._coalesce_window = 0.1
+    A = mw.Apparatus()
+    A.add(
+        mw.Vessel(name="coalescing vessel"),
+        dummy,
+        mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC"),
+    )
+    P = mw.Protocol(A, name="testing rapid updates")
+    P.add(dummy, active=True, start="0 secs", stop="0.02 secs")
+    P.add(dummy, active=False, start="0.02 secs", stop="0.04 secs")
+    P.add(dummy, active=True, start="0.04 secs", stop="0.3 secs")
+
+    E = P.execute(confirm=True, log_file=None, data_file=None)
+
+    # the preflight check, the last of the three rapid setpoints, and turning it off
+    assert dummy.pushed == [False, True, False]
+    assert E.coalesced_updates == {"coalescing dummy": 2}
+
+    # the schedule didn't wait for the window to send each setpoint
+    times = [p["experiment_elapsed_time"] for p in E.executed_procedures]
+    assert times[2] < dummy._coalesce_window
+
+
+def test_execute_skips_redundant_updates():
+    dummy = CountingDummy(name="dummy")
+    A = mw.Apparatus()
+    A.add(
+        mw.Vessel(name="vessel"), dummy, mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+    )
+    P = mw.Protocol(A, name="testing coalescing")
+    P.add(dummy, active=True, start="0 secs", stop="0.1 secs")
+    P.add(dummy, active=True, start="0.1 secs", stop="0.2 secs")
+
+    E = P.execute(confirm=True, log_file=None, data_file=None)
+
+    # the preflight check, turning it on, and turning it off
+    assert dummy.pushed == [False, True, False]
+    assert E.skipped_updates == {"dummy": 2}
+    assert E.coalesced_updates == {"dummy": 0}
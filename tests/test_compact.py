@@ -0,0 +1,86 @@
+import pytest
+
+import mechwolf as mw
+
+reagent = mw.Vessel("reagent", name="compact reagent")
+solvent = mw.Vessel("solvent", name="compact solvent")
+wash_solvent = mw.Vessel("solvent", name="compact wash solvent")
+output = mw.Vessel("waste", name="compact output")
+valve = mw.Valve(name="compact valve", mapping={reagent: 1, solvent: 2})
+pump1 = mw.DummyPump(name="compact pump 1")
+pump2 = mw.DummyPump(name="compact pump 2")
+mixer = mw.TMixer(name="compact mixer")
+tube = mw.Tube("1 m", "1 mm", "2 mm", "PFA")
+
+A = mw.Apparatus()
+A.add([reagent, solvent], valve, tube)
+A.add(valve, pump2, tube)
+A.add(wash_solvent, pump1, tube)
+A.add([pump1, pump2], mixer, tube)
+A.add(mixer, output, tube)
+
+
+def create_protocol():
+    P = mw.Protocol(A, name="testing compaction")
+    steps = {}
+    # the pump runs while the valve is switched, with padding on either side
+    steps["couple valve"] = P.add(
+        valve, setting=reagent, start="0 secs", stop="64 secs"
+    )
+    steps["couple"] = P.add(pump2, rate="5 mL/min", start="2 secs", stop="62 secs")
+    steps["wash"] = P.add(pump1, rate="5 mL/min", start="70 secs", stop="100 secs")
+    steps["rinse valve"] = P.add(
+        valve, setting=solvent, start="110 secs", stop="144 secs"
+    )
+    steps["rinse"] = P.add(pump2, rate="5 mL/min", start="112 secs", stop="142 secs")
+    return P, steps
+
+
+def test_add_returns_procedures():
+    P = mw.Protocol(A, name="testing add")
+    procedure = P.add(pump1, rate="5 mL/min", start="0 secs", stop="1 secs")
+    assert procedure is P.procedures[0]
+    procedures = P.add([pump1, pump2], rate="5 mL/min", start="2 secs", stop="3 secs")
+    assert procedures == P.procedures[1:]
+
+
+def test_compact():
+    P, steps = create_protocol()
+    result = P.compact(gap="1 sec")
+
+    # the independent wash moves to the beginning
+    assert steps["wash"] in P.procedures
+    compacted = dict(zip([id(p) for p in P.procedures], result.protocol.procedures))
+    assert compacted[id(steps["wash"])]["start"] == 0
+
+    # the pump stays inside the valve's window
+    rinse_valve = compacted[id(steps["rinse valve"])]
+    rinse = compacted[id(steps["rinse"])]
+    assert rinse_valve["start"] == 65
+    assert rinse["start"] - rinse_valve["start"] == 2
+
+    assert result.duration == 99
+    assert result.time_saved == 45
+    assert result.protocol._inferred_duration == 99
+
+    # the original is untouched, even when the compacted protocol is edited
+    assert steps["rinse"]["start"] == 112
+    rinse["params"]["rate"] = "1 mL/min"
+    assert steps["rinse"]["params"] == {"rate": "5 mL/min"}
+
+
+def test_compact_dependencies():
+    P, steps = create_protocol()
+    result = P.compact(dependencies=[(steps["couple"], steps["wash"], "2 secs")])
+    wash = result.protocol.procedures[P.procedures.index(steps["wash"])]
+    assert wash["start"] == 64
+
+    # the component's original spacing is kept by default
+    rinse_valve = result.protocol.procedures[P.procedures.index(steps["rinse valve"])]
+    assert rinse_valve["start"] == 110
+
+    with pytest.raises(ValueError, match="can't be scheduled"):
+        P.compact(dependencies=[(steps["rinse"], steps["couple"])])
+
+    with pytest.raises(ValueError, match="not part of the protocol"):
+        P.compact(dependencies=[(steps["rinse"], dict(steps["couple"]))])
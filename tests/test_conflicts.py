@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+import mechwolf as mw
+from mechwolf.core.intervals import IntervalIndex
+
+a = mw.Vessel("a", name="conflicts a")
+output = mw.Vessel("waste", name="conflicts output")
+pump1 = mw.DummyPump(name="conflicts pump 1")
+pump2 = mw.DummyPump(name="conflicts pump 2")
+tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+A = mw.Apparatus()
+A.add(a, [pump1, pump2], tube)
+A.add([pump1, pump2], output, tube)
+
+
+def test_interval_index():
+    random.seed(0)
+    intervals = []
+    for i in range(200):
+        start = random.uniform(0, 100)
+        intervals.append((start, start + random.uniform(0, 20), i))
+    index = IntervalIndex(intervals)
+
+    for t in [0, 5.5, 50, 99.9, 120, 200]:
+        expected = {i for start, stop, i in intervals if start <= t < stop}
+        assert set(index.at(t)) == expected
+
+    assert IntervalIndex([]).at(0) == []
+
+
+def test_conflicts():
+    P = mw.Protocol(A, name="testing conflicts")
+    long = P.add(pump1, rate="1 mL/min", start="0 secs", stop="60 secs")
+    first = P.add(pump1, rate="2 mL/min", start="10 secs", stop="20 secs")
+    second = P.add(pump1, rate="3 mL/min", start="30 secs", stop="40 secs")
+    P.add(pump2, rate="1 mL/min", start="0 secs")
+    P.add(pump2, rate="2 mL/min", start="0 secs", stop="5 secs")
+
+    conflicts = P.conflicts()
+    assert [c.kind for c in conflicts] == ["overlap", "overlap", "ambiguous start"]
+
+    # a long procedure conflicts with everything it overlaps, not just the next one
+    assert conflicts[0].procedures == (long, first)
+    assert conflicts[1].procedures == (long, second)
+    assert conflicts[2].component is pump2
+
+    # compiling reports all of them at once
+    with pytest.raises(RuntimeError, match="Found 3 conflicts"):
+        P._compile()
+
+    # nothing was changed
+    assert P.procedures[3]["stop"] is None
+
+
+def test_open_ended():
+    P = mw.Protocol(A, name="testing open-ended conflicts")
+    P.add(pump1, rate="1 mL/min")
+    assert [c.kind for c in P.conflicts()] == ["open-ended"]
+
+    P.add(pump2, rate="1 mL/min", start="0 secs", stop="10 secs")
+    P.add(pump2, rate="1 mL/min", start="20 secs")
+    conflicts = P.conflicts()
+    assert [c.kind for c in conflicts] == ["open-ended"]
+    assert conflicts[0].component is pump2
+
+
+def test_at():
+    P = mw.Protocol(A, name="testing at")
+    P.add(pump1, rate="1 mL/min", start="0 secs", stop="10 secs")
+    P.add(pump2, rate="2 mL/min", start="5 secs")
+    block = mw.Protocol(A, name="indexed block")
+    block.add(pump1, rate="5 mL/min", start="0 secs", stop="2 secs")
+    P.repeat(block, 1000, start="10 secs", every="5 secs")
+
+    index = P.index()
+    assert index.at(7) == [P.procedures[0], P.procedures[1]]
+    assert index.stop(P.procedures[1]) == 10 + 999 * 5 + 2
+
+    # intervals don't include their stop
+    assert [p for p in index.at(5007) if p["component"] is pump1] == []
+    repeated = [p for p in index.at(5006) if p["component"] is pump1]
+    assert [(p["start"], p["stop"]) for p in repeated] == [(5005, 5007)]
+
+    # repeated blocks conflict with procedures they overlap
+    P.add(pump1, rate="1 mL/min", start="100 secs", stop="101 secs")
+    conflicts = P.conflicts()
+    assert [c.kind for c in conflicts] == ["overlap"]
+    assert "repeat" in conflicts[0].procedures[0]
@@ -0,0 +1,63 @@
+import pytest
+
+import mechwolf as mw
+
+a = mw.Vessel("a", name="flow a")
+b = mw.Vessel("b", name="flow b")
+c = mw.Vessel("c", name="flow c")
+output = mw.Vessel("waste", name="flow output")
+valve = mw.Valve(name="flow valve", mapping={a: 1, b: 2})
+pump1 = mw.DummyPump(name="flow pump 1")
+pump2 = mw.DummyPump(name="flow pump 2")
+mixer = mw.TMixer(name="flow mixer")
+
+# each of these holds 0.785 mL
+tube = mw.Tube("1 m", "1 mm", "2 mm", "PFA")
+
+A = mw.Apparatus()
+A.add([a, b], valve, tube)
+A.add(valve, pump1, tube)
+A.add(c, pump2, tube)
+A.add([pump1, pump2], mixer, tube)
+A.add(mixer, output, tube)
+
+
+def test_open_routes():
+    paths = A.flow_paths()
+    assert A.flow_paths() is paths
+    assert len(paths.routes) == 3
+
+    routes = paths.open_routes({valve: 2})
+    assert {route.source for route in routes} == {b, c}
+    assert paths.open_routes({valve: 2}) is routes
+
+    # adding a connection invalidates the index
+    B = mw.Apparatus()
+    B.add(a, output, tube)
+    paths = B.flow_paths()
+    B.add(b, output, tube)
+    assert B.flow_paths() is not paths
+    assert len(B.flow_paths().routes) == 2
+
+
+def test_residence_times():
+    P = mw.Protocol(A, name="testing residence times")
+    P.add(valve, setting="flow b", start="0 secs", stop="2 min")
+    P.add(pump1, rate="1 mL/min", start="0 secs", stop="1 min")
+    P.add(pump2, rate="1 mL/min", start="0 secs", stop="2 min")
+
+    routes = P.residence_times()
+    first = routes[routes["start"] == 0].set_index("source")
+    assert set(first.index) == {"flow b", "flow c"}
+    assert first.loc["flow b", "dead_volume"] == pytest.approx(0.785398 * 4)
+    # three tubes at 1 mL/min, then one at 2 mL/min after the mixer
+    assert first.loc["flow b", "residence_time"] == pytest.approx(3.5 * 47.12389)
+
+    # once the first pump stops, only c flows
+    second = routes[routes["start"] == 60]
+    assert list(second["source"]) == ["flow c"]
+    assert list(second["residence_time"]) == pytest.approx([3 * 47.12389])
+
+    segments = P.residence_times(segments=True)
+    after_mixer = segments[segments["from_component"] == "flow mixer"]
+    assert list(after_mixer["flow_rate"]) == [2, 1]
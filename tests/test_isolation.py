@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import mechwolf as mw
+from mechwolf.core.worker import DeviceWorker
+
+
+class HangingDummy(mw.Dummy):
+    """A dummy whose driver blocks the whole process when activated."""
+
+    async def _update(self):
+        if self.active:
+            time.sleep(60)
+
+
+class DyingSensor(mw.DummySensor):
+    """A sensor whose worker process dies after a few readings."""
+
+    async def _read(self):
+        self.reads = getattr(self, "reads", 0) + 1
+        if self.reads > 3:
+            os._exit(1)
+        return await super()._read()
+
+
+def test_worker_update():
+    pump = mw.DummyPump(name="isolated pump")
+    with DeviceWorker(pump) as worker:
+        asyncio.run(worker.update({"rate": "5 mL/min"}))
+
+
+def test_worker_hang():
+    dummy = HangingDummy(name="hanging dummy")
+    with DeviceWorker(dummy, timeout=0.5) as worker:
+        start = time.time()
+        with pytest.raises(RuntimeError, match="did not respond"):
+            asyncio.run(worker.update({"active": True}))
+        assert time.time() - start < 5
+
+        # the worker is gone, so further commands fail fast
+        with pytest.raises(RuntimeError, match="not running"):
+            asyncio.run(worker.update({"active": False}))
+
+
+def test_worker_sensor_readings():
+    sensor = mw.BrokenDummySensor(name="isolated sensor")
+    with DeviceWorker(sensor) as worker:
+        asyncio.run(worker.update({"rate": "50 Hz"}))
+        time.sleep(0.2)
+        readings = worker.drain()
+        assert readings
+        assert all(isinstance(data, int) for _, data in readings)
+        assert readings == sorted(readings)
+
+        # the broken sensor eventually fails, which is reported on drain
+        time.sleep(0.3)
+        with pytest.raises(RuntimeError, match="Failed to read"):
+            worker.drain()
+
+
+def test_execute_isolated():
+    a = mw.Vessel(name="a", description="nothing")
+    pump = mw.DummyPump(name="pump")
+    sensor = mw.DummySensor(name="sensor")
+    tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+    A = mw.Apparatus()
+    A.add(a, pump, tube)
+    A.add(pump, sensor, tube)
+
+    P = mw.Protocol(A, name="testing isolation")
+    P.add(pump, rate="5 mL/min", start="0 seconds", stop="1 secs")
+    P.add(sensor, rate="5 Hz", start="0 secs", stop="1 secs")
+
+    E = P.execute(confirm=True, isolate=[pump, sensor], log_file=None, data_file=None)
+    assert len(E.data["sensor"]) >= 3
+    assert len(E.executed_procedures) == 4
+
+    with pytest.raises(TypeError):
+        P.execute(confirm=True, isolate=[a], log_file=None, data_file=None)
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_worker_dies(strict):
+    a = mw.Vessel(name="a", description="nothing")
+    pump = mw.DummyPump(name="pump")
+    sensor = DyingSensor(name="dying sensor")
+    tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+    A = mw.Apparatus()
+    A.add(a, pump, tube)
+    A.add(pump, sensor, tube)
+
+    P = mw.Protocol(A, name="testing dying worker")
+    P.add(pump, rate="5 mL/min", start="0 seconds", stop="0.6 secs")
+    P.add(pump, rate="10 mL/min", start="0.6 seconds", stop="1 secs")
+    P.add(sensor, rate="10 Hz", start="0 secs", stop="1 secs")
+
+    E = P.execute(
+        confirm=True, isolate=[sensor], strict=strict, log_file=None, data_file=None
+    )
+    assert E.data["dying sensor"]
+    assert E._failed_components == {sensor}
+
+    # the sensor dies within half a second, which stops strict runs right away,
+    # while others carry on without it
+    assert len(E.executed_procedures) == (2 if strict else 5)
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import ipywidgets as widgets
+from loguru import logger
+
+import mechwolf as mw
+from mechwolf.core.experiment import _WidgetLog
+from mechwolf.core.logs import LogSampler
+
+source = mw.Vessel("solvent", name="logs source")
+output = mw.Vessel("waste", name="logs output")
+pump = mw.DummyPump(name="logs pump")
+tube = mw.Tube("1 m", "1 mm", "2 mm", "PFA")
+
+A = mw.Apparatus()
+A.add(source, pump, tube)
+A.add(pump, output, tube)
+
+
+def test_sampler():
+    sampler = LogSampler("0.1 seconds")
+    assert sampler("a") == 0
+    assert sampler("a") is None
+    assert sampler("a") is None
+
+    # each key is sampled separately
+    assert sampler("b") == 0
+
+    time.sleep(0.1)
+    assert sampler("a") == 2
+    assert sampler("a") is None
+
+
+def test_lazy_formatting(monkeypatch):
+    # log every wake-up
+    monkeypatch.setattr(mw.core.execute, "_wake_ups", LogSampler(0))
+
+    P = mw.Protocol(A, name="testing lazy log formatting")
+    P.add(pump, rate="5 mL/min", start="0 secs", stop="0.1 secs")
+
+    messages = []
+    sink = logger.add(messages.append, level="TRACE", format="{message}")
+    try:
+        P.execute(confirm=True, dry_run=True, log_file=None, data_file=None)
+    finally:
+        logger.remove(sink)
+
+    assert (
+        "Simulating: {'rate': '5 mL/min'} on DummyPump logs pump at 0.0s\n" in messages
+    )
+    assert any(m.startswith("<Set DummyPump logs pump to") for m in messages)
+
+
+def test_widget_log():
+    P = mw.Protocol(A, name="testing widget log")
+    P.add(pump, rate="5 mL/min", start="0 secs", stop="100 secs")
+    E = mw.Experiment(P)
+    widget = widgets.Output()
+    log = _WidgetLog(widget, E, max_lines=3, interval=60)
+
+    # the first line is shown right away, but later ones wait for the next flush
+    log("first\n")
+    assert widget.outputs[0]["text"] == "( setup ) first\n"
+    for i in range(5):
+        log(f"line {i}\n")
+    assert widget.outputs[0]["text"] == "( setup ) first\n"
+
+    # only the last lines are kept
+    log.flush()
+    assert widget.outputs[0]["text"].splitlines() == [
+        "( setup ) line 2",
+        "( setup ) line 3",
+        "( setup ) line 4",
+    ]
+
+    # while executing, the last lines are flushed even if nothing else is logged
+    async def log_and_wait():
+        log.interval = 0.05
+        log("line 5\n")
+        log("line 6\n")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(log_and_wait())
+    assert widget.outputs[0]["text"].splitlines()[-1] == "( setup ) line 6"
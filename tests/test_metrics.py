@@ -0,0 +1,65 @@
+import json
+
+import mechwolf as mw
+
+water = mw.Vessel("water", name="metrics water")
+waste = mw.Vessel("waste", name="metrics waste")
+pump = mw.DummyPump(name="metrics pump")
+sensor = mw.DummySensor(name="metrics sensor")
+tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+A = mw.Apparatus()
+A.add(water, pump, tube)
+A.add(pump, sensor, tube)
+A.add(sensor, waste, tube)
+
+
+def create_protocol():
+    P = mw.Protocol(A, name="testing metrics")
+    P.add(pump, rate="5 mL/min", start="0 secs", stop="0.3 secs")
+    P.add(pump, rate="2 mL/min", start="0.3 secs", stop="0.6 secs")
+    P.add(sensor, rate="10 Hz", start="0 secs", stop="0.6 secs")
+    return P
+
+
+def test_metrics(tmp_path):
+    P = create_protocol()
+
+    # nothing is collected unless asked for
+    E = P.execute(confirm=True, dry_run=True, log_file=None, data_file=None)
+    assert E.metrics is None
+
+    E = P.execute(
+        confirm=True,
+        dry_run=True,
+        log_file=tmp_path / "run.log.jsonl",
+        data_file=tmp_path / "run.data.jsonl",
+        profile=True,
+    )
+    metrics = E.metrics
+    assert isinstance(metrics, mw.Metrics)
+    assert {"compile", "bring_up", "setup", "run", "teardown", "data", "total"} <= set(
+        metrics.stages
+    )
+    assert "validate" not in metrics.stages  # since it's a dry run
+    assert metrics.stages["run"] < metrics.stages["total"]
+
+    assert metrics.procedures_dispatched == len(E.executed_procedures)
+    assert metrics.datapoints_ingested == len(E.data[sensor.name]) > 0
+    assert metrics.bytes_written["data"] == (tmp_path / "run.data.jsonl").stat().st_size
+    assert metrics.bytes_written["log"] == (tmp_path / "run.log.jsonl").stat().st_size
+    assert metrics._lag_samples > 0
+    assert 0 <= metrics.mean_loop_lag <= metrics.max_loop_lag
+
+    # the metrics are written next to the log file
+    written = json.loads((tmp_path / f"{E.experiment_id}.metrics.json").read_text())
+    assert written == metrics.to_dict()
+
+
+def test_stage():
+    metrics = mw.Metrics()
+    for _ in range(2):
+        with metrics.stage("test"):
+            pass
+    metrics.add("test", 1)
+    assert 1 < metrics.stages["test"] < 1.1
@@ -0,0 +1,47 @@
+import pytest
+
+import mechwolf as mw
+from mechwolf.zoo.peptide_synthesizer import create_apparatus, create_protocol
+
+A = create_apparatus()
+
+
+def test_create_protocol():
+    P = create_protocol("AK", A, name="testing peptide synthesis")
+
+    # deprotection, wash, coupling with all three pumps, and wash for each residue
+    assert len(P.procedures) == 2 * (2 + 2 + 6 + 2)
+    assert P.description == "ala-lys"
+
+    # alanine's valve is set to it and the others to the coupling reagents
+    couplings = [p for p in P.procedures if p["start"] == 95]
+    assert {p["params"]["setting"] for p in couplings} == {1, 8, 9}
+    assert all(isinstance(p["component"], mw.Valve) for p in couplings)
+
+    P._compile()
+    assert P._inferred_duration == 2 * (60 + 30 + 60 + 30 + 4 * 2) + 1
+
+
+def test_create_long_protocol():
+    # how long this takes is tracked by the PeptideSynthesisSuite benchmark
+    P = create_protocol("ACDEFGHIKLMNPQRSTVWY" * 5, A, name="testing long peptide")
+    P._compile()
+    assert len(P.procedures) == 100 * 12
+
+
+def test_create_protocol_errors():
+    with pytest.raises(KeyError):
+        create_protocol("AZ", A, name="testing bad peptide")
+    with pytest.raises(ValueError, match="not found"):
+        create_protocol(["ala", "xyz"], A, name="testing missing amino acid")
+
+    # a valve that doesn't lead to a pump
+    B = create_apparatus()
+    valve = mw.Valve(name="unpumped valve", mapping={})
+    B.add(
+        mw.Vessel("nothing", name="unpumped vessel"),
+        valve,
+        mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC"),
+    )
+    with pytest.raises(ValueError, match="unpumped valve"):
+        create_protocol("AK", B, name="testing unpumped valve")
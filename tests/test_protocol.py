@@ -216,3 +216,20 @@ def test_yaml():
     P = mw.Protocol(A)
     P.add([pump1, pump2], rate="10 mL/min", duration="5 min")
     assert yaml.safe_load(P.yaml()) == json.loads(P.json())
+
+
+def test_visualize():
+    P = mw.Protocol(A, name="testing visualization")
+    for i in range(5000):
+        P._append(pump1, start=float(i), stop=i + 0.5, params={"rate": "1 mL/min"})
+    P.add(pump2, rate="5 mL/min", start="0 secs", stop="5000 secs")
+
+    # the short procedures are merged, but all of them are accounted for
+    source = P.visualize(max_bars=100).data
+    assert len(source) <= 100
+    assert source["procedures"].sum() == 5001
+    assert list(source[source["component"] == str(pump2)]["params"]) == [
+        json.dumps({"rate": "5 mL/min"})
+    ]
+
+    assert len(P.visualize(max_bars=None).data) == 5001
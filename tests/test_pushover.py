@@ -0,0 +1,114 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from loguru import logger
+
+from mechwolf.plugins.pushover import PushoverSink
+
+
+@pytest.fixture
+def server():
+    """A stub of the Pushover API that responds with the queued statuses and headers."""
+    requests = []
+    responses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            requests.append((time.time(), parse_qs(body)))
+            status, headers = responses.pop(0) if responses else (200, {})
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(b'{"status": 1}')
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_port}/1/messages.json"
+    httpd.requests = requests
+    httpd.responses = responses
+    yield httpd
+    httpd.shutdown()
+
+
+def test_batching(server):
+    sink = PushoverSink("token", "user", window=0.2, url=server.url)
+    handler = logger.add(sink, level="WARNING", format="{message}")
+    try:
+        for i in range(3):
+            logger.warning(f"warning {i}")
+        logger.info("not sent")
+        time.sleep(0.5)
+        logger.error("later")
+        sink.close(timeout=5)
+    finally:
+        logger.remove(handler)
+
+    # the burst is sent as one notification
+    assert [r["message"][0].splitlines() for _, r in server.requests] == [
+        ["⚠️: warning 0", "⚠️: warning 1", "⚠️: warning 2"],
+        ["❌: later"],
+    ]
+    assert server.requests[0][1]["token"] == ["token"]
+    assert (sink.sent, sink.failed) == (2, 0)
+
+
+def test_retries(server):
+    server.responses.extend([(500, {}), (503, {})])
+    sink = PushoverSink("token", "user", window=0, backoff=0.01, url=server.url)
+    sink(_message("retried"))
+    sink.close(timeout=5)
+    assert len(server.requests) == 3
+    assert (sink.sent, sink.failed) == (1, 0)
+
+    # bad requests aren't retried
+    server.responses.append((400, {}))
+    sink = PushoverSink("token", "user", window=0, backoff=0.01, url=server.url)
+    sink(_message("bad"))
+    sink.close(timeout=5)
+    assert len(server.requests) == 4
+    assert (sink.sent, sink.failed) == (0, 1)
+
+
+def test_rate_limit(server):
+    reset = time.time() + 0.5
+    server.responses.append(
+        (200, {"X-Limit-App-Remaining": "0", "X-Limit-App-Reset": str(reset)})
+    )
+    sink = PushoverSink("token", "user", window=0, url=server.url)
+    sink(_message("first"))
+    time.sleep(0.2)
+    sink(_message("second"))
+    time.sleep(0.8)
+    sink.close(timeout=5)
+
+    # nothing is sent until the limit resets
+    assert len(server.requests) == 2
+    assert server.requests[1][0] >= reset
+
+
+def test_bounded_queue(server):
+    sink = PushoverSink("token", "user", window=0.2, max_queue=2, url=server.url)
+    for i in range(5):
+        sink(_message(str(i)))
+    sink.close(timeout=5)
+    assert sink.dropped >= 2
+    assert "more messages were dropped" in server.requests[-1][1]["message"][0]
+
+
+def _message(text):
+    class Level:
+        icon = "ℹ️"
+
+    class Message(str):
+        record = {"level": Level, "message": text}
+
+    return Message(text)
@@ -0,0 +1,111 @@
+import pytest
+
+import mechwolf as mw
+from mechwolf.core.schedule import RepeatedSchedule
+
+a = mw.Vessel("a", name="repeat a")
+b = mw.Vessel("b", name="repeat b")
+output = mw.Vessel("waste", name="repeat output")
+valve = mw.Valve(name="repeat valve", mapping={a: 1, b: 2})
+pump = mw.DummyPump(name="repeat pump")
+tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+A = mw.Apparatus()
+A.add([a, b], valve, tube)
+A.add(valve, pump, tube)
+A.add(pump, output, tube)
+
+
+def create_block():
+    block = mw.Protocol(A, name="repeated block")
+    block.add(valve, setting=a, start="0 secs", stop="10 secs")
+    block.add(pump, rate="5 mL/min", start="2 secs", stop="8 secs")
+    return block
+
+
+def create_protocol(times, every=None):
+    P = mw.Protocol(A, name="testing repeats")
+    P.add(valve, setting=b, start="0 secs", stop="5 secs")
+    P.add(pump, rate="1 mL/min", start="0 secs", stop="5 secs")
+    P.repeat(create_block(), times, start="5 secs", every=every)
+    return P
+
+
+def expanded(times, every=10):
+    """The protocol of create_protocol(), written out by hand."""
+    P = mw.Protocol(A, name="testing expanded repeats")
+    P.add(valve, setting=b, start="0 secs", stop="5 secs")
+    P.add(pump, rate="1 mL/min", start="0 secs", stop="5 secs")
+    for i in range(times):
+        start = 5 + i * every
+        P.add(valve, setting=a, start=f"{start} secs", stop=f"{start + 10} secs")
+        P.add(
+            pump, rate="5 mL/min", start=f"{start + 2} secs", stop=f"{start + 8} secs"
+        )
+    return P
+
+
+@pytest.mark.parametrize("every", [None, "15 secs"])
+def test_compile(every):
+    P = create_protocol(3, every=every)
+    compiled = P._compile()
+    assert isinstance(compiled[valve], RepeatedSchedule)
+    assert P._inferred_duration == (35 if every is None else 45)
+
+    expected = expanded(3, every=10 if every is None else 15)._compile()
+    for component in (valve, pump):
+        assert list(compiled[component]) == expected[component]
+        assert len(compiled[component]) == len(expected[component])
+        assert compiled[component][-2] == expected[component][-2]
+        assert compiled[component][1:4] == expected[component][1:4]
+
+
+def test_compile_is_lazy():
+    P = create_protocol(10**6)
+    compiled = P._compile()
+    assert len(compiled[pump]) == 2 + 2 * 10**6
+    assert compiled[pump][-1] == {
+        "time": 5 + 10 * (10**6 - 1) + 8,
+        "params": {"rate": "0 mL/min"},
+    }
+
+    # one bar per repeated block unless expanded
+    assert len(P.to_list()) == 3
+    assert P.to_list()[-1]["times"] == 10**6
+    P.visualize()
+
+
+def test_to_list():
+    P = create_protocol(3)
+    assert P.to_list(expand=True) == expanded(3).to_list()
+    P.visualize(expand=True)
+
+
+def test_invalid_repeats():
+    P = create_protocol(3)
+    with pytest.raises(ValueError, match="repeated every"):
+        P.repeat(create_block(), 2, every="5 secs")
+    with pytest.raises(ValueError, match="at least once"):
+        P.repeat(create_block(), 0)
+    with pytest.raises(ValueError, match="contain repeats"):
+        create_protocol(2).repeat(P, 2)
+
+    # overlapping with the protocol's own procedures
+    P.add(pump, rate="1 mL/min", start="20 secs", stop="25 secs")
+    with pytest.raises(RuntimeError, match="overlapping"):
+        P._compile()
+
+    with pytest.raises(ValueError, match="repeated blocks"):
+        create_protocol(2).compact()
+
+
+def test_execute():
+    P = mw.Protocol(A, name="testing repeat execution")
+    P.add(pump, rate="1 mL/min", start="0 secs", stop="0.5 secs")
+    block = mw.Protocol(A, name="executed block")
+    block.add(pump, rate="5 mL/min", start="0 secs", stop="0.25 secs")
+    P.repeat(block, 2, start="0.5 secs", every="0.5 secs")
+
+    E = P.execute(confirm=True, dry_run=True, log_file=None, data_file=None)
+    rates = [p["params"]["rate"] for p in E.executed_procedures]
+    assert rates == ["1 mL/min", "5 mL/min", "0 mL/min", "5 mL/min", "0 mL/min"]
@@ -0,0 +1,69 @@
+import pytest
+
+import mechwolf as mw
+
+a = mw.Vessel("a", name="resume a")
+b = mw.Vessel("b", name="resume b")
+output = mw.Vessel("waste", name="resume output")
+valve = mw.Valve(name="resume valve", mapping={a: 1, b: 2})
+pump = mw.DummyPump(name="resume pump")
+tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+A = mw.Apparatus()
+A.add([a, b], valve, tube)
+A.add(valve, pump, tube)
+A.add(pump, output, tube)
+
+
+def create_protocol():
+    P = mw.Protocol(A, name="testing resume")
+    P.add(valve, setting=b, start="0 secs", stop="10 secs")
+    P.add(pump, rate=mw.Ramp("0 mL/min", "10 mL/min"), start="0 secs", stop="10 secs")
+    block = mw.Protocol(A, name="resumed block")
+    block.add(valve, setting=a, start="0 secs", stop="1 secs")
+    block.add(pump, rate="5 mL/min", start="0 secs", stop="0.5 secs")
+    P.repeat(block, 10**6, start="10 secs")
+    return P
+
+
+def test_state_at():
+    P = create_protocol()
+
+    state = P.state_at("5 secs")
+    assert state[valve] == {"setting": 2}
+    assert mw._ureg.parse_expression(state[pump]["rate"]) == mw._ureg.parse_expression(
+        "5 mL/min"
+    )
+
+    # deep into the repeated block
+    state = P.state_at(10 + 500000 + 0.75)
+    assert state[valve] == {"setting": 1}
+    assert state[pump] == {"rate": "0 mL/min"}
+
+    # after the end, everything is back to its base state
+    state = P.state_at("100 days")
+    assert state[pump] == {"rate": "0 mL/min"}
+    assert state[valve] == {"setting": valve._base_state["setting"]}
+
+
+def test_resume():
+    P = mw.Protocol(A, name="testing resumed execution")
+    P.add(valve, setting=b, start="0 secs", stop="0.5 secs")
+    P.add(pump, rate="5 mL/min", start="0 secs", stop="0.2 secs")
+    P.add(pump, rate="2 mL/min", start="0.3 secs", stop="0.5 secs")
+
+    with pytest.raises(ValueError, match="within the protocol"):
+        P.execute(confirm=True, dry_run=True, start_at="1 sec")
+
+    E = P.execute(
+        confirm=True, dry_run=True, log_file=None, data_file=None, start_at="0.3 secs"
+    )
+    assert E.start_at == 0.3
+
+    # only what's left is executed, and it's executed on time
+    executed = [(p["component"], p["params"]) for p in E.executed_procedures]
+    assert sorted(executed, key=lambda x: x[0].name) == [
+        (pump, {"rate": "0 mL/min"}),
+        (valve, {"setting": valve._base_state["setting"]}),
+    ]
+    assert all(p["experiment_elapsed_time"] < 0.4 for p in E.executed_procedures)
@@ -0,0 +1,45 @@
+from itertools import islice
+
+import mechwolf as mw
+from mechwolf.core.schedule import CompiledSchedule, Event
+
+a = mw.Vessel("a", name="schedule a")
+output = mw.Vessel("waste", name="schedule output")
+pump1 = mw.DummyPump(name="schedule pump 1")
+pump2 = mw.DummyPump(name="schedule pump 2")
+tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+A = mw.Apparatus()
+A.add(a, [pump1, pump2], tube)
+A.add([pump1, pump2], output, tube)
+
+
+def test_events():
+    P = mw.Protocol(A, name="testing events")
+    P.add(pump1, rate="1 mL/min", start="0 secs", stop="10 secs")
+    P.add(pump2, rate="2 mL/min", start="5 secs", stop="10 secs")
+    P.add(pump1, rate="3 mL/min", start="15 secs", stop="20 secs")
+
+    compiled = P._compile()
+    assert isinstance(compiled, CompiledSchedule)
+    assert dict(compiled) == compiled
+    assert compiled.end_time == 20
+
+    events = list(P.events())
+    assert [e.time for e in events] == [0, 5, 10, 10, 15, 20]
+    assert [e.component for e in events[:2]] == [pump1, pump2]
+    assert {e.component for e in events[2:4]} == {pump1, pump2}
+    assert events[1] == Event(5, pump2, {"rate": "2 mL/min"})
+
+
+def test_events_are_lazy():
+    P = mw.Protocol(A, name="testing lazy events")
+    block = mw.Protocol(A, name="event block")
+    block.add(pump1, rate="1 mL/min", start="0 secs", stop="1 secs")
+    block.add(pump2, rate="1 mL/min", start="1 secs", stop="2 secs")
+    P.repeat(block, 10**9)
+
+    first = list(islice(P.events(), 4))
+    assert [e.time for e in first] == [0, 1, 1, 2]
+    assert first[0].component == pump1
+    assert P._compile().end_time == 2 * 10**9
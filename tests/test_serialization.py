@@ -0,0 +1,208 @@
+from importlib.util import find_spec
+
+import pytest
+
+import mechwolf as mw
+
+a = mw.Vessel("a", name="serialization a")
+b = mw.Vessel("b", name="serialization b")
+output = mw.Vessel("waste", name="serialization output")
+valve = mw.Valve(name="serialization valve", mapping={a: 1, b: 2})
+pump = mw.DummyPump(name="serialization pump")
+tube = mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+
+A = mw.Apparatus()
+A.add([a, b], valve, tube)
+A.add(valve, pump, tube)
+A.add(pump, output, tube)
+
+
+def create_protocol():
+    P = mw.Protocol(A, name="testing serialization")
+    P.add(valve, setting=b, start="0 secs", stop="10 secs")
+    P.add(pump, rate=mw.Ramp("1 mL/min", "5 mL/min"), start="0 secs", stop="10 secs")
+    block = mw.Protocol(A, name="serialized block")
+    block.add(valve, setting=a, start="0 secs", stop="1 secs")
+    block.add(pump, rate="5 mL/min", start="0 secs", stop="1 secs")
+    P.repeat(block, 3, start="10 secs", every="2 secs")
+    return P
+
+
+def test_to_list():
+    P = create_protocol()
+    procedures = P.to_list()
+
+    # changing the list doesn't change the protocol
+    assert procedures[0]["params"] == P.procedures[0]["params"]
+    assert procedures[0]["params"] is not P.procedures[0]["params"]
+    assert procedures[1]["params"]["rate"] == {
+        "ramp": {"start": "1 mL/min", "stop": "5 mL/min", "interval": None}
+    }
+    assert procedures[2]["block"] == "serialized block"
+
+    expanded = P.to_list(expand=True)
+    assert len(expanded) == 2 + 3 * 2
+    assert [p["start"] for p in expanded[2:]] == [10, 10, 12, 12, 14, 14]
+    assert P.repeats[0]["block"].procedures[0]["start"] == 0
+
+
+@pytest.mark.parametrize(
+    "format",
+    [
+        "yaml",
+        "json",
+        pytest.param(
+            "msgpack",
+            marks=pytest.mark.skipif(
+                find_spec("msgpack") is None, reason="msgpack isn't installed"
+            ),
+        ),
+    ],
+)
+def test_round_trip(format):
+    P = create_protocol()
+    data = getattr(P, format)()
+    loaded = getattr(mw.Protocol, f"from_{format}")(A, data, name="loaded")
+
+    assert loaded.name == "loaded"
+    assert loaded.to_list() == P.to_list()
+    assert isinstance(loaded.procedures[1]["params"]["rate"], mw.Ramp)
+    assert loaded.procedures[0]["component"] is valve
+    assert [str(e) for e in loaded.events()] == [str(e) for e in P.events()]
+
+
+def test_invalid():
+    P = create_protocol()
+    procedures = P.to_list()
+    procedures[0]["component"] = "not a component"
+    with pytest.raises(KeyError):
+        mw.Protocol.from_list(A, procedures, name="invalid component")
+
+    procedures = P.to_list()
+    procedures[1] = dict(procedures[1], params={"rate": "5 degC"})
+    with pytest.raises(ValueError, match="dimensionality"):
+        mw.Protocol.from_list(A, procedures, name="invalid params")
+
+    P = mw.Protocol(A, name="testing profile serialization")
+    P.add(pump, rate=mw.Profile(lambda t: f"{t} mL/min"), start="0 secs", stop="1 sec")
+    with pytest.raises(ValueError, match="can't be serialized"):
+        mw.Protocol.from_json(A, P.json(), name="invalid profile")
+
+
+def test_content_hash():
+    P = create_protocol()
+    first = P.content_hash
+    assert len(first) == 16
+
+    # the order of procedures and of their parameters doesn't matter
+    Q = mw.Protocol(A, name="testing reordered hash")
+    Q.add(pump, rate=mw.Ramp("1 mL/min", "5 mL/min"), start="0 secs", stop="10 secs")
+    Q.add(valve, setting=b, start="0 secs", stop="10 secs")
+    Q.repeat(P.repeats[0]["block"], 3, start="10 secs", every="2 secs")
+    assert Q.content_hash == first
+
+    # a loaded protocol hashes the same
+    assert mw.Protocol.from_json(A, P.json(), name="loaded").content_hash == first
+
+    # changes to the protocol and to its blocks change the hash
+    P.add(pump, rate="1 mL/min", start="20 secs", stop="21 secs")
+    second = P.content_hash
+    assert second != first
+    P.repeats[0]["block"].add(pump, rate="1 mL/min", start="1 secs", stop="2 secs")
+    assert P.content_hash not in (first, second)
+
+
+def test_compile_cache():
+    P = create_protocol()
+    compiled = P._compile()
+    assert P._compile() is compiled
+    P.visualize()
+    assert P._compile() is compiled
+    assert P._compile(_visualization=True)[valve][0]["start"] == 0
+
+    P.add(pump, rate="1 mL/min", start="20 secs", stop="21 secs")
+    assert P._compile() is not compiled
+
+
+def test_edited_protocol():
+    P = create_protocol()
+    first = P.content_hash
+    P._compile()
+
+    # procedures changed in place
+    setting = P.procedures[0]["params"]["setting"]
+    P.procedures[0]["params"]["setting"] = 1
+    assert P.content_hash != first
+    assert P._compile()[valve][0]["params"] == {"setting": 1}
+    P.procedures[0]["params"]["setting"] = setting
+    assert P.content_hash == first
+    P.procedures[0]["stop"] = 5
+    assert P._compile()[valve][1]["time"] == 5
+
+    # removing a procedure and adding a different one in its place
+    P = create_protocol()
+    compiled = P._compile()
+    P.procedures.pop()
+    P.add(pump, rate="2 mL/min", start="0 secs", stop="10 secs")
+    assert P.content_hash != first
+    assert P._compile() is not compiled
+    assert P._compile()[pump][0]["params"] == {"rate": "2 mL/min"}
+
+
+def test_replaced_profile():
+    def create(function):
+        P = mw.Protocol(A, name="testing profile hash")
+        P.add(pump, rate=mw.Profile(function), start="0 secs", stop="1 sec")
+        return P
+
+    # functions with the same name are told apart
+    P = create(lambda t: "1 mL/min")
+    assert create(lambda t: "2 mL/min").content_hash != P.content_hash
+    assert P._compile()[pump][0]["params"]["rate"](0, 1) == "1 mL/min"
+
+    P.procedures[0] = dict(
+        P.procedures[0], params={"rate": mw.Profile(lambda t: "2 mL/min")}
+    )
+    assert P._compile()[pump][0]["params"]["rate"](0, 1) == "2 mL/min"
+
+
+def test_incremental_hash(monkeypatch):
+    P = create_protocol()
+    P.add(pump, rate="1 mL/min", start="20 secs", stop="21 secs")
+    first = P.content_hash
+
+    hashed = []
+    fingerprint = mw.Protocol._fingerprint
+    monkeypatch.setattr(
+        mw.Protocol,
+        "_fingerprint",
+        classmethod(lambda cls, p: hashed.append(p) or fingerprint(p)),
+    )
+
+    # only the changed and added procedures are hashed again
+    assert P.content_hash == first and not hashed
+    P.procedures[2].update(stop=22)
+    P.procedures[0]["params"].pop("setting")
+    P.add(pump, rate="2 mL/min", start="30 secs", stop="31 secs")
+    P.content_hash
+    assert hashed == [P.procedures[2], P.procedures[0], P.procedures[3]]
+
+    # moving procedures around doesn't change the hash, but removing them does
+    hashed.clear()
+    second = P.content_hash
+    P.procedures.reverse()
+    P.procedures[1:3] = P.procedures[1:3]
+    assert P.content_hash == second and not hashed
+    del P.procedures[0]
+    P.procedures *= 2
+    P.content_hash
+    assert len(hashed) == len(P.procedures) // 2
+
+    # the hash matches one from scratch
+    fresh = mw.Protocol(A, name="testing serialization")
+    fresh.procedures = P.procedures
+    fresh.repeats = P.repeats
+    assert P.content_hash == fresh.content_hash
+    assert fresh.procedures[0] is not P.procedures[0]
+    P.procedures, P.repeats = [], []
+    assert P.content_hash == mw.Protocol(A).content_hash
@@ -0,0 +1,73 @@
+import pytest
+
+import mechwolf as mw
+
+
+class CountingDummy(mw.Dummy):
+    """A dummy that counts how many times it has been connected."""
+
+    def __init__(self, name=None, fail_once=False):
+        super().__init__(name=name)
+        self.connections = 0
+        self.disconnections = 0
+        self.fail_once = fail_once
+
+    def __enter__(self):
+        self.connections += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disconnections += 1
+
+    async def _update(self):
+        if self.active and self.fail_once:
+            self.fail_once = False
+            raise RuntimeError("Lost connection.")
+
+
+def create_protocol(dummy):
+    A = mw.Apparatus()
+    A.add(
+        mw.Vessel(name="vessel"), dummy, mw.Tube("1 foot", "1/16 in", "2/16 in", "PVC")
+    )
+    P = mw.Protocol(A, name="testing session")
+    P.add(dummy, active=True, start="0 secs", stop="0.1 secs")
+    return A, P
+
+
+def test_session_reuses_connections():
+    dummy = CountingDummy(name="dummy")
+    A, P = create_protocol(dummy)
+
+    with A.session() as session:
+        assert A._session is session
+        for _ in range(3):
+            P.execute(confirm=True, log_file=None, data_file=None)
+        assert dummy.connections == 1
+        assert dummy.disconnections == 0
+
+    assert A._session is None
+    assert dummy.disconnections == 1
+
+    # without a session, each execution connects again
+    P.execute(confirm=True, log_file=None, data_file=None)
+    assert dummy.connections == 2
+
+
+def test_session_reconnects_failed_components():
+    dummy = CountingDummy(name="flaky dummy", fail_once=True)
+    A, P = create_protocol(dummy)
+
+    with A.session():
+        P.execute(confirm=True, strict=False, log_file=None, data_file=None)
+        P.execute(confirm=True, log_file=None, data_file=None)
+        assert dummy.connections == 2
+        assert dummy.disconnections == 1
+
+
+def test_nested_sessions():
+    A, _ = create_protocol(CountingDummy(name="lonely dummy"))
+    with A.session():
+        with pytest.raises(RuntimeError):
+            with A.session():
+                pass
@@ -0,0 +1,80 @@
+import pytest
+import yaml
+
+import mechwolf as mw
+
+source = mw.Vessel("solvent", name="setpoint source")
+output = mw.Vessel("waste", name="setpoint output")
+pump = mw.DummyPump(name="setpoint pump")
+tube = mw.Tube("1 m", "1 mm", "2 mm", "PFA")
+
+A = mw.Apparatus()
+A.add(source, pump, tube)
+A.add(pump, output, tube)
+
+
+def test_programs():
+    ramp = mw.Ramp("1 mL/min", "5 mL/min")
+    assert mw._ureg.parse_expression(ramp(30, 60)) == mw._ureg.parse_expression(
+        "3 mL/min"
+    )
+    assert mw._ureg.parse_expression(ramp(90, 60)) == mw._ureg.parse_expression(
+        "5 mL/min"
+    )
+
+    # offset units are interpolated in the units of the start
+    temp = mw.Ramp("20 degC", "40 degC")
+    assert mw._ureg.parse_expression(temp(5, 10)).to("degC").magnitude == 30
+
+    steps = mw.Steps("1 mL/min", "2 mL/min", "3 mL/min")
+    assert steps(25, 60) == "2 mL/min"
+    assert list(steps._sample_times(60, 1)) == [0, 20, 40]
+    assert list(ramp._sample_times(2.5, 1)) == [0, 1, 2, 2.5]
+
+    profile = mw.Profile(lambda t: f"{t} mL/min")
+    assert profile(3, 60) == "3 mL/min"
+
+
+def test_add():
+    P = mw.Protocol(A, name="testing setpoint validation")
+    with pytest.raises(ValueError, match="dimensionality"):
+        P.add(pump, rate=mw.Ramp("1 degC", "5 degC"), duration="1 min")
+    with pytest.raises(ValueError, match="Units must match"):
+        mw.Ramp("1 mL/min", "5 degC")
+    with pytest.raises(ValueError, match="at least one"):
+        mw.Steps()
+
+
+def test_compile():
+    P = mw.Protocol(A, name="testing setpoint compilation")
+    P.add(pump, rate=mw.Ramp("1 mL/min", "5 mL/min"), start="0 secs", stop="1 hour")
+
+    # only the program is stored, however long the ramp
+    compiled = P._compile()[pump]
+    assert len(compiled) == 2
+    assert compiled[0]["duration"] == 3600
+    assert isinstance(compiled[0]["params"]["rate"], mw.Ramp)
+
+    assert yaml.safe_load(P.yaml())[0]["params"]["rate"]["ramp"]["stop"] == "5 mL/min"
+    P.visualize()
+
+    # flow calculations use the average rate
+    routes = P.residence_times(segments=True)
+    assert list(routes["flow_rate"]) == pytest.approx([3, 3])
+
+
+def test_execute():
+    P = mw.Protocol(A, name="testing setpoint execution")
+    P.add(pump, rate=mw.Ramp("1 mL/min", "2 mL/min"), start="0 secs", stop="0.5 secs")
+
+    pump._sample_interval = 0.1
+    try:
+        E = P.execute(confirm=True, dry_run=True, log_file=None, data_file=None)
+    finally:
+        del pump._sample_interval
+
+    rates = [
+        mw._ureg.parse_expression(p["params"]["rate"]).to("mL/min").magnitude
+        for p in E.executed_procedures
+    ]
+    assert rates == pytest.approx([1, 1.2, 1.4, 1.6, 1.8, 2, 0])